@@ -1,12 +1,18 @@
-from flask import Flask
+"""
+Package entry point: `from website import create_app`.
 
-def create_app():
-    app = Flask(__name__)
+The modules of this folder import each other as top-level modules (the way
+`flask --app app` and wsgi.py run them), so the folder is put on sys.path
+before the factory is imported.
+"""
 
-    from .auth import auth
-    from .views import views
+import os
+import sys
 
-    app.register_blueprint(auth)
-    app.register_blueprint(views)
+_here = os.path.dirname(os.path.abspath(__file__))
+if _here not in sys.path:
+    sys.path.insert(0, _here)
 
-    return app
+from app import create_app, warm_up  # noqa: E402
+
+__all__ = ['create_app', 'warm_up']
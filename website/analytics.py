@@ -0,0 +1,440 @@
+"""
+Reliability analytics: MTBF, MTTR, failure rate, availability and downtime cost.
+
+Request history for the window is fetched once as plain columns (equipment,
+epoch seconds, repair hours, repaired flag) and reduced with NumPy, so the
+whole fleet costs one query and a few vectorized passes instead of a loop per
+machine:
+- rows are sorted by (equipment, time); gaps between consecutive failures of
+  the same machine give MTBF, grouped sums (bincount) give everything else;
+- per-machine sums are folded again into departments, teams, work centers and
+  the fleet, so every level uses the same definitions.
+Definitions (window = the last `days` days):
+- failures: requests opened in the window; failure_rate: per 1,000 hours
+- mtbf_hours: mean gap between consecutive failures of a machine
+- mttr_hours: mean duration_hours of repaired requests
+- downtime_hours: summed duration_hours; availability: 1 - downtime / window
+- downtime_cost: downtime_hours x the machine's WorkCenter.cost_per_hour;
+  below_target: availability under the work center's oee_target
+Windows end at window_end(), now rounded down to WINDOW_STEP seconds, and
+results are cached per window end; request and asset writes evict them. Views
+put the same window end into their ETag (http_cache.conditional(clock=...)),
+so a cached page is revalidated whenever the window moves.
+
+Status durations (status_durations) come from the status history log instead
+of duration_hours: window queries turn each request's transitions into status
+segments (LEAD(ts) = when it left a status, MIN(ts) = when it was opened):
+- queue_hours: time spent 'new' before work started, per completed segment;
+- repair_hours: time spent 'in_progress', per completed segment;
+- resolution_hours: from opening to 'repaired';
+- downtime_hours: time requests were open (new or in_progress), clipped to
+  the window and each bucket; overlapping requests of a machine add up.
+Series are bucketed by day, week (from Monday) or calendar month, by when a
+segment ended (queue/repair), when the request was repaired (resolution) or
+by overlap (downtime, open requests at the end of the bucket).
+"""
+
+from datetime import datetime, timedelta
+
+import numpy as np
+from sqlalchemy import Float, case, cast, extract, func, select, union
+
+from models import db, Equipment, MaintenanceRequest, Department, MaintenanceTeam, WorkCenter, StatusTransition
+from cache import cache
+from pagination import parse_int
+import archive
+
+GROUPS = ('equipment', 'department', 'team', 'work_center')
+METRICS = ('failures', 'failure_rate', 'mtbf_hours', 'mttr_hours', 'downtime_hours', 'availability',
+           'downtime_cost')
+DEFAULT_DAYS = 365
+MAX_DAYS = 3650
+CACHE_TIMEOUT = 300
+WINDOW_STEP = 300
+
+# Sums every metric is derived from; they add up across machines
+_SUMS = ('failures', 'gap_hours', 'gaps', 'repairs', 'repair_hours', 'downtime_hours', 'downtime_cost')
+
+
+def _epoch(dialect, column=MaintenanceRequest.created_at):
+    """A timestamp column (default created_at) as float seconds since the epoch, computed in the database."""
+    if dialect == 'postgresql':
+        return cast(extract('epoch', column), Float)
+    return (func.julianday(column) - 2440587.5) * 86400.0
+
+
+def _fetch(conn, statement, columns):
+    """
+    Run `statement` and return its rows as a float64 array of `columns` columns.
+    Rows are read straight off the DB-API cursor: building Row objects (and
+    converting them) would cost far more than the analysis itself.
+    """
+    result = conn.execute(statement)
+    try:
+        rows = result.cursor.fetchall()
+    finally:
+        result.close()
+    if not rows:
+        return np.empty((0, columns))
+    return np.array(rows, dtype=np.float64)
+
+
+def load_history(conn, start, equipment_ids=None):
+    """
+    Columnar request history since `start`: (equipment_id, epoch, hours, repaired).
+    `equipment_ids` (a list or a subquery) limits it to some machines. Archived
+    requests are included when the window reaches back to them.
+    """
+    req = archive.history_source(conn, start).c
+    statement = select(req.equipment_id, _epoch(conn.dialect.name, req.created_at),
+                       func.coalesce(req.duration_hours, 0.0),
+                       case((req.status == 'repaired', 1), else_=0))\
+        .where(req.created_at >= start)
+    if equipment_ids is not None:
+        statement = statement.where(req.equipment_id.in_(equipment_ids))
+    return _fetch(conn, statement, 4)
+
+
+def load_assets(conn):
+    """
+    One row per machine, sorted by id: (id, department_id, team_id,
+    work_center_id, cost_per_hour, oee_target), -1 / NaN where unset.
+    """
+    statement = select(Equipment.id,
+                       func.coalesce(Equipment.department_id, -1),
+                       func.coalesce(Equipment.team_id, -1),
+                       func.coalesce(Equipment.work_center_id, -1),
+                       func.coalesce(WorkCenter.cost_per_hour, 0.0),
+                       WorkCenter.oee_target)\
+        .outerjoin(WorkCenter, WorkCenter.id == Equipment.work_center_id)\
+        .order_by(Equipment.id)
+    return _fetch(conn, statement, 6)
+
+
+def machine_sums(history, assets):
+    """Per-machine sums (arrays aligned with assets[:, 0]) from the raw history."""
+    n = len(assets)
+    equipment_ids = assets[:, 0]
+    sums = {name: np.zeros(n) for name in _SUMS}
+    if not len(history) or not n:
+        return sums
+    order = np.lexsort((history[:, 1], history[:, 0]))
+    history = history[order]
+    index = np.searchsorted(equipment_ids, history[:, 0])
+    # History rows always belong to a machine, but stay safe against a concurrent delete
+    known = (index < n) & (equipment_ids[np.minimum(index, n - 1)] == history[:, 0])
+    history, index = history[known], index[known]
+
+    hours, repaired = history[:, 2], history[:, 3]
+    sums['failures'] = np.bincount(index, minlength=n).astype(np.float64)
+    sums['repairs'] = np.bincount(index, weights=repaired, minlength=n)
+    sums['repair_hours'] = np.bincount(index, weights=hours * repaired, minlength=n)
+    sums['downtime_hours'] = np.bincount(index, weights=hours, minlength=n)
+    sums['downtime_cost'] = sums['downtime_hours'] * assets[:, 4]
+
+    # Consecutive rows of the same machine are consecutive failures
+    same = index[1:] == index[:-1]
+    owners = index[1:][same]
+    sums['gap_hours'] = np.bincount(owners, weights=np.diff(history[:, 1])[same] / 3600.0, minlength=n)
+    sums['gaps'] = np.bincount(owners, minlength=n).astype(np.float64)
+    return sums
+
+
+def _ratio(numerator, denominator):
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return np.where(denominator > 0, numerator / np.where(denominator > 0, denominator, 1), np.nan)
+
+
+def metrics(sums, assets_count, window_hours):
+    """Derive the reported metrics from (grouped) sums; `assets_count` machines per group."""
+    exposure = assets_count * window_hours
+    return {
+        'failures': sums['failures'].astype(np.int64),
+        'failure_rate': _ratio(sums['failures'] * 1000.0, exposure),
+        'mtbf_hours': _ratio(sums['gap_hours'], sums['gaps']),
+        'mttr_hours': _ratio(sums['repair_hours'], sums['repairs']),
+        'downtime_hours': sums['downtime_hours'],
+        'availability': np.clip(1.0 - _ratio(sums['downtime_hours'], exposure), 0.0, 1.0),
+        'downtime_cost': sums['downtime_cost'],
+    }
+
+
+def _group(sums, keys):
+    """Fold per-machine sums into groups by key (machines with key -1 are skipped)."""
+    valid = keys >= 0
+    group_ids, index = np.unique(keys[valid], return_inverse=True)
+    grouped = {name: np.bincount(index, weights=values[valid], minlength=len(group_ids))
+               for name, values in sums.items()}
+    return group_ids, grouped, np.bincount(index, minlength=len(group_ids))
+
+
+def window_end():
+    """Now, rounded down to WINDOW_STEP seconds: where rolling windows end."""
+    seconds = (datetime.utcnow() - datetime(1970, 1, 1)).total_seconds()
+    return datetime(1970, 1, 1) + timedelta(seconds=seconds - seconds % WINDOW_STEP)
+
+
+def reliability(days=DEFAULT_DAYS, end=None):
+    """
+    Metrics for every machine, department, team and work center plus the fleet,
+    over the `days` days before `end` (default window_end()):
+    {'window': {...}, 'fleet': {...}, 'groups': {group: {'ids': array, metric: array, ...}}}.
+    """
+    return _reliability(days=days, end=end or window_end())
+
+
+@cache.cached('reliability', tags=('MaintenanceRequest', 'Equipment', 'WorkCenter'), timeout=CACHE_TIMEOUT)
+def _reliability(days, end):
+    start = end - timedelta(days=days)
+    window_hours = days * 24.0
+    conn = db.session.connection()
+    assets = load_assets(conn)
+    sums = machine_sums(load_history(conn, start), assets)
+
+    groups = {'equipment': dict(metrics(sums, np.ones(len(assets)), window_hours),
+                                ids=assets[:, 0].astype(np.int64), oee_target=assets[:, 5])}
+    for group, column in (('department', 1), ('team', 2), ('work_center', 3)):
+        ids, grouped, counts = _group(sums, assets[:, column])
+        groups[group] = dict(metrics(grouped, counts, window_hours), ids=ids.astype(np.int64))
+    # Work centers: the target is theirs; every machine of one center shares it
+    centers = groups['work_center']
+    targets = dict(zip(assets[:, 3], assets[:, 5]))
+    centers['oee_target'] = np.array([targets.get(i, np.nan) for i in centers['ids']], dtype=np.float64)
+    for table in (groups['equipment'], centers):
+        table['below_target'] = table['availability'] * 100.0 < np.nan_to_num(table['oee_target'], nan=-1.0)
+
+    fleet = metrics({name: np.array([values.sum()]) for name, values in sums.items()},
+                    np.array([len(assets)]), window_hours)
+    return {
+        'window': {'start': start.isoformat(), 'end': end.isoformat(), 'days': days, 'hours': window_hours},
+        'fleet': dict(_row(fleet, 0), assets=len(assets)),
+        'groups': groups,
+    }
+
+
+def _value(value):
+    if isinstance(value, (np.floating, float)):
+        return None if np.isnan(value) else round(float(value), 4)
+    if isinstance(value, np.bool_):
+        return bool(value)
+    if isinstance(value, np.integer):
+        return int(value)
+    return value
+
+
+def _row(table, i):
+    return {name: _value(values[i]) for name, values in table.items()}
+
+
+_NAMES = {
+    'equipment': (Equipment, Equipment.name),
+    'department': (Department, Department.name),
+    'team': (MaintenanceTeam, MaintenanceTeam.name),
+    'work_center': (WorkCenter, WorkCenter.name),
+}
+
+
+def ranking(report, group, sort='downtime_cost', limit=20, descending=True):
+    """
+    Top `limit` entries of `group` by metric `sort` as JSON-ready dicts, with
+    names fetched for just those rows. Entries without a value sort last.
+    """
+    table = report['groups'][group]
+    values = table[sort].astype(np.float64)
+    key = np.where(np.isnan(values), -np.inf if descending else np.inf, values)
+    order = np.argsort(-key if descending else key, kind='stable')[:limit]
+    ids = [int(i) for i in table['ids'][order]]
+    model, name_column = _NAMES[group]
+    names = dict(db.session.query(model.id, name_column).filter(model.id.in_(ids))) if ids else {}
+    rows = []
+    for i in order:
+        row = _row(table, i)
+        row['name'] = names.get(row['ids'])
+        row['id'] = row.pop('ids')
+        rows.append(row)
+    return rows
+
+
+def _parse_days(args, default):
+    days = args.get('days') or default
+    try:
+        days = int(days)
+    except ValueError:
+        raise ValueError("'days' must be an integer.")
+    if not 1 <= days <= MAX_DAYS:
+        raise ValueError(f"'days' must be between 1 and {MAX_DAYS}.")
+    return days
+
+
+def parse_query(args):
+    """
+    (group, days, sort, descending) from API query parameters; raises
+    ValueError with a user-facing message for invalid values.
+    """
+    group = args.get('group') or 'equipment'
+    if group not in GROUPS:
+        raise ValueError(f"'group' must be one of: {', '.join(GROUPS)}.")
+    days = _parse_days(args, DEFAULT_DAYS)
+    sort = args.get('sort') or 'downtime_cost'
+    if sort not in METRICS:
+        raise ValueError(f"'sort' must be one of: {', '.join(METRICS)}.")
+    direction = args.get('dir') or 'desc'
+    if direction not in ('asc', 'desc'):
+        raise ValueError("'dir' must be 'asc' or 'desc'.")
+    return group, days, sort, direction == 'desc'
+
+
+# ------------------------
+# Status durations (status history)
+# ------------------------
+BUCKETS = ('day', 'week', 'month')
+DEFAULT_DURATION_DAYS = 90
+STATUS_CODES = {'new': 0, 'in_progress': 1, 'repaired': 2, 'scrap': 3}
+OPEN_STATUSES = ('new', 'in_progress')
+
+
+def load_segments(conn, start, equipment_id=None):
+    """
+    Status segments that were current at some point since `start`: (status
+    code, entered, left, opened, logged) with times as epoch seconds, left NaN
+    while current; logged is 0 for the creation entry, whose status was not
+    reached by a logged move (imports, backfilled requests).
+    Only requests moved since `start` or still open are read (one created
+    closed and never moved has nothing to measure), and the window functions
+    run over their whole history.
+    """
+    st = StatusTransition
+    scope = union(select(st.request_id).where(st.ts >= start, st.from_status.isnot(None)),
+                  select(MaintenanceRequest.id).where(MaintenanceRequest.status.in_(OPEN_STATUSES)))
+    if equipment_id is not None:
+        # Requests moved since `start` may have been archived since
+        req = archive.history_source(conn, start).c
+        scope = select(req.id).where(req.equipment_id == equipment_id, req.id.in_(scope))
+    order = (st.ts, st.version)
+    segments = select(st.to_status.label('status'), st.ts.label('entered'),
+                      func.lead(st.ts).over(partition_by=st.request_id, order_by=order).label('left'),
+                      func.min(st.ts).over(partition_by=st.request_id).label('opened'),
+                      case((st.from_status.is_(None), 0), else_=1).label('logged'))\
+        .where(st.request_id.in_(scope))\
+        .subquery()
+    dialect = conn.dialect.name
+    statement = select(case(STATUS_CODES, value=segments.c.status, else_=-1),
+                       _epoch(dialect, segments.c.entered), _epoch(dialect, segments.c.left),
+                       _epoch(dialect, segments.c.opened), segments.c.logged)\
+        .where(segments.c.left.is_(None) | (segments.c.left >= start))
+    return _fetch(conn, statement, 5)
+
+
+def bucket_edges(start, end, bucket):
+    """Bucket boundaries from the bucket containing `start` past `end`, aligned to days, weeks or months."""
+    edge = start.replace(hour=0, minute=0, second=0, microsecond=0)
+    if bucket == 'week':
+        edge -= timedelta(days=edge.weekday())
+    elif bucket == 'month':
+        edge = edge.replace(day=1)
+    edges = [edge]
+    while edges[-1] < end:
+        edge = edges[-1]
+        if bucket == 'month':
+            edges.append(edge.replace(year=edge.year + edge.month // 12, month=edge.month % 12 + 1))
+        else:
+            edges.append(edge + timedelta(days=7 if bucket == 'week' else 1))
+    return edges
+
+
+def _open_time(starts, ends, points):
+    """
+    For each of `points`: summed overlap of the intervals [starts, ends) with
+    (-inf, point] and how many intervals are open at it, from sorted prefix
+    sums. Intervals still open end at +inf.
+    """
+    starts, ends = np.sort(starts), np.sort(ends)
+    start_sums = np.concatenate(([0.0], np.cumsum(starts)))
+    end_sums = np.concatenate(([0.0], np.cumsum(ends)))
+    started = np.searchsorted(starts, points, side='right')
+    ended = np.searchsorted(ends, points, side='right')
+    seconds = (started * points - start_sums[started]) - (ended * points - end_sums[ended])
+    return seconds, started - ended
+
+
+def _duration_stats(hours):
+    if not len(hours):
+        return {'count': 0, 'mean_hours': None, 'p50_hours': None, 'p90_hours': None}
+    p50, p90 = np.percentile(hours, [50, 90])
+    return {'count': int(len(hours)), 'mean_hours': _value(hours.mean()), 'p50_hours': _value(p50),
+            'p90_hours': _value(p90)}
+
+
+def _bucket_means(index, hours, buckets):
+    counts = np.bincount(index, minlength=buckets)
+    return _ratio(np.bincount(index, weights=hours, minlength=buckets), counts), counts
+
+
+def status_durations(days=DEFAULT_DURATION_DAYS, bucket='week', equipment_id=None, end=None):
+    """
+    Queue, repair, resolution and downtime figures for the `days` days before
+    `end` (default window_end()), optionally of one machine:
+    {'window', 'bucket', 'summary', 'series'}.
+    """
+    return _status_durations(days=days, bucket=bucket, equipment_id=equipment_id, end=end or window_end())
+
+
+@cache.cached('status_durations', tags=('MaintenanceRequest', 'StatusTransition', 'Equipment'),
+              timeout=CACHE_TIMEOUT)
+def _status_durations(days, bucket, equipment_id, end):
+    start = end - timedelta(days=days)
+    segments = load_segments(db.session.connection(), start, equipment_id)
+    edges = bucket_edges(start, end, bucket)
+    epochs = np.array([(edge - datetime(1970, 1, 1)).total_seconds() for edge in edges])
+    end_epoch = (end - datetime(1970, 1, 1)).total_seconds()
+    window_start = (start - datetime(1970, 1, 1)).total_seconds()
+    points = np.clip(epochs, window_start, end_epoch)
+    buckets = len(edges) - 1
+
+    status, entered, left, opened, logged = segments.T
+    done = ~np.isnan(left)
+    finished = np.where(done, left, np.inf)
+    summary, series = {}, {}
+    for name, code, moment, hours, counted in (
+            ('queue', STATUS_CODES['new'], finished, (finished - entered) / 3600.0, done),
+            ('repair', STATUS_CODES['in_progress'], finished, (finished - entered) / 3600.0, done),
+            ('resolution', STATUS_CODES['repaired'], entered, (entered - opened) / 3600.0, logged == 1)):
+        # Queue and repair segments count once they end, resolutions when the request is repaired
+        selected = counted & (status == code) & (moment >= window_start) & (moment < end_epoch)
+        summary[f'{name}_hours'] = _duration_stats(hours[selected])
+        index = np.clip(np.searchsorted(epochs, moment[selected], side='right') - 1, 0, buckets - 1)
+        series[name] = _bucket_means(index, hours[selected], buckets)
+
+    is_open = np.isin(status, [STATUS_CODES[s] for s in OPEN_STATUSES])
+    seconds, open_requests = _open_time(entered[is_open], finished[is_open], points)
+    downtime = np.diff(seconds) / 3600.0
+    summary['downtime_hours'] = _value(downtime.sum())
+    summary['open_requests'] = int(open_requests[-1])
+
+    rows = []
+    for i in range(buckets):
+        rows.append({
+            'start': edges[i].isoformat(),
+            'queue_hours': _value(series['queue'][0][i]),
+            'repair_hours': _value(series['repair'][0][i]),
+            'resolution_hours': _value(series['resolution'][0][i]),
+            'repaired': int(series['resolution'][1][i]),
+            'downtime_hours': _value(downtime[i]),
+            'open_requests': int(open_requests[i + 1]),
+        })
+    return {
+        'window': {'start': start.isoformat(), 'end': end.isoformat(), 'days': days},
+        'bucket': bucket,
+        'equipment_id': equipment_id,
+        'summary': summary,
+        'series': rows,
+    }
+
+
+def parse_durations_query(args):
+    """(days, bucket, equipment_id) from API query parameters; ValueError for invalid values."""
+    days = _parse_days(args, DEFAULT_DURATION_DAYS)
+    bucket = args.get('bucket') or 'week'
+    if bucket not in BUCKETS:
+        raise ValueError(f"'bucket' must be one of: {', '.join(BUCKETS)}.")
+    return days, bucket, parse_int(args, 'equipment_id') or None
@@ -0,0 +1,177 @@
+"""
+Hot/cold archival of closed maintenance requests.
+
+Requests that are repaired or scrapped and have not been written for
+ARCHIVE_AFTER_DAYS move from maintenance_request to maintenance_request_archive
+(same ids and columns plus archived_at), so the operational table and its
+indexes hold the open work and recent history that every page reads:
+- `flask archive-requests` (or the 'archive_requests' job) moves them oldest
+  update first, ARCHIVE_BATCH_SIZE rows per transaction (copy, then delete the
+  same ids), so an interrupted run loses nothing and the next one carries on
+  where it stopped;
+- moving a request is not a request change: rollups, equipment health, the
+  status history and the search index keep it under the same id;
+- readers go to the archive only when a date range reaches back into it:
+  reaches(start) compares the start with the newest archived update (an index
+  seek) and history_source() is maintenance_request alone, or UNION ALL the
+  archive when it is needed. The request list, calendar, reliability analytics,
+  failure prediction, exports and the rebuild commands read through it, and
+  search merges archived matches in under the same rule;
+- archived requests are read-only; the Kanban board and assignment only see
+  operational requests.
+On PostgreSQL the same layout works with the archive as a plain table; being
+keyed by id it needs no partition maintenance.
+"""
+
+from datetime import datetime, timedelta
+
+import click
+from flask import current_app
+from flask.cli import with_appcontext
+from sqlalchemy import DateTime, delete, func, insert, literal, or_, and_, select, union_all
+
+from models import db, MaintenanceRequest, ArchivedRequest
+from cache import cache
+from jobs import job_queue
+
+CLOSED_STATUSES = ('repaired', 'scrap')
+# Columns shared by both tables, in history_source() order
+COLUMNS = ('id', 'description', 'status', 'equipment_id', 'team_id', 'technician_id', 'created_by',
+           'created_at', 'duration_hours', 'estimated_hours', 'version', 'updated_at')
+
+
+# ------------------------
+# Reading
+# ------------------------
+def horizon(conn=None):
+    """Newest update of an archived request (None when the archive is empty)."""
+    conn = conn or db.session
+    return conn.scalar(select(func.max(ArchivedRequest.updated_at)))
+
+
+def reaches(start=None, conn=None):
+    """
+    Whether requests created or moved at or after `start` (a datetime; None =
+    all time) may be in the archive. Archived requests were created and last
+    moved before their last update, so a later start never needs it.
+    """
+    newest = horizon(conn)
+    return newest is not None and (start is None or start <= newest)
+
+
+def history_source(conn=None, start=None):
+    """
+    Requests created since `start` (None = all time) as a selectable with the
+    COLUMNS: the maintenance_request table when the archive can't hold any,
+    else maintenance_request UNION ALL maintenance_request_archive. Callers
+    still filter on created_at themselves.
+    """
+    hot = MaintenanceRequest.__table__
+    if not reaches(start, conn):
+        return hot
+    cold = ArchivedRequest.__table__
+    return union_all(select(*(hot.c[name] for name in COLUMNS)),
+                     select(*(cold.c[name] for name in COLUMNS))).subquery('request_history')
+
+
+def get_request(request_id):
+    """The request with this id, operational or archived (None if neither)."""
+    return db.session.get(MaintenanceRequest, request_id) or db.session.get(ArchivedRequest, request_id)
+
+
+# ------------------------
+# Archiving
+# ------------------------
+def _next_batch(conn, cutoff, after, batch_size):
+    """(updated_at, id) of the next closed requests last written before `cutoff`, oldest first."""
+    req = MaintenanceRequest
+    query = select(req.updated_at, req.id)\
+        .where(req.status.in_(CLOSED_STATUSES), req.updated_at < cutoff)\
+        .order_by(req.updated_at, req.id)\
+        .limit(batch_size)\
+        .with_for_update(skip_locked=True)
+    if after is not None:
+        # Open requests stay behind; the key keeps them from being scanned again by every batch
+        query = query.where(or_(req.updated_at > after[0], and_(req.updated_at == after[0], req.id > after[1])))
+    if conn.dialect.name == 'sqlite':
+        # SQLite hands out max(rowid) + 1 as the next id: keep the newest row so ids are never reused
+        query = query.where(req.id < select(func.max(req.id)).scalar_subquery())
+    return conn.execute(query).all()
+
+
+def archive_batch(cutoff, after=None, batch_size=1000):
+    """
+    Move one batch of closed requests last written before `cutoff` (rows after
+    the (updated_at, id) key `after`) into the archive. Returns (moved, last
+    key), the key None when nothing was left. The caller commits; the copy and
+    the delete share the transaction.
+    """
+    conn = db.session.connection()
+    rows = _next_batch(conn, cutoff, after, batch_size)
+    if not rows:
+        return 0, None
+    ids = [row.id for row in rows]
+    hot = MaintenanceRequest.__table__
+    # Re-check the predicate: a row reopened since it was selected is left in place
+    moving = and_(hot.c.id.in_(ids), hot.c.status.in_(CLOSED_STATUSES), hot.c.updated_at < cutoff)
+    copied = select(*(hot.c[name] for name in COLUMNS), literal(datetime.utcnow(), DateTime)).where(moving)
+    conn.execute(insert(ArchivedRequest.__table__).from_select(COLUMNS + ('archived_at',), copied))
+    moved = conn.execute(delete(hot).where(moving)).rowcount
+    return moved, tuple(rows[-1])
+
+
+def archive_requests(older_than_days=None, batch_size=None, max_batches=None, progress=None):
+    """
+    Archive every closed request not written for `older_than_days` (default
+    ARCHIVE_AFTER_DAYS), committing each batch. `progress(moved)` is called
+    after every batch. Returns the number of requests moved.
+    """
+    config = current_app.config
+    days = config['ARCHIVE_AFTER_DAYS'] if older_than_days is None else older_than_days
+    batch_size = batch_size or config['ARCHIVE_BATCH_SIZE']
+    cutoff = datetime.utcnow() - timedelta(days=days)
+    total, after, batches = 0, None, 0
+    try:
+        while max_batches is None or batches < max_batches:
+            moved, after = archive_batch(cutoff, after, batch_size)
+            if after is None:
+                break
+            db.session.commit()
+            total += moved
+            batches += 1
+            if progress is not None:
+                progress(total)
+    finally:
+        if total:
+            # Core writes bypass the unit of work that normally evicts cached pages
+            cache.invalidate(('MaintenanceRequest',))
+    return total
+
+
+# ------------------------
+# Jobs and CLI
+# ------------------------
+@job_queue.task('archive_requests')
+def archive_job(job, older_than_days=None, batch_size=None):
+    """Background archival; batches commit as they go, so a retry resumes after the last one."""
+    moved = archive_requests(older_than_days, batch_size,
+                             progress=lambda total: job.progress(0.0, message=f"{total:,} requests archived"))
+    return {'archived': moved}
+
+
+@click.command('archive-requests')
+@click.option('--older-than-days', type=int, default=None,
+              help="Archive requests closed and untouched for this many days (default ARCHIVE_AFTER_DAYS).")
+@click.option('--batch-size', type=int, default=None, help="Requests moved per transaction (default ARCHIVE_BATCH_SIZE).")
+@click.option('--max-batches', type=int, default=None, help="Stop after this many batches (run again to continue).")
+@with_appcontext
+def archive_command(older_than_days, batch_size, max_batches):
+    """Move old repaired/scrapped requests into the archive table."""
+    moved = archive_requests(older_than_days, batch_size, max_batches,
+                             progress=lambda total: click.echo(f"  {total:,} requests archived", err=True))
+    click.echo(f"[SUCCESS] {moved:,} requests archived; newest archived update: {horizon() or 'none'}.")
+
+
+def init_app(app):
+    """Register the archive CLI command on the app."""
+    app.cli.add_command(archive_command)
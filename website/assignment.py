@@ -0,0 +1,294 @@
+"""
+Workload-aware technician assignment.
+
+TechnicianWorkload holds, per technician, the open (new / in progress) requests
+assigned to them and the estimated hours of that work.
+- Every RequestChange (see changes.py) moves the counters of the old and new
+  technician inside the writing transaction; new technicians get a row when
+  flushed and follow their team when it changes.
+- Estimates come from history: the average repair hours of the equipment's
+  category (from the equipment rollups), else the average of all repairs.
+- assign: the least-loaded technician of the equipment's team is the first
+  entry of ix_technician_workload_team_load (team, hours, open, id), so picking
+  one is a single O(log n) index seek that every worker sees the same way.
+- rebalance: spread the unstarted backlog over each team with a heap of
+  technician loads (longest jobs first onto the least-loaded technician).
+- rebuild_workload: recompute the table from scratch (backfill / repair, bulk loads).
+"""
+
+import heapq
+from collections import defaultdict
+
+import click
+from flask.cli import with_appcontext
+from sqlalchemy import and_, bindparam, case, event, func, inspect, select
+from sqlalchemy.orm import Session
+
+from models import db, Equipment, EquipmentRollup, MaintenanceRequest, MaintenanceTeam, Technician, TechnicianWorkload
+from changes import TRACKED_FIELDS, RequestChange, request_changes, state_from_row, publish
+from cache import cache
+from jobs import job_queue
+
+OPEN_STATUSES = ('new', 'in_progress')
+# Used when a request has no estimate and there is no repair history to learn from
+DEFAULT_ESTIMATE_HOURS = 4.0
+# Repairs a category needs before its own average is trusted
+MIN_SAMPLES = 5
+# Requests updated per statement by rebalance
+CHUNK_SIZE = 1000
+
+
+# ------------------------
+# Estimates
+# ------------------------
+@cache.cached('duration_estimates', tags=('MaintenanceRequest', 'Equipment'))
+def duration_estimates():
+    """Average repair hours per equipment category plus the overall average."""
+    rows = db.session.query(Equipment.category,
+                            func.sum(EquipmentRollup.request_count),
+                            func.sum(EquipmentRollup.duration_total))\
+                     .join(EquipmentRollup, EquipmentRollup.equipment_id == Equipment.id)\
+                     .filter(EquipmentRollup.status == 'repaired')\
+                     .group_by(Equipment.category)\
+                     .all()
+    categories = {category: round(hours / count, 2) for category, count, hours in rows
+                  if category and count and count >= MIN_SAMPLES}
+    total_count = sum(count or 0 for _, count, _ in rows)
+    total_hours = sum(hours or 0.0 for _, _, hours in rows)
+    return {'categories': categories,
+            'overall': round(total_hours / total_count, 2) if total_count >= MIN_SAMPLES else None}
+
+
+def estimate_hours(category):
+    """Expected repair hours for a machine of `category`."""
+    estimates = duration_estimates()
+    return estimates['categories'].get(category) or estimates['overall'] or DEFAULT_ESTIMATE_HOURS
+
+
+def _hours(state):
+    return state.estimated_hours if state.estimated_hours is not None else DEFAULT_ESTIMATE_HOURS
+
+
+# ------------------------
+# Online assignment
+# ------------------------
+def least_loaded(team_id):
+    """
+    Technician of `team_id` with the fewest estimated open hours, or None.
+    On PostgreSQL rows locked by concurrent assignments are skipped, so
+    simultaneous requests spread over the team instead of piling onto one person.
+    """
+    query = db.session.query(TechnicianWorkload.technician_id)\
+                      .filter(TechnicianWorkload.team_id == team_id)\
+                      .order_by(TechnicianWorkload.estimated_hours, TechnicianWorkload.open_requests,
+                                TechnicianWorkload.technician_id)\
+                      .limit(1)
+    technician_id = query.with_for_update(skip_locked=True).scalar()
+    return technician_id if technician_id is not None else query.scalar()
+
+
+def assign(req, equipment):
+    """Fill in team, estimate and technician of a new request before it is flushed."""
+    if req.team_id is None:
+        req.team_id = equipment.team_id
+    if req.estimated_hours is None:
+        req.estimated_hours = estimate_hours(equipment.category)
+    if req.technician_id is None and req.team_id is not None:
+        req.technician_id = least_loaded(req.team_id)
+    return req.technician_id
+
+
+# ------------------------
+# Keeping the index current
+# ------------------------
+def _deltas(changes):
+    """Fold RequestChange records into {technician_id: [open delta, hours delta]}."""
+    deltas = defaultdict(lambda: [0, 0.0])
+    for change in changes:
+        for state, sign in ((change.old, -1), (change.new, 1)):
+            if state is not None and state.technician_id is not None and state.status in OPEN_STATUSES:
+                delta = deltas[state.technician_id]
+                delta[0] += sign
+                delta[1] += sign * _hours(state)
+    return deltas
+
+
+@request_changes.connect
+def apply_changes(session, changes):
+    """Signal receiver: apply request changes to technician workloads."""
+    conn = session.connection()
+    table = TechnicianWorkload.__table__
+    for technician_id, (open_delta, hours_delta) in sorted(_deltas(changes).items()):
+        if open_delta or hours_delta:
+            conn.execute(table.update()
+                         .where(table.c.technician_id == technician_id)
+                         .values(open_requests=table.c.open_requests + open_delta,
+                                 estimated_hours=table.c.estimated_hours + hours_delta))
+
+
+def _sync_technicians(session, flush_context):
+    """Give new technicians an empty workload row and keep team_id in step."""
+    table = TechnicianWorkload.__table__
+    new = [{'technician_id': obj.id, 'team_id': obj.team_id, 'open_requests': 0, 'estimated_hours': 0.0}
+           for obj in session.new if isinstance(obj, Technician)]
+    moved = [{'b_id': obj.id, 'b_team': obj.team_id} for obj in session.dirty
+             if isinstance(obj, Technician) and inspect(obj).attrs.team_id.history.has_changes()]
+    if new:
+        session.connection().execute(table.insert(), new)
+    if moved:
+        session.connection().execute(table.update()
+                                     .where(table.c.technician_id == bindparam('b_id'))
+                                     .values(team_id=bindparam('b_team')), moved)
+
+
+def rebuild_workload():
+    """Recompute every workload row from technician and maintenance_request (caller commits)."""
+    conn = db.session.connection()
+    table = TechnicianWorkload.__table__
+    conn.execute(table.delete())
+    req = MaintenanceRequest
+    # Idle technicians join one all-NULL row: only matched requests get the default estimate
+    hours = case((req.id.isnot(None), func.coalesce(req.estimated_hours, DEFAULT_ESTIMATE_HOURS)), else_=0.0)
+    query = select(Technician.id, Technician.team_id, func.count(req.id), func.sum(hours))\
+        .select_from(Technician)\
+        .outerjoin(req, and_(req.technician_id == Technician.id, req.status.in_(OPEN_STATUSES)))\
+        .group_by(Technician.id, Technician.team_id)
+    conn.execute(table.insert().from_select(
+        ['technician_id', 'team_id', 'open_requests', 'estimated_hours'], query))
+
+
+# ------------------------
+# Backlog rebalancing
+# ------------------------
+def rebalance(reassign=False):
+    """
+    Assign every unstarted ('new') request without a technician, or with
+    `reassign` every unstarted request, to the technicians of its team. Each
+    team is a heap of (hours, open requests, technician): the longest jobs are
+    placed first, each onto the currently least-loaded technician, in
+    O(m log n). Returns {team_id: requests (re)assigned}; the caller commits.
+    """
+    req = MaintenanceRequest
+    backlog = db.session.query(req.id, Equipment.category, *(getattr(req, f) for f in TRACKED_FIELDS))\
+                        .join(Equipment, Equipment.id == req.equipment_id)\
+                        .filter(req.status == 'new', req.team_id.isnot(None))
+    if not reassign:
+        backlog = backlog.filter(req.technician_id.is_(None))
+    backlog = backlog.with_for_update(of=req).all()
+
+    loads = {technician_id: [hours, open_requests, technician_id, team_id]
+             for technician_id, team_id, open_requests, hours in
+             db.session.query(TechnicianWorkload.technician_id, TechnicianWorkload.team_id,
+                              TechnicianWorkload.open_requests, TechnicianWorkload.estimated_hours)
+                       .with_for_update()}
+    jobs = defaultdict(list)
+    for row in backlog:
+        state = state_from_row(row)
+        if state.technician_id in loads:
+            # Work that is being redistributed no longer counts against its holder
+            loads[state.technician_id][0] -= _hours(state)
+            loads[state.technician_id][1] -= 1
+        estimate = state.estimated_hours if state.estimated_hours is not None else estimate_hours(row.category)
+        jobs[state.team_id].append((estimate, row.id, state))
+
+    heaps = defaultdict(list)
+    for hours, open_requests, technician_id, team_id in loads.values():
+        heaps[team_id].append((hours, open_requests, technician_id))
+    for heap in heaps.values():
+        heapq.heapify(heap)
+
+    updates, changes, assigned = [], [], defaultdict(int)
+    for team_id, team_jobs in jobs.items():
+        heap = heaps.get(team_id)
+        if not heap:
+            continue
+        for estimate, request_id, state in sorted(team_jobs, key=lambda job: (-job[0], job[1])):
+            hours, open_requests, technician_id = heapq.heappop(heap)
+            heapq.heappush(heap, (hours + estimate, open_requests + 1, technician_id))
+            if technician_id == state.technician_id and estimate == state.estimated_hours:
+                continue
+            updates.append({'b_id': request_id, 'b_technician': technician_id, 'b_estimate': estimate,
+                            'b_version': state.version})
+            changes.append(RequestChange(request_id, state, state._replace(
+                technician_id=technician_id, estimated_hours=estimate, version=state.version + 1)))
+
+    table = req.__table__
+    statement = table.update()\
+        .where(and_(table.c.id == bindparam('b_id'), table.c.version == bindparam('b_version')))\
+        .values(technician_id=bindparam('b_technician'), estimated_hours=bindparam('b_estimate'),
+                version=table.c.version + 1)
+    conn = db.session.connection()
+    for start in range(0, len(updates), CHUNK_SIZE):
+        chunk = changes[start:start + CHUNK_SIZE]
+        result = conn.execute(statement, updates[start:start + CHUNK_SIZE])
+        if not conn.dialect.supports_sane_multi_rowcount or result.rowcount != len(chunk):
+            # A concurrent edit bumped the version of some rows first; only the others moved
+            rows = conn.execute(select(table.c.id, table.c.version, table.c.technician_id)
+                                .where(table.c.id.in_([change.request_id for change in chunk])))
+            current = {row.id: (row.version, row.technician_id) for row in rows}
+            chunk = [change for change in chunk
+                     if current.get(change.request_id) == (change.new.version, change.new.technician_id)]
+        for change in chunk:
+            assigned[change.new.team_id] += 1
+        # Bulk UPDATEs bypass the unit of work, so report them explicitly
+        publish(db.session(), chunk)
+    return dict(assigned)
+
+
+def team_workloads():
+    """Teams with their technicians and workloads, read from the workload index in one query."""
+    rows = db.session.query(MaintenanceTeam.id, MaintenanceTeam.name,
+                            Technician.id, Technician.name, Technician.email,
+                            TechnicianWorkload.open_requests, TechnicianWorkload.estimated_hours)\
+                     .outerjoin(TechnicianWorkload, TechnicianWorkload.team_id == MaintenanceTeam.id)\
+                     .outerjoin(Technician, Technician.id == TechnicianWorkload.technician_id)\
+                     .order_by(MaintenanceTeam.name, Technician.name)\
+                     .all()
+    teams = {}
+    for team_id, team_name, tech_id, tech_name, email, open_requests, hours in rows:
+        team = teams.setdefault(team_id, {'id': team_id, 'name': team_name, 'technicians': []})
+        if tech_id is not None:
+            team['technicians'].append({'id': tech_id, 'name': tech_name, 'email': email,
+                                        'open_requests': open_requests, 'estimated_hours': round(hours, 1)})
+    return list(teams.values())
+
+
+@job_queue.task('rebalance_assignments')
+def rebalance_job(job, reassign=False):
+    """Background rebalance; returns {team_id: requests (re)assigned}."""
+    return {str(team_id): count for team_id, count in rebalance(reassign).items()}
+
+
+@click.command('rebalance-assignments')
+@click.option('--reassign', is_flag=True, help="Also move unstarted requests that already have a technician.")
+@click.option('--dry-run', is_flag=True, help="Report what would move; write nothing.")
+@with_appcontext
+def rebalance_command(reassign, dry_run):
+    """Assign the unstarted backlog to the least-loaded technicians of each team."""
+    assigned = rebalance(reassign)
+    names = dict(db.session.query(MaintenanceTeam.id, MaintenanceTeam.name))
+    for team_id, count in sorted(assigned.items(), key=lambda item: names.get(item[0], '')):
+        click.echo(f"{names.get(team_id, team_id)}: {count} requests")
+    if dry_run:
+        db.session.rollback()
+        click.echo(f"[DRY RUN] {sum(assigned.values())} requests would be (re)assigned.")
+    else:
+        db.session.commit()
+        click.echo(f"[SUCCESS] {sum(assigned.values())} requests (re)assigned.")
+
+
+@click.command('rebuild-workload')
+@with_appcontext
+def rebuild_workload_command():
+    """Backfill the technician workload table from maintenance_request."""
+    rebuild_workload()
+    db.session.commit()
+    click.echo("[SUCCESS] Technician workload rebuilt.")
+
+
+def init_app(app):
+    """Hook technician inserts and register the CLI commands on the app."""
+    if not event.contains(Session, 'after_flush', _sync_technicians):
+        event.listen(Session, 'after_flush', _sync_technicians)
+    app.cli.add_command(rebalance_command)
+    app.cli.add_command(rebuild_workload_command)
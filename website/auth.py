@@ -83,7 +83,7 @@ def login():
         if user:
             login_user(user, remember=True)
             flash('Logged in successfully!', 'success')
-            return redirect(url_for('dashboard'))
+            return redirect(url_for('views.dashboard'))
         else:
             flash('Incorrect email or password.', 'error')
 
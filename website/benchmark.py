@@ -0,0 +1,518 @@
+"""
+Route-level benchmark suite.
+
+Seeds a dataset per size (see seed.run_bulk_seed), logs in through the auth
+blueprint and drives every page and JSON endpoint, reporting per route:
+throughput, p50/p95/p99/mean latency, error count and SQL queries per request.
+
+Modes:
+- 'client': requests go through the Flask test client, one at a time (no network).
+- 'http': the app is served by a threaded werkzeug server and hit by
+  --concurrency client threads over real HTTP connections.
+
+--startup measures worker startup instead (see startup_probe): cold import
+and create_app() time in fresh interpreters, and the first pages served by a
+worker forked from a cold master versus one forked after warm_up().
+
+Usage (from website/):
+    python benchmark.py --sizes small,medium --mode http --concurrency 8 --output bench.json
+    python benchmark.py --sizes small --baseline bench.json        # exit 1 on regression
+    python benchmark.py --sizes small --startup --startup-runs 5
+The database defaults to instance/benchmark.sqlite3; pass --database-url for
+PostgreSQL. It is dropped and reseeded for every size unless --no-seed is given.
+"""
+
+import argparse
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import threading
+import time
+import urllib.error
+import urllib.parse
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, datetime, timedelta
+from http.cookiejar import CookieJar
+
+from flask import g, has_request_context, request, request_started, request_finished
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+DEFAULT_DATABASE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'instance', 'benchmark.sqlite3')
+
+# Dataset presets passed to seed.run_bulk_seed
+SIZES = {
+    'small': {'requests': 2_000, 'equipment': 100, 'users': 50, 'technicians': 20},
+    'medium': {'requests': 100_000, 'equipment': 2_000, 'users': 500, 'technicians': 100},
+    'large': {'requests': 1_000_000, 'equipment': 20_000, 'users': 2_000, 'technicians': 500},
+}
+
+LOGIN = {'email': 'samarth@gear.com', 'password': '123'}
+
+# Pages a freshly forked worker serves in the startup benchmark, in order
+STARTUP_PAGES = ('/dashboard', '/maintenance_requests', '/equipment', '/work_centers', '/schedule')
+
+
+# ------------------------
+# Statistics
+# ------------------------
+def percentile(sorted_values, pct):
+    """Linear-interpolated percentile of an already sorted list."""
+    if not sorted_values:
+        return 0.0
+    rank = (len(sorted_values) - 1) * pct / 100.0
+    low = int(rank)
+    high = min(low + 1, len(sorted_values) - 1)
+    return sorted_values[low] + (sorted_values[high] - sorted_values[low]) * (rank - low)
+
+
+def summarize(latencies, errors, queries, wall_time):
+    """Route summary in milliseconds; `queries` is the per-request SQL count list."""
+    ordered = sorted(latencies)
+    count = len(ordered)
+    return {
+        'requests': count,
+        'errors': errors,
+        'throughput_rps': round(count / wall_time, 2) if wall_time else 0.0,
+        'p50_ms': round(percentile(ordered, 50) * 1000, 3),
+        'p95_ms': round(percentile(ordered, 95) * 1000, 3),
+        'p99_ms': round(percentile(ordered, 99) * 1000, 3),
+        'mean_ms': round(sum(ordered) / count * 1000, 3) if count else 0.0,
+        'queries_per_request': round(sum(queries) / len(queries), 2) if queries else None,
+    }
+
+
+# ------------------------
+# SQL query counting
+# ------------------------
+class QueryCounter:
+    """
+    Counts SQL statements per served request via engine events and Flask
+    signals, so it works for the test client and the threaded HTTP server alike.
+    """
+
+    def __init__(self, app):
+        self.app = app
+        self._counts = {}  # route key -> [query count per request]
+        self._lock = threading.Lock()
+        event.listen(Engine, 'after_cursor_execute', self._after_execute)
+        request_started.connect(self._started, app)
+        request_finished.connect(self._finished, app)
+
+    @staticmethod
+    def _after_execute(conn, cursor, statement, parameters, context, executemany):
+        if has_request_context() and 'bench_queries' in g:
+            g.bench_queries += 1
+
+    @staticmethod
+    def _started(sender, **extra):
+        g.bench_queries = 0
+
+    def _finished(self, sender, response, **extra):
+        key = request.headers.get('X-Benchmark-Route')
+        if key:
+            with self._lock:
+                self._counts.setdefault(key, []).append(g.pop('bench_queries', 0))
+
+    def take(self, key):
+        with self._lock:
+            return self._counts.pop(key, [])
+
+
+# ------------------------
+# Route plan
+# ------------------------
+def route_plan(app):
+    """
+    (name, method, path, json_body_factory) for every page and JSON endpoint.
+    Ids and cursors are read from the seeded database so every size works.
+    """
+    from models import db, MaintenanceRequest, Equipment
+    from pagination import encode_cursor
+
+    with app.app_context():
+        equipment_id = db.session.query(Equipment.id).order_by(Equipment.id).limit(1).scalar() or 1
+        newest = db.session.query(MaintenanceRequest.created_at, MaintenanceRequest.id)\
+                           .order_by(MaintenanceRequest.created_at.desc(), MaintenanceRequest.id.desc())\
+                           .offset(50).limit(1).first()
+        movable = db.session.query(MaintenanceRequest.id, MaintenanceRequest.version)\
+                            .filter(MaintenanceRequest.status.in_(('new', 'in_progress')))\
+                            .order_by(MaintenanceRequest.id).limit(400).all()
+    page2 = f"&cursor={encode_cursor(*newest)}" if newest else ''
+    month = date.today().replace(day=1)
+    window = f"start={month.isoformat()}&end={(month + timedelta(days=31)).replace(day=1).isoformat()}"
+
+    # Writes flip open requests between 'New Request' and 'In Progress' so the
+    # dataset stays comparable; single and batch moves use disjoint requests and
+    # the batch tracks versions so its moves pass the optimistic-locking check.
+    single_ids = [row.id for row in movable[::2]] or [0]
+    batch_versions = {row.id: row.version for row in movable[1::2]}
+    batch_ids = list(batch_versions) or [0]
+    lock = threading.Lock()
+    counters = {'single': 0, 'batch': 0}
+
+    def next_move(kind, ids):
+        i = counters[kind]
+        counters[kind] += 1
+        stage = 'In Progress' if (i // len(ids)) % 2 == 0 else 'New Request'
+        return ids[i % len(ids)], stage
+
+    def update_stage():
+        with lock:
+            task_id, stage = next_move('single', single_ids)
+        return {'task_id': task_id, 'new_stage': stage}
+
+    def update_stages():
+        moves = []
+        with lock:
+            for _ in range(min(10, len(batch_ids))):
+                task_id, stage = next_move('batch', batch_ids)
+                version = batch_versions.get(task_id, 0)
+                batch_versions[task_id] = version + 1
+                moves.append({'task_id': task_id, 'new_stage': stage, 'expected_version': version})
+        return {'moves': moves}
+
+    return [
+        ('dashboard', 'GET', '/dashboard', None),
+        ('dashboard_column', 'GET', '/api/dashboard/repaired?limit=50', None),
+        ('work_centers', 'GET', '/work_centers', None),
+        ('equipment', 'GET', '/equipment', None),
+        ('api_equipment', 'GET', '/api/equipment?sort=open_requests', None),
+        ('api_equipment_search', 'GET', '/api/equipment?q=cnc', None),
+        ('equipment_detail', 'GET', f'/equipment/{equipment_id}', None),
+        ('teams', 'GET', '/teams', None),
+        ('reporting', 'GET', '/reporting', None),
+        ('reliability', 'GET', '/api/analytics/reliability?group=work_center', None),
+        ('schedule', 'GET', '/schedule', None),
+        ('calendar_events', 'GET', f'/api/calendar-events?{window}', None),
+        ('maintenance_requests', 'GET', '/maintenance_requests', None),
+        ('maintenance_requests_filtered', 'GET', f'/maintenance_requests?status=repaired&equipment_id={equipment_id}', None),
+        ('api_maintenance_requests', 'GET', '/api/maintenance_requests?limit=50', None),
+        ('api_maintenance_requests_page2', 'GET', f'/api/maintenance_requests?limit=50{page2}', None),
+        ('search', 'GET', '/api/search?q=hydraulic%20pressure&limit=20', None),
+        ('search_filtered', 'GET', '/api/search?q=motor&status=new', None),
+        ('cache_stats', 'GET', '/api/cache/stats', None),
+        ('update_stage', 'POST', '/api/update_stage', update_stage),
+        ('update_stages', 'POST', '/api/update_stages', update_stages),
+    ]
+
+
+# ------------------------
+# Drivers
+# ------------------------
+class ClientDriver:
+    """Sequential requests through the Flask test client."""
+
+    concurrency = 1
+
+    def __init__(self, app):
+        self.client = app.test_client()
+        self.client.post('/login', data=LOGIN)
+
+    def request(self, name, method, path, body):
+        headers = {'X-Benchmark-Route': name}
+        started = time.perf_counter()
+        response = self.client.open(path, method=method, json=body, headers=headers)
+        elapsed = time.perf_counter() - started
+        return elapsed, response.status_code
+
+    def close(self):
+        pass
+
+
+class HTTPDriver:
+    """Concurrent requests against a threaded werkzeug server in this process."""
+
+    def __init__(self, app, concurrency):
+        from werkzeug.serving import make_server
+
+        self.concurrency = concurrency
+        self.server = make_server('127.0.0.1', 0, app, threaded=True)
+        self.base = f'http://127.0.0.1:{self.server.server_port}'
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self.thread.start()
+        self._local = threading.local()
+
+    def _opener(self):
+        # One logged-in cookie session per client thread
+        opener = getattr(self._local, 'opener', None)
+        if opener is None:
+            opener = urllib.request.build_opener(urllib.request.HTTPCookieProcessor(CookieJar()))
+            opener.open(self.base + '/login', urllib.parse.urlencode(LOGIN).encode()).read()
+            self._local.opener = opener
+        return opener
+
+    def request(self, name, method, path, body):
+        opener = self._opener()
+        headers = {'X-Benchmark-Route': name}
+        data = None
+        if body is not None:
+            data = json.dumps(body).encode()
+            headers['Content-Type'] = 'application/json'
+        req = urllib.request.Request(self.base + path, data=data, headers=headers, method=method)
+        started = time.perf_counter()
+        try:
+            with opener.open(req) as response:
+                response.read()
+                status = response.status
+        except urllib.error.HTTPError as e:
+            e.read()
+            status = e.code
+        return time.perf_counter() - started, status
+
+    def close(self):
+        self.server.shutdown()
+
+
+def run_route(driver, counter, route, iterations, warmup):
+    """Benchmark one route; returns its summary dict."""
+    name, method, path, body_factory = route
+    for _ in range(warmup):
+        driver.request(name, method, path, body_factory() if body_factory else None)
+    counter.take(name)
+
+    latencies, errors = [], 0
+    lock = threading.Lock()
+
+    def one(_):
+        nonlocal errors
+        elapsed, status = driver.request(name, method, path, body_factory() if body_factory else None)
+        with lock:
+            latencies.append(elapsed)
+            if status >= 400:
+                errors += 1
+
+    started = time.perf_counter()
+    if driver.concurrency > 1:
+        with ThreadPoolExecutor(max_workers=driver.concurrency) as pool:
+            list(pool.map(one, range(iterations)))
+    else:
+        for i in range(iterations):
+            one(i)
+    wall_time = time.perf_counter() - started
+    return summarize(latencies, errors, counter.take(name), wall_time)
+
+
+# ------------------------
+# Startup
+# ------------------------
+def _private_kb():
+    """Memory this process does not share with its parent (Linux; None elsewhere)."""
+    try:
+        with open('/proc/self/smaps_rollup') as f:
+            return sum(int(line.split()[1]) for line in f if line.startswith(('Private_Dirty', 'Private_Clean')))
+    except OSError:
+        return None
+
+
+def startup_probe(database_url, warm):
+    """
+    Run in a fresh interpreter (--startup-probe): time importing the app and
+    create_app(), optionally warm_up(), then fork a worker that logs in and
+    serves STARTUP_PAGES. Returns timings in milliseconds and the worker's
+    private memory, i.e. what it did not share with the master.
+    """
+    started = time.perf_counter()
+    import app as app_module
+    imported = time.perf_counter()
+    app = app_module.create_app(SQLALCHEMY_DATABASE_URI=database_url)
+    created = time.perf_counter()
+    warm_s = app_module.warm_up(app) if warm else 0.0
+
+    read_fd, write_fd = os.pipe()
+    forked = time.perf_counter()
+    pid = os.fork()
+    if pid == 0:
+        os.close(read_fd)
+        client = app.test_client()
+        client.post('/login', data=LOGIN)
+        pages = {}
+        for path in STARTUP_PAGES:
+            t = time.perf_counter()
+            status = client.get(path).status_code
+            pages[path] = round((time.perf_counter() - t) * 1000, 2) if status == 200 else None
+        report = {'first_response_ms': round((time.perf_counter() - forked) * 1000, 2), 'pages_ms': pages,
+                  'worker_private_kb': _private_kb()}
+        with os.fdopen(write_fd, 'w') as f:
+            json.dump(report, f)
+        os._exit(0)
+    os.close(write_fd)
+    with os.fdopen(read_fd) as f:
+        report = json.load(f)
+    os.waitpid(pid, 0)
+    return dict(report, import_ms=round((imported - started) * 1000, 2),
+                create_app_ms=round((created - imported) * 1000, 2), warm_up_ms=round(warm_s * 1000, 2))
+
+
+def run_startup(database_url, runs):
+    """Median startup_probe results over `runs` fresh interpreters, for a cold and a warmed master."""
+    results = {}
+    for variant in ('cold', 'warm'):
+        probes = []
+        for _ in range(runs):
+            output = subprocess.run([sys.executable, os.path.abspath(__file__), '--startup-probe', variant,
+                                     '--database-url', database_url],
+                                    check=True, capture_output=True, text=True).stdout
+            probes.append(json.loads(output.strip().splitlines()[-1]))
+        summary = {key: statistics.median(p[key] for p in probes)
+                   for key in ('import_ms', 'create_app_ms', 'warm_up_ms', 'first_response_ms')}
+        summary['pages_ms'] = {path: statistics.median(p['pages_ms'][path] or 0 for p in probes)
+                               for path in STARTUP_PAGES}
+        memory = [p['worker_private_kb'] for p in probes if p['worker_private_kb'] is not None]
+        summary['worker_private_kb'] = statistics.median(memory) if memory else None
+        results[variant] = summary
+    return results
+
+
+def print_startup(startup):
+    print("\n== startup (median, ms) ==")
+    print(f"{'master':8} {'import':>9} {'create':>9} {'warm_up':>9} {'worker total':>13} {'private KB':>11}")
+    for variant, r in startup.items():
+        memory = '-' if r['worker_private_kb'] is None else f"{r['worker_private_kb']:,.0f}"
+        print(f"{variant:8} {r['import_ms']:9.1f} {r['create_app_ms']:9.1f} {r['warm_up_ms']:9.1f}"
+              f" {r['first_response_ms']:13.1f} {memory:>11}")
+    print(f"{'page':24} {'cold':>9} {'warm':>9}")
+    for path in STARTUP_PAGES:
+        print(f"{path:24} {startup['cold']['pages_ms'][path]:9.1f} {startup['warm']['pages_ms'][path]:9.1f}")
+
+
+# ------------------------
+# Comparison
+# ------------------------
+def compare(results, baseline, tolerance, min_delta_ms):
+    """
+    Return a list of regression messages: p95 latency worse than the baseline by
+    more than `tolerance` (fraction) and `min_delta_ms`, or more SQL queries per request.
+    """
+    regressions = []
+    for size, routes in results['results'].items():
+        for name, current in routes.items():
+            previous = baseline.get('results', {}).get(size, {}).get(name)
+            if not previous:
+                continue
+            delta = current['p95_ms'] - previous['p95_ms']
+            if delta > min_delta_ms and current['p95_ms'] > previous['p95_ms'] * (1 + tolerance):
+                regressions.append(f"{size}/{name}: p95 {previous['p95_ms']:.2f}ms -> {current['p95_ms']:.2f}ms")
+            if (current['queries_per_request'] or 0) > (previous['queries_per_request'] or 0):
+                regressions.append(f"{size}/{name}: queries/request {previous['queries_per_request']}"
+                                   f" -> {current['queries_per_request']}")
+            if current['errors'] > previous['errors']:
+                regressions.append(f"{size}/{name}: errors {previous['errors']} -> {current['errors']}")
+    return regressions
+
+
+def print_table(size, routes):
+    print(f"\n== {size} ==")
+    print(f"{'route':34} {'rps':>9} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'queries':>8} {'errors':>7}")
+    for name, r in routes.items():
+        queries = '-' if r['queries_per_request'] is None else f"{r['queries_per_request']:g}"
+        print(f"{name:34} {r['throughput_rps']:9.1f} {r['p50_ms']:9.2f} {r['p95_ms']:9.2f}"
+              f" {r['p99_ms']:9.2f} {queries:>8} {r['errors']:7d}")
+
+
+# ------------------------
+# Entry point
+# ------------------------
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark GearGuard routes across dataset sizes.")
+    parser.add_argument('--sizes', default='small', help=f"comma separated: {', '.join(SIZES)}")
+    parser.add_argument('--mode', choices=('client', 'http'), default='client')
+    parser.add_argument('--concurrency', type=int, default=8, help="client threads in http mode")
+    parser.add_argument('--iterations', type=int, default=100, help="measured requests per route")
+    parser.add_argument('--warmup', type=int, default=5, help="unmeasured requests per route")
+    parser.add_argument('--routes', help="comma separated route names to run (default: all)")
+    parser.add_argument('--database-url', help=f"default: sqlite:///{DEFAULT_DATABASE}")
+    parser.add_argument('--no-seed', action='store_true', help="benchmark the existing data as is")
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--output', help="write results as JSON to this file")
+    parser.add_argument('--baseline', help="results JSON to compare against; exit 1 on regression")
+    parser.add_argument('--tolerance', type=float, default=0.25, help="allowed p95 slowdown (fraction)")
+    parser.add_argument('--min-delta-ms', type=float, default=2.0, help="ignore p95 changes below this")
+    parser.add_argument('--startup', action='store_true', help="measure worker startup instead of routes")
+    parser.add_argument('--startup-runs', type=int, default=5, help="fresh interpreters per startup variant")
+    parser.add_argument('--startup-probe', choices=('cold', 'warm'), help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    if args.startup_probe:
+        print(json.dumps(startup_probe(args.database_url, args.startup_probe == 'warm')))
+        return 0
+
+    sizes = [s.strip() for s in args.sizes.split(',') if s.strip()]
+    unknown = [s for s in sizes if s not in SIZES]
+    if unknown:
+        parser.error(f"unknown size(s): {', '.join(unknown)}")
+
+    database_url = args.database_url
+    if not database_url:
+        os.makedirs(os.path.dirname(DEFAULT_DATABASE), exist_ok=True)
+        database_url = f'sqlite:///{DEFAULT_DATABASE}'
+
+    from app import create_app
+    from models import db
+    from cache import cache
+    import seed
+
+    app = create_app(SQLALCHEMY_DATABASE_URI=database_url)
+
+    counter = QueryCounter(app)
+    wanted = set(args.routes.split(',')) if args.routes else None
+    results = {
+        'meta': {
+            'timestamp': datetime.utcnow().isoformat(timespec='seconds'),
+            'mode': args.mode,
+            'concurrency': args.concurrency if args.mode == 'http' else 1,
+            'iterations': args.iterations,
+            'python': platform.python_version(),
+            'seed': args.seed,
+        },
+        'results': {},
+    }
+    with app.app_context():
+        results['meta']['database'] = db.engine.dialect.name
+
+    if args.startup:
+        if not args.no_seed:
+            seed.run_bulk_seed(seed=args.seed, app=app, **SIZES[sizes[0]])
+        results['startup'] = run_startup(database_url, args.startup_runs)
+        print_startup(results['startup'])
+        sizes = []
+
+    for size in sizes:
+        if not args.no_seed:
+            seed.run_bulk_seed(seed=args.seed, app=app, **SIZES[size])
+        cache.clear()
+        driver = HTTPDriver(app, args.concurrency) if args.mode == 'http' else ClientDriver(app)
+        try:
+            routes = {}
+            for route in route_plan(app):
+                if wanted is None or route[0] in wanted:
+                    routes[route[0]] = run_route(driver, counter, route, args.iterations, args.warmup)
+        finally:
+            driver.close()
+        results['results'][size] = routes
+        print_table(size, routes)
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=2)
+        print(f"\nResults written to {args.output}")
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        regressions = compare(results, baseline, args.tolerance, args.min_delta_ms)
+        if regressions:
+            print("\nREGRESSIONS:")
+            for line in regressions:
+                print(f"  {line}")
+            return 1
+        print("\nNo regressions against the baseline.")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,281 @@
+"""
+Read-through cache for read-heavy pages.
+
+Query results (plain dicts/lists, never ORM objects) are cached per route and
+parameters with LRU + TTL eviction. Entries carry model tags; committing a
+session that wrote a tagged model evicts every entry depending on it.
+
+Backends (config CACHE_TYPE):
+- 'memory': in-process OrderedDict, fastest, private to each worker.
+- 'sqlite': a local SQLite file shared by all workers on the host, so a write
+  in one worker invalidates the cached pages of all of them.
+- 'null': caching disabled.
+Other settings: CACHE_DEFAULT_TIMEOUT (seconds), CACHE_MAX_ENTRIES, CACHE_SQLITE_PATH.
+"""
+
+import os
+import pickle
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from functools import wraps
+
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+from changes import request_changes
+
+
+class NullBackend:
+    """Backend that never stores anything."""
+
+    def get(self, key):
+        return None
+
+    def set(self, key, value, ttl, tags):
+        pass
+
+    def delete(self, key):
+        pass
+
+    def evict_tags(self, tags):
+        return 0
+
+    def clear(self):
+        pass
+
+    def __len__(self):
+        return 0
+
+
+class MemoryBackend:
+    """Thread-safe in-process LRU with per-entry expiry."""
+
+    def __init__(self, max_entries=1024):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()  # key -> (expires_at, tags, value)
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        """Return (value,) on a hit or None on a miss, refreshing LRU order."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            if entry[0] < time.monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return (entry[2],)
+
+    def set(self, key, value, ttl, tags):
+        with self._lock:
+            self._entries[key] = (time.monotonic() + ttl, frozenset(tags), value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def delete(self, key):
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def evict_tags(self, tags):
+        """Drop every entry tagged with any of `tags`; returns the number evicted."""
+        tags = set(tags)
+        with self._lock:
+            stale = [key for key, entry in self._entries.items() if entry[1] & tags]
+            for key in stale:
+                del self._entries[key]
+        return len(stale)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self):
+        return len(self._entries)
+
+
+class SQLiteBackend:
+    """LRU + TTL cache stored in a local SQLite file, shared across processes."""
+
+    def __init__(self, path, max_entries=1024):
+        self.path = path
+        self.max_entries = max_entries
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS cache_entry ("
+                " key TEXT PRIMARY KEY, value BLOB NOT NULL, tags TEXT NOT NULL,"
+                " expires_at REAL NOT NULL, last_access REAL NOT NULL)")
+            conn.execute("CREATE INDEX IF NOT EXISTS ix_cache_entry_last_access ON cache_entry (last_access)")
+
+    def _connect(self):
+        # A short-lived connection per call keeps the backend thread- and fork-safe
+        return sqlite3.connect(self.path, timeout=5)
+
+    def get(self, key):
+        now = time.time()
+        with self._connect() as conn:
+            row = conn.execute("SELECT value, expires_at FROM cache_entry WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                return None
+            if row[1] < now:
+                conn.execute("DELETE FROM cache_entry WHERE key = ?", (key,))
+                return None
+            conn.execute("UPDATE cache_entry SET last_access = ? WHERE key = ?", (now, key))
+        return (pickle.loads(row[0]),)
+
+    def set(self, key, value, ttl, tags):
+        now = time.time()
+        tag_text = '|' + '|'.join(sorted(tags)) + '|'
+        with self._connect() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO cache_entry (key, value, tags, expires_at, last_access)"
+                " VALUES (?, ?, ?, ?, ?)",
+                (key, pickle.dumps(value, pickle.HIGHEST_PROTOCOL), tag_text, now + ttl, now))
+            overflow = conn.execute("SELECT COUNT(*) FROM cache_entry").fetchone()[0] - self.max_entries
+            if overflow > 0:
+                conn.execute(
+                    "DELETE FROM cache_entry WHERE key IN"
+                    " (SELECT key FROM cache_entry ORDER BY expires_at < ? DESC, last_access LIMIT ?)",
+                    (now, overflow))
+
+    def delete(self, key):
+        with self._connect() as conn:
+            conn.execute("DELETE FROM cache_entry WHERE key = ?", (key,))
+
+    def evict_tags(self, tags):
+        evicted = 0
+        with self._connect() as conn:
+            for tag in tags:
+                evicted += conn.execute("DELETE FROM cache_entry WHERE tags LIKE ?", (f'%|{tag}|%',)).rowcount
+        return evicted
+
+    def clear(self):
+        with self._connect() as conn:
+            conn.execute("DELETE FROM cache_entry")
+
+    def __len__(self):
+        with self._connect() as conn:
+            return conn.execute("SELECT COUNT(*) FROM cache_entry").fetchone()[0]
+
+
+class Cache:
+    """Cache front-end: key building, hit/miss statistics and model-tag invalidation."""
+
+    def __init__(self):
+        self.backend = NullBackend()
+        self.default_timeout = 300
+        self._stats = {'hits': 0, 'misses': 0, 'sets': 0, 'invalidations': 0, 'evicted': 0}
+        self._stats_lock = threading.Lock()
+
+    def init_app(self, app):
+        """Configure the backend from app.config and hook session events."""
+        cache_type = app.config.get('CACHE_TYPE', 'memory')
+        max_entries = app.config.get('CACHE_MAX_ENTRIES', 1024)
+        self.default_timeout = app.config.get('CACHE_DEFAULT_TIMEOUT', 300)
+        if cache_type == 'memory':
+            self.backend = MemoryBackend(max_entries)
+        elif cache_type == 'sqlite':
+            path = app.config.get('CACHE_SQLITE_PATH') or os.path.join(app.instance_path, 'cache.sqlite3')
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            self.backend = SQLiteBackend(path, max_entries)
+        elif cache_type == 'null':
+            self.backend = NullBackend()
+        else:
+            raise ValueError(f"Unknown CACHE_TYPE: {cache_type!r}")
+
+        if not event.contains(Session, 'after_flush', _collect_dirty_models):
+            event.listen(Session, 'after_flush', _collect_dirty_models)
+            event.listen(Session, 'after_commit', _evict_committed)
+            event.listen(Session, 'after_soft_rollback', _forget_dirty_models)
+            request_changes.connect(_collect_bulk_request_changes)
+
+    def _count(self, name, amount=1):
+        with self._stats_lock:
+            self._stats[name] += amount
+
+    @staticmethod
+    def make_key(route, **params):
+        """Stable key for a route and its parameters, e.g. 'teams' or 'reporting?month=2026-10'."""
+        if not params:
+            return route
+        return route + '?' + '&'.join(f'{k}={params[k]}' for k in sorted(params))
+
+    def get_or_set(self, key, loader, tags=(), timeout=None):
+        """Return the cached value for `key`, calling `loader()` to fill it on a miss."""
+        hit = self.backend.get(key)
+        if hit is not None:
+            self._count('hits')
+            return hit[0]
+        self._count('misses')
+        value = loader()
+        self.backend.set(key, value, timeout or self.default_timeout, tags)
+        self._count('sets')
+        return value
+
+    def cached(self, route, tags=(), timeout=None):
+        """
+        Decorator for page data loaders. Keyword arguments of the loader become
+        key parameters, so every distinct parameter set is cached separately.
+        """
+        def decorator(loader):
+            @wraps(loader)
+            def wrapper(**params):
+                key = self.make_key(route, **params)
+                return self.get_or_set(key, lambda: loader(**params), tags, timeout)
+            return wrapper
+        return decorator
+
+    def invalidate(self, tags):
+        """Evict every entry depending on any of the given model tags."""
+        if tags:
+            self._count('invalidations')
+            self._count('evicted', self.backend.evict_tags(tags))
+
+    def clear(self):
+        self.backend.clear()
+
+    def stats(self):
+        """Hit/miss counters for this process plus the current backend size."""
+        with self._stats_lock:
+            stats = dict(self._stats)
+        lookups = stats['hits'] + stats['misses']
+        stats['hit_ratio'] = round(stats['hits'] / lookups, 3) if lookups else 0.0
+        stats['backend'] = type(self.backend).__name__
+        stats['entries'] = len(self.backend)
+        return stats
+
+
+cache = Cache()
+
+
+# ------------------------
+# Write-driven invalidation
+# ------------------------
+def _dirty_tags(session):
+    return session.info.setdefault('cache_dirty_tags', set())
+
+
+def _collect_dirty_models(session, flush_context):
+    """Remember which model classes this transaction wrote."""
+    tags = _dirty_tags(session)
+    for obj in list(session.new) + list(session.dirty) + list(session.deleted):
+        tags.add(type(obj).__name__)
+
+
+def _collect_bulk_request_changes(session, changes):
+    """Bulk request updates bypass the unit of work; tag them explicitly."""
+    _dirty_tags(session).add('MaintenanceRequest')
+
+
+def _evict_committed(session):
+    tags = session.info.pop('cache_dirty_tags', None)
+    if tags:
+        cache.invalidate(tags)
+
+
+def _forget_dirty_models(session, previous_transaction):
+    session.info.pop('cache_dirty_tags', None)
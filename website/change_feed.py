@@ -0,0 +1,354 @@
+"""
+Live change feed for the Kanban board.
+
+Open dashboards subscribe to a Server-Sent Events stream instead of reloading
+the page to see other people's moves. Every committed create, status change or
+delete of a MaintenanceRequest becomes one small card event that is fanned out
+to all subscribers:
+- created: id, status, version and the rendered card markup (rendered once,
+  not once per board)
+- moved: id, old_status, status, version
+- deleted: id, old_status
+- resync: the board should reload (bulk writes, missed events, overflow)
+Events are collected from the `request_changes` signal (see changes.py) while
+the transaction is open and published only once it commits.
+
+Backends (config CHANGE_FEED_BACKEND):
+- 'memory': in-process pub/sub; boards only see writes made by the same worker.
+- 'postgres': events are sent with NOTIFY inside the writing transaction (so
+  PostgreSQL delivers them only on commit) and every worker LISTENs and fans
+  them out to its own subscribers.
+- 'null': feed disabled.
+Other settings: CHANGE_FEED_CHANNEL, CHANGE_FEED_HISTORY (events kept for
+Last-Event-ID replay), CHANGE_FEED_QUEUE_SIZE, CHANGE_FEED_MAX_SUBSCRIBERS,
+CHANGE_FEED_KEEPALIVE and CHANGE_FEED_MAX_STREAM_SECONDS (seconds).
+Each stream holds a worker thread, so serve with a threaded or async worker.
+"""
+
+import json
+import logging
+import queue
+import select as select_module
+import threading
+import time
+import uuid
+from collections import deque, namedtuple
+
+from flask import has_app_context, render_template
+from sqlalchemy import event, select, text
+from sqlalchemy.orm import Session
+
+from changes import request_changes
+from models import db, MaintenanceRequest, Equipment, Technician
+
+logger = logging.getLogger(__name__)
+
+# Larger transactions (imports, bulk moves) tell boards to reload instead
+MAX_EVENTS_PER_COMMIT = 200
+# PostgreSQL rejects NOTIFY payloads of 8000 bytes or more
+MAX_NOTIFY_PAYLOAD = 7900
+
+# Minimal stand-ins for what kanban_cards.html reads from a request
+_Card = namedtuple('_Card', 'id version description equipment technician')
+_Named = namedtuple('_Named', 'name')
+
+
+class Subscription:
+    """One connected board: a bounded queue of (event id, event) pairs."""
+
+    def __init__(self, size):
+        self.queue = queue.Queue(maxsize=size)
+        self.overflowed = False
+
+    def push(self, item):
+        """Queue an event; a board that falls this far behind is told to resync."""
+        if self.overflowed:
+            return
+        try:
+            self.queue.put_nowait(item)
+        except queue.Full:
+            self.overflowed = True
+
+    def get(self, timeout):
+        """Next (event id, event), or None after `timeout` seconds without one."""
+        if self.overflowed:
+            return None, {'type': 'resync'}
+        try:
+            return self.queue.get(timeout=timeout)
+        except queue.Empty:
+            return None
+
+
+class ChangeFeed:
+    """Fan-out of card events to the dashboards connected to this worker."""
+
+    def __init__(self):
+        self.backend = 'null'
+        self.channel = 'gearguard_changes'
+        self.queue_size = 256
+        self.max_subscribers = 500
+        self.keepalive = 15
+        self.max_stream_seconds = 600
+        # Event ids are "<stream>:<seq>"; the stream id changes with every process,
+        # so a Last-Event-ID from another worker triggers a resync instead of a bad replay
+        self.stream_id = uuid.uuid4().hex[:8]
+        self._seq = 0
+        self._history = deque(maxlen=1000)
+        self._subscribers = set()
+        self._lock = threading.Lock()
+        self._listener = None
+        self._app = None
+        self._stats = {'published': 0, 'delivered': 0, 'overflows': 0}
+
+    def init_app(self, app):
+        self.backend = app.config.get('CHANGE_FEED_BACKEND', 'memory')
+        if self.backend not in ('memory', 'postgres', 'null'):
+            raise ValueError(f"Unknown CHANGE_FEED_BACKEND: {self.backend!r}")
+        self.channel = app.config.get('CHANGE_FEED_CHANNEL', 'gearguard_changes')
+        self.queue_size = app.config.get('CHANGE_FEED_QUEUE_SIZE', 256)
+        self.max_subscribers = app.config.get('CHANGE_FEED_MAX_SUBSCRIBERS', 500)
+        self.keepalive = app.config.get('CHANGE_FEED_KEEPALIVE', 15)
+        self.max_stream_seconds = app.config.get('CHANGE_FEED_MAX_STREAM_SECONDS', 600)
+        self._history = deque(maxlen=app.config.get('CHANGE_FEED_HISTORY', 1000))
+        self._app = app
+
+        if not event.contains(Session, 'after_commit', _publish_committed):
+            request_changes.connect(_collect_card_events)
+            event.listen(Session, 'after_commit', _publish_committed)
+            event.listen(Session, 'after_soft_rollback', _forget_card_events)
+
+    @property
+    def enabled(self):
+        return self.backend != 'null'
+
+    @property
+    def active(self):
+        """
+        Whether writes need to produce events: with the memory backend only
+        while someone is listening; with NOTIFY always, for other workers.
+        """
+        return self.backend == 'postgres' or (self.backend == 'memory' and bool(self._subscribers))
+
+    # ------------------------
+    # Publishing
+    # ------------------------
+    def publish(self, events):
+        """Number the events and hand them to every subscriber of this worker."""
+        with self._lock:
+            numbered = []
+            for item in events:
+                self._seq += 1
+                numbered.append((f'{self.stream_id}:{self._seq}', item))
+            self._history.extend(numbered)
+            subscribers = list(self._subscribers)
+            self._stats['published'] += len(numbered)
+            self._stats['delivered'] += len(numbered) * len(subscribers)
+        for subscription in subscribers:
+            for item in numbered:
+                subscription.push(item)
+
+    def notify(self, conn, events):
+        """Send events with NOTIFY on the writing connection (delivered on commit)."""
+        for item in events:
+            payload = json.dumps(item, separators=(',', ':'))
+            if len(payload) > MAX_NOTIFY_PAYLOAD and 'html' in item:
+                # Boards without the markup still update their counters
+                payload = json.dumps(dict(item, html=None), separators=(',', ':'))
+            conn.execute(text("SELECT pg_notify(:channel, :payload)"),
+                         {'channel': self.channel, 'payload': payload})
+
+    # ------------------------
+    # Subscribing
+    # ------------------------
+    def subscribe(self, last_event_id=None):
+        """
+        Register a board and return its Subscription, or None when the worker
+        already serves CHANGE_FEED_MAX_SUBSCRIBERS streams. Events after
+        `last_event_id` (an EventSource reconnect) are replayed when still in
+        history; otherwise the board is told to resync.
+        """
+        if self.backend == 'postgres':
+            self._ensure_listener()
+        subscription = Subscription(self.queue_size)
+        with self._lock:
+            if len(self._subscribers) >= self.max_subscribers:
+                return None
+            if last_event_id:
+                missed = self._replay(last_event_id)
+                if missed is None:
+                    subscription.push((None, {'type': 'resync'}))
+                else:
+                    for item in missed:
+                        subscription.push(item)
+            self._subscribers.add(subscription)
+        return subscription
+
+    def _replay(self, last_event_id):
+        """Events published after `last_event_id`, or None if they can't be recovered."""
+        stream, _, seq = last_event_id.partition(':')
+        if stream != self.stream_id or not seq.isdigit():
+            return None
+        seq = int(seq)
+        if seq == self._seq:
+            return []
+        oldest = int(self._history[0][0].partition(':')[2]) if self._history else self._seq + 1
+        if seq < oldest - 1 or seq > self._seq:
+            return None
+        return [item for item in self._history if int(item[0].partition(':')[2]) > seq]
+
+    def unsubscribe(self, subscription):
+        with self._lock:
+            self._subscribers.discard(subscription)
+            if subscription.overflowed:
+                self._stats['overflows'] += 1
+
+    def stream(self, subscription):
+        """
+        Server-Sent Events frames for one subscription. Sends a keepalive
+        comment when idle and ends after CHANGE_FEED_MAX_STREAM_SECONDS so worker
+        threads are recycled; EventSource reconnects with Last-Event-ID.
+        """
+        deadline = time.monotonic() + self.max_stream_seconds
+        try:
+            yield 'retry: 3000\n\n'
+            while time.monotonic() < deadline:
+                item = subscription.get(self.keepalive)
+                if item is None:
+                    yield ': keepalive\n\n'
+                    continue
+                event_id, payload = item
+                lines = [f'id: {event_id}'] if event_id else []
+                lines.append(f"event: {payload['type']}")
+                lines.append('data: ' + json.dumps(payload, separators=(',', ':')))
+                yield '\n'.join(lines) + '\n\n'
+                if payload['type'] == 'resync':
+                    return
+        finally:
+            self.unsubscribe(subscription)
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self._stats)
+            stats['subscribers'] = len(self._subscribers)
+        stats['backend'] = self.backend
+        return stats
+
+    # ------------------------
+    # PostgreSQL LISTEN
+    # ------------------------
+    def _ensure_listener(self):
+        with self._lock:
+            if self._listener is not None and self._listener.is_alive():
+                return
+            self._listener = threading.Thread(target=self._listen, name='change-feed-listener', daemon=True)
+            self._listener.start()
+
+    def _listen(self):
+        """Relay NOTIFY payloads to local subscribers, reconnecting with backoff."""
+        delay = 1
+        while True:
+            try:
+                with self._app.app_context():
+                    raw = db.engine.raw_connection()
+                # A dedicated connection: it never goes back to the pool
+                raw.detach()
+                connection = raw.driver_connection
+                connection.autocommit = True
+                with connection.cursor() as cursor:
+                    cursor.execute(f'LISTEN "{self.channel}"')
+                delay = 1
+                while True:
+                    if select_module.select([connection], [], [], self.keepalive) == ([], [], []):
+                        continue
+                    connection.poll()
+                    events = []
+                    while connection.notifies:
+                        events.append(json.loads(connection.notifies.pop(0).payload))
+                    if events:
+                        self.publish(events)
+            except Exception:
+                logger.exception("Change feed listener lost its connection; retrying in %ss", delay)
+                # Events may have been missed while disconnected
+                self.publish([{'type': 'resync'}])
+                time.sleep(delay)
+                delay = min(delay * 2, 30)
+
+
+change_feed = ChangeFeed()
+
+
+# ------------------------
+# Collecting events from request writes
+# ------------------------
+def _card_markup(conn, requests):
+    """Render the card of each new request once, keyed by id (needs an app context)."""
+    if not has_app_context():
+        return {}
+    rows = conn.execute(
+        select(MaintenanceRequest.id, MaintenanceRequest.version, MaintenanceRequest.description,
+               Equipment.name, Technician.name)
+        .outerjoin(Equipment, Equipment.id == MaintenanceRequest.equipment_id)
+        .outerjoin(Technician, Technician.id == MaintenanceRequest.technician_id)
+        .where(MaintenanceRequest.id.in_(list(requests)))).all()
+    markup = {}
+    for req_id, version, description, equipment, technician in rows:
+        card = _Card(req_id, version, description, _Named(equipment),
+                     _Named(technician) if technician else None)
+        markup[req_id] = render_template('kanban_cards.html', reqs=[card], status=requests[req_id]).strip()
+    return markup
+
+
+def card_events(changes):
+    """Translate RequestChange records into board events (other field edits are ignored)."""
+    events = []
+    for change in changes:
+        old, new = change.old, change.new
+        if old is None:
+            events.append({'type': 'created', 'id': change.request_id, 'status': new.status,
+                           'version': new.version})
+        elif new is None:
+            events.append({'type': 'deleted', 'id': change.request_id, 'old_status': old.status})
+        elif old.status != new.status:
+            events.append({'type': 'moved', 'id': change.request_id, 'old_status': old.status,
+                           'status': new.status, 'version': new.version})
+    return events
+
+
+def _collect_card_events(session, changes):
+    """Signal receiver: turn this flush's request changes into pending card events."""
+    if not change_feed.active:
+        return
+    pending = session.info.setdefault('change_feed_events', [])
+    if pending and pending[-1]['type'] == 'resync':
+        return
+    events = card_events(changes)
+    if not events:
+        return
+    if len(pending) + len(events) > MAX_EVENTS_PER_COMMIT:
+        events = [{'type': 'resync'}]
+    else:
+        conn = session.connection()
+        created = {e['id']: e['status'] for e in events if e['type'] == 'created'}
+        if created:
+            markup = _card_markup(conn, created)
+            for item in events:
+                if item['type'] == 'created':
+                    item['html'] = markup.get(item['id'])
+    if change_feed.backend == 'postgres':
+        change_feed.notify(session.connection(), events)
+        # Remember the count only, so the per-commit limit still applies
+        pending.extend({'type': item['type']} for item in events)
+    elif events[0]['type'] == 'resync':
+        pending[:] = events
+    else:
+        pending.extend(events)
+
+
+def _publish_committed(session):
+    events = session.info.pop('change_feed_events', None)
+    if events and change_feed.backend == 'memory':
+        change_feed.publish(events)
+
+
+def _forget_card_events(session, previous_transaction):
+    session.info.pop('change_feed_events', None)
@@ -0,0 +1,92 @@
+"""
+Change notifications for maintenance requests.
+
+Derived data (reporting rollups and friends) has to follow every write to
+MaintenanceRequest, whether it goes through the ORM unit of work or through a
+bulk UPDATE such as the Kanban batch endpoint. Both paths describe their writes
+as RequestChange records and send them through the `request_changes` signal
+while the writing transaction is still open, so receivers can update their own
+tables atomically via session.connection().
+"""
+
+from collections import namedtuple
+
+from blinker import Namespace
+from sqlalchemy import event, inspect
+from sqlalchemy.orm import Session
+from sqlalchemy.orm.base import NO_VALUE
+
+from models import MaintenanceRequest
+
+# Columns receivers care about; old values are captured for each of them
+TRACKED_FIELDS = ('status', 'equipment_id', 'team_id', 'technician_id', 'created_at', 'duration_hours',
+                  'estimated_hours', 'version')
+
+RequestState = namedtuple('RequestState', TRACKED_FIELDS)
+# old is None for inserts, new is None for deletes
+RequestChange = namedtuple('RequestChange', 'request_id old new')
+
+_signals = Namespace()
+request_changes = _signals.signal('request-changes')
+
+
+def state_of(req):
+    """Current tracked values of a MaintenanceRequest instance."""
+    return RequestState(*(getattr(req, field) for field in TRACKED_FIELDS))
+
+
+def state_from_row(row):
+    """Build a RequestState from any row/mapping exposing the tracked columns."""
+    return RequestState(*(getattr(row, field) for field in TRACKED_FIELDS))
+
+
+def _previous_state(req):
+    """Tracked values as they were before the current flush."""
+    attrs = inspect(req).attrs
+    values = []
+    for field in TRACKED_FIELDS:
+        history = attrs[field].history
+        values.append(history.deleted[0] if history.deleted else getattr(req, field))
+    return RequestState(*values)
+
+
+def _deleted_state(req):
+    attrs = inspect(req).attrs
+    return RequestState(*(None if attrs[f].loaded_value is NO_VALUE else attrs[f].loaded_value
+                          for f in TRACKED_FIELDS))
+
+
+def publish(session, changes):
+    """Send a batch of RequestChange records to all receivers."""
+    if changes:
+        request_changes.send(session, changes=changes)
+
+
+@event.listens_for(Session, 'after_flush')
+def _collect_request_changes(session, flush_context):
+    """Translate the ORM unit of work into RequestChange records."""
+    changes = []
+    for obj in session.new:
+        if isinstance(obj, MaintenanceRequest):
+            changes.append(RequestChange(obj.id, None, state_of(obj)))
+    for obj in session.dirty:
+        if isinstance(obj, MaintenanceRequest) and session.is_modified(obj):
+            old, new = _previous_state(obj), state_of(obj)
+            if old != new:
+                changes.append(RequestChange(obj.id, old, new))
+    for obj in session.deleted:
+        if isinstance(obj, MaintenanceRequest):
+            changes.append(RequestChange(obj.id, _deleted_state(obj), None))
+    publish(session, changes)
+
+
+def _keep_old_value(target, value, oldvalue, initiator):
+    return value
+
+
+# Make the ORM load the previous value on assignment so history is always complete,
+# even for instances whose attributes were expired by an earlier commit
+for _field in TRACKED_FIELDS:
+    if _field != 'version':
+        event.listen(getattr(MaintenanceRequest, _field), 'set', _keep_old_value,
+                     active_history=True, retval=True)
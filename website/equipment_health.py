@@ -0,0 +1,191 @@
+"""
+Precomputed equipment health.
+
+One EquipmentHealth row per machine holds its open / in-progress / scrap
+request counts, the newest request (last failure) and the resulting state, so
+the equipment list can show, filter and sort by health without touching
+maintenance_request.
+- Every RequestChange (see changes.py) becomes per-machine deltas applied with
+  one upsert inside the writing transaction; the state is recomputed in the
+  same statement.
+- New Equipment gets an 'active' row when it is flushed (bulk inserts call
+  create_health_rows themselves).
+- rebuild_health: recompute everything from scratch (backfill / repair, bulk
+  loads), archived requests included like the last failure recomputed on delete.
+"""
+
+from collections import defaultdict
+
+import click
+from flask.cli import with_appcontext
+from sqlalchemy import event, func, select, case
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.orm import Session
+
+from models import db, Equipment, EquipmentHealth
+from changes import request_changes
+import archive
+
+OPEN_STATUSES = ('new', 'in_progress')
+STATES = ('active', 'maintenance', 'scrapped')
+
+
+def _state_expr(open_requests, scrap_requests):
+    """SQL expression deriving the health state from the counters."""
+    return case((scrap_requests > 0, 'scrapped'),
+                (open_requests > 0, 'maintenance'),
+                else_='active')
+
+
+def _state(open_requests, scrap_requests):
+    """Python twin of _state_expr for freshly inserted rows."""
+    if scrap_requests > 0:
+        return 'scrapped'
+    return 'maintenance' if open_requests > 0 else 'active'
+
+
+def _counters(status):
+    """(open, in_progress, scrap) contribution of one request in `status`."""
+    return (1 if status in OPEN_STATUSES else 0,
+            1 if status == 'in_progress' else 0,
+            1 if status == 'scrap' else 0)
+
+
+def _deltas(changes):
+    """
+    Fold RequestChange records into
+    {equipment_id: [open, in_progress, scrap, newest created_at, recompute last failure]}.
+    """
+    deltas = defaultdict(lambda: [0, 0, 0, None, False])
+    for change in changes:
+        old, new = change.old, change.new
+        if old is not None and old.equipment_id is not None:
+            delta = deltas[old.equipment_id]
+            for i, value in enumerate(_counters(old.status)):
+                delta[i] -= value
+            moved = new is None or new.equipment_id != old.equipment_id or new.created_at != old.created_at
+            if moved and old.created_at is not None:
+                # The removed request may have been the newest one
+                delta[4] = True
+        if new is not None and new.equipment_id is not None:
+            delta = deltas[new.equipment_id]
+            for i, value in enumerate(_counters(new.status)):
+                delta[i] += value
+            if new.created_at is not None and (delta[3] is None or new.created_at > delta[3]):
+                delta[3] = new.created_at
+    return deltas
+
+
+def _upsert(conn, equipment_id, open_delta, in_progress_delta, scrap_delta, newest):
+    """Apply counter deltas to one health row, creating it if needed."""
+    table = EquipmentHealth.__table__
+    c = table.c
+    values = {
+        'equipment_id': equipment_id,
+        'open_requests': open_delta,
+        'in_progress_requests': in_progress_delta,
+        'scrap_requests': scrap_delta,
+        'last_failure_at': newest,
+        'state': _state(open_delta, scrap_delta),
+    }
+    updates = {
+        'open_requests': c.open_requests + open_delta,
+        'in_progress_requests': c.in_progress_requests + in_progress_delta,
+        'scrap_requests': c.scrap_requests + scrap_delta,
+        'state': _state_expr(c.open_requests + open_delta, c.scrap_requests + scrap_delta),
+    }
+    if newest is not None:
+        updates['last_failure_at'] = case(
+            (c.last_failure_at.is_(None), newest),
+            (c.last_failure_at < newest, newest),
+            else_=c.last_failure_at)
+    dialect = conn.dialect.name
+    if dialect in ('postgresql', 'sqlite'):
+        insert = postgresql.insert if dialect == 'postgresql' else sqlite.insert
+        conn.execute(insert(table).values(**values)
+                     .on_conflict_do_update(index_elements=['equipment_id'], set_=updates))
+        return
+    result = conn.execute(table.update().where(c.equipment_id == equipment_id).values(**updates))
+    if result.rowcount == 0:
+        conn.execute(table.insert().values(**values))
+
+
+def _recompute_last_failure(conn, equipment_ids):
+    table = EquipmentHealth.__table__
+    req = archive.history_source(conn).c
+    newest = select(func.max(req.created_at))\
+        .where(req.equipment_id == table.c.equipment_id)\
+        .scalar_subquery()
+    conn.execute(table.update()
+                 .where(table.c.equipment_id.in_(equipment_ids))
+                 .values(last_failure_at=newest))
+
+
+@request_changes.connect
+def apply_changes(session, changes):
+    """Signal receiver: apply request changes to equipment health."""
+    conn = session.connection()
+    recompute = []
+    for equipment_id, (open_d, progress_d, scrap_d, newest, stale) in sorted(_deltas(changes).items()):
+        if open_d or progress_d or scrap_d or newest is not None:
+            _upsert(conn, equipment_id, open_d, progress_d, scrap_d, newest)
+        if stale:
+            recompute.append(equipment_id)
+    if recompute:
+        _recompute_last_failure(conn, recompute)
+
+
+def create_health_rows(conn, equipment_ids):
+    """Insert 'active' health rows for new machines (no requests yet) in one executemany."""
+    if equipment_ids:
+        conn.execute(EquipmentHealth.__table__.insert(),
+                     [{'equipment_id': equipment_id, 'open_requests': 0, 'in_progress_requests': 0,
+                       'scrap_requests': 0, 'last_failure_at': None, 'state': 'active'}
+                      for equipment_id in sorted(equipment_ids)])
+
+
+def _create_health_rows(session, flush_context):
+    """Give newly flushed equipment an 'active' health row."""
+    new_ids = [obj.id for obj in session.new if isinstance(obj, Equipment)]
+    if new_ids:
+        create_health_rows(session.connection(), new_ids)
+
+
+def rebuild_health():
+    """Recompute every health row from equipment, maintenance_request and its archive (caller commits)."""
+    conn = db.session.connection()
+    table = EquipmentHealth.__table__
+    conn.execute(table.delete())
+
+    req = archive.history_source(conn)
+    status = req.c.status
+    open_count = func.coalesce(func.sum(case((status.in_(OPEN_STATUSES), 1), else_=0)), 0)
+    scrap_count = func.coalesce(func.sum(case((status == 'scrap', 1), else_=0)), 0)
+    query = select(Equipment.id,
+                   open_count,
+                   func.coalesce(func.sum(case((status == 'in_progress', 1), else_=0)), 0),
+                   scrap_count,
+                   func.max(req.c.created_at),
+                   _state_expr(open_count, scrap_count))\
+        .select_from(Equipment)\
+        .outerjoin(req, req.c.equipment_id == Equipment.id)\
+        .group_by(Equipment.id)
+    conn.execute(table.insert().from_select(
+        ['equipment_id', 'open_requests', 'in_progress_requests', 'scrap_requests',
+         'last_failure_at', 'state'], query))
+
+
+@click.command('rebuild-equipment-health')
+@with_appcontext
+def rebuild_health_command():
+    """Backfill the equipment health table from maintenance_request."""
+    rebuild_health()
+    db.session.commit()
+    click.echo("[SUCCESS] Equipment health rebuilt.")
+
+
+def init_app(app):
+    """Hook equipment inserts and register the CLI command on the app."""
+    if not event.contains(Session, 'after_flush', _create_health_rows):
+        event.listen(Session, 'after_flush', _create_health_rows)
+    app.cli.add_command(rebuild_health_command)
@@ -0,0 +1,143 @@
+"""
+Equipment listing shared by the HTML page and the JSON API.
+
+Search, filters, sorting and keyset pagination all run in the database. Each
+row is joined with its department, team and precomputed health in one query,
+so a page costs one query however many assets exist. Failure risk comes from the
+precomputed equipment_risk table (see failure_prediction.py).
+- Sorting by name (optionally within a department/team filter), serial number,
+  location or open requests walks a matching index and stops after one page.
+  Department and team sort by the joined name, which no equipment index can
+  hold, so they (like last failure and risk) order the filtered rows.
+- q matches the start of the name, serial number or location, ignoring case:
+  a range on the lower() expression indexes, rechecked with LIKE, so a search
+  reads only the matching rows. Substrings in the middle are not found.
+"""
+
+from datetime import datetime
+
+from sqlalchemy import and_, func, literal_column, or_
+
+from models import db, Equipment, EquipmentHealth, EquipmentRisk, Department, MaintenanceTeam
+from pagination import after_key, next_page_cursor, parse_int
+from equipment_health import STATES
+from failure_prediction import risk_level
+
+# Sort value of machines without any request, so keyset comparisons never meet NULL
+NEVER = datetime(1970, 1, 1)
+
+# sort name -> (columns before the Equipment.id tiebreaker, default descending)
+SORTS = {
+    'name': ((Equipment.name,), False),
+    'serial_number': ((Equipment.serial_number,), False),
+    # Same expression as ix_equipment_location_name ('' inline, not bound, so the index matches)
+    'location': ((func.coalesce(Equipment.location, literal_column("''")), Equipment.name), False),
+    'department': ((func.coalesce(Department.name, ''), Equipment.name), False),
+    'team': ((func.coalesce(MaintenanceTeam.name, ''), Equipment.name), False),
+    'open_requests': ((EquipmentHealth.open_requests,), True),
+    'last_failure': ((func.coalesce(EquipmentHealth.last_failure_at, NEVER),), True),
+    'risk': ((func.coalesce(EquipmentRisk.risk, -1.0),), True),
+}
+MAX_QUERY_LENGTH = 100
+
+
+def parse_listing(args):
+    """
+    Read search/filter/sort options from request args:
+    q, department_id, team_id, state, sort (see SORTS), dir (asc/desc).
+    Raises ValueError with a user-facing message on malformed input.
+    """
+    sort = args.get('sort') or 'name'
+    if sort not in SORTS:
+        raise ValueError(f"'sort' must be one of: {', '.join(SORTS)}.")
+    direction = args.get('dir') or ('desc' if SORTS[sort][1] else 'asc')
+    if direction not in ('asc', 'desc'):
+        raise ValueError("'dir' must be 'asc' or 'desc'.")
+    state = args.get('state') or None
+    if state and state not in STATES:
+        raise ValueError(f"'state' must be one of: {', '.join(STATES)}.")
+    q = (args.get('q') or '').strip()[:MAX_QUERY_LENGTH] or None
+    options = {
+        'q': q,
+        'department_id': parse_int(args, 'department_id'),
+        'team_id': parse_int(args, 'team_id'),
+        'state': state,
+        'sort': sort,
+        'dir': direction,
+    }
+    return {k: v for k, v in options.items() if v is not None}
+
+
+def _starts_with(column, q):
+    """lower(column) starts with q: a range over its lower() index, rechecked with LIKE."""
+    prefix = q.lower()
+    upper = prefix[:-1] + chr(min(ord(prefix[-1]) + 1, 0x10FFFF))
+    escaped = prefix.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_')
+    value = func.lower(column)
+    return and_(value >= prefix, value < upper, value.like(f'{escaped}%', escape='\\'))
+
+
+def equipment_page(options, cursor_key=None, limit=50):
+    """
+    Return (rows, next_cursor) for one page. Each row has the Equipment, its
+    department and team names, its health counters and its failure risk. Every
+    machine has a health row (see equipment_health.py), so health is an inner
+    join and its indexes can drive the open_requests sort; risk rows exist only
+    for machines with request history, so that join is outer.
+    """
+    sort_columns = SORTS[options.get('sort', 'name')][0] + (Equipment.id,)
+    descending = options.get('dir') == 'desc'
+
+    query = db.session.query(Equipment.id, Equipment.name, Equipment.serial_number, Equipment.location,
+                             Equipment.department_id, Equipment.team_id,
+                             Department.name.label('department'), MaintenanceTeam.name.label('team'),
+                             EquipmentHealth.state, EquipmentHealth.open_requests,
+                             EquipmentHealth.in_progress_requests, EquipmentHealth.last_failure_at,
+                             EquipmentRisk.risk, EquipmentRisk.next_failure_at,
+                             *sort_columns)\
+                      .outerjoin(Department, Department.id == Equipment.department_id)\
+                      .outerjoin(MaintenanceTeam, MaintenanceTeam.id == Equipment.team_id)\
+                      .join(EquipmentHealth, EquipmentHealth.equipment_id == Equipment.id)\
+                      .outerjoin(EquipmentRisk, EquipmentRisk.equipment_id == Equipment.id)
+    if 'department_id' in options:
+        query = query.filter(Equipment.department_id == options['department_id'])
+    if 'team_id' in options:
+        query = query.filter(Equipment.team_id == options['team_id'])
+    if 'state' in options:
+        query = query.filter(EquipmentHealth.state == options['state'])
+    if 'q' in options:
+        query = query.filter(or_(*(_starts_with(column, options['q'])
+                                   for column in (Equipment.name, Equipment.serial_number, Equipment.location))))
+    if cursor_key:
+        query = query.filter(after_key(sort_columns, cursor_key, descending))
+        # The leading key bounded on its own as well: SQLite seeks row values of plain columns only
+        lead = sort_columns[0]
+        query = query.filter(lead <= cursor_key[0] if descending else lead >= cursor_key[0])
+
+    order = [col.desc() if descending else col.asc() for col in sort_columns]
+    rows = query.order_by(*order).limit(limit + 1).all()
+    width = len(sort_columns)
+    return next_page_cursor(rows, limit, lambda row: tuple(row[-width:]))
+
+
+def equipment_dict(row):
+    """JSON-ready representation of a listed machine."""
+    return {
+        'id': row.id,
+        'name': row.name,
+        'serial_number': row.serial_number,
+        'location': row.location,
+        'department': {'id': row.department_id, 'name': row.department} if row.department_id else None,
+        'team': {'id': row.team_id, 'name': row.team} if row.team_id else None,
+        'health': {
+            'state': row.state,
+            'open_requests': row.open_requests,
+            'in_progress_requests': row.in_progress_requests,
+            'last_failure_at': row.last_failure_at.isoformat() if row.last_failure_at else None,
+        },
+        'risk': {
+            'score': round(row.risk, 4),
+            'level': risk_level(row.risk),
+            'next_failure_at': row.next_failure_at.isoformat(),
+        } if row.risk is not None else None,
+    }
@@ -0,0 +1,280 @@
+"""
+Batch failure prediction: per-machine risk scores and expected next failure.
+
+Every machine's time between failures is modelled as a Weibull distribution,
+fitted for the whole fleet at once with NumPy over arrays sorted by
+(equipment, time):
+- the intervals are the gaps between a machine's requests plus the time since
+  its last one, which is right-censored (it has not failed again yet), so a
+  machine that has been quiet for a long time is not reported as overdue;
+- the likelihood is recency weighted like an EWMA (the newest interval weighs
+  1, the one before (1 - RECENCY_DECAY), ...), so a machine failing more and
+  more often is caught early;
+- shape and scale are maximum-likelihood estimates, with Newton iterations run
+  for every machine in parallel (grouped sums with bincount). Machines with
+  fewer than MIN_WEIBULL_GAPS gaps get an exponential fit (shape 1) shrunk
+  towards the fleet's mean interval.
+Given the time since the last failure t, risk is the probability of failing
+within HORIZON_DAYS (S(t + h) / S(t)) and next_failure_at the median of the
+next failure time. Scrapped machines are not scored.
+
+Results go to equipment_risk, which the equipment list and the calendar read;
+nothing is computed per page view. Runs are recorded in failure_prediction_run:
+- full: refit every machine with requests in the last HISTORY_DAYS;
+- incremental (default): refit only machines with requests newer than the
+  last run's watermark (highest request id seen).
+Risk is as of the fit, so schedule a full run daily and incremental runs in
+between (`flask predict-failures [--full]`).
+"""
+
+import math
+import time
+from datetime import datetime, timedelta
+
+import click
+import numpy as np
+from flask.cli import with_appcontext
+from sqlalchemy import func, select
+
+from models import db, EquipmentHealth, EquipmentRisk, FailurePredictionRun, MaintenanceRequest, Equipment
+from analytics import load_history
+from jobs import job_queue
+
+HISTORY_DAYS = 730
+HORIZON_DAYS = 30
+# Gaps needed before a machine gets its own Weibull shape
+MIN_WEIBULL_GAPS = 5
+# Weight lost per older interval in the likelihood (0 = all history counts the same)
+RECENCY_DECAY = 0.1
+# Weight of the fleet's mean interval in exponential fits (in intervals)
+PRIOR_WEIGHT = 1.0
+# Requests filed within this many hours of each other count as one incident
+MIN_GAP_HOURS = 1.0
+NEWTON_ITERATIONS = 30
+SHAPE_LIMITS = (0.2, 10.0)
+# Predictions further out than this are capped (the machine is effectively reliable)
+MAX_PREDICTION_DAYS = 3650
+CHUNK_SIZE = 1000
+# Risk levels shown in the UI
+LEVELS = (('high', 0.5), ('medium', 0.2), ('low', 0.0))
+
+
+def risk_level(risk):
+    """'high', 'medium' or 'low' for a risk score (None when not predicted)."""
+    if risk is None:
+        return None
+    return next(level for level, threshold in LEVELS if risk >= threshold)
+
+
+# ------------------------
+# Fitting
+# ------------------------
+def _weibull(intervals, observed, weights, owner, groups):
+    """
+    Weighted maximum-likelihood Weibull (shape, scale) per group, where
+    `observed` is 0 for right-censored intervals. Solves
+    sum(w x^k ln x) / sum(w x^k) - 1/k - sum(w d ln x) / sum(w d) = 0 for the
+    shape with Newton steps for all groups at once; then scale^k = sum(w x^k) / sum(w d).
+    Intervals are divided by their group's weighted mean first (the shape is
+    scale invariant), which keeps x^k well inside float range.
+    """
+    def total(values):
+        return np.bincount(owner, weights=values, minlength=groups)
+
+    unit = total(weights * intervals) / total(weights)
+    x = intervals / unit[owner]
+    log_x = np.log(x)
+    failures = total(weights * observed)
+    mean_log = total(weights * observed * log_x) / failures
+    shape = np.ones(groups)
+    for _ in range(NEWTON_ITERATIONS):
+        wxk = weights * x ** shape[owner]
+        s0, s1, s2 = total(wxk), total(wxk * log_x), total(wxk * log_x * log_x)
+        ratio = s1 / s0
+        step = (ratio - 1.0 / shape - mean_log) / (s2 / s0 - ratio * ratio + 1.0 / (shape * shape))
+        shape = np.clip(shape - step, *SHAPE_LIMITS)
+        if np.max(np.abs(step)) < 1e-6:
+            break
+    scale = unit * (total(weights * x ** shape[owner]) / failures) ** (1.0 / shape)
+    return shape, scale
+
+
+def fit(history, now, prior_interval=None):
+    """
+    Fit every machine in `history` (rows of equipment_id, epoch seconds, ...)
+    as of `now` (epoch seconds). Returns a dict of per-machine arrays
+    (equipment_id, failures, model, shape, scale_hours, mean_interval_hours,
+    last_epoch, next_epoch, risk). `prior_interval` (hours) is the fleet's mean
+    interval; by default the mean of all gaps in `history`.
+    """
+    history = history[np.lexsort((history[:, 1], history[:, 0]))]
+    equipment_ids, group = np.unique(history[:, 0], return_inverse=True)
+    groups = len(equipment_ids)
+    failures = np.bincount(group, minlength=groups)
+    last_epoch = history[np.cumsum(failures) - 1, 1]
+    age = np.maximum((now - last_epoch) / 3600.0, MIN_GAP_HOURS)
+
+    same = group[1:] == group[:-1]
+    gap_owner = group[1:][same]
+    gaps = np.maximum(np.diff(history[:, 1])[same] / 3600.0, MIN_GAP_HOURS)
+    gap_counts = np.bincount(gap_owner, minlength=groups)
+    if prior_interval is None:
+        prior_interval = gaps.mean() if len(gaps) else np.nan
+
+    # Each machine's gaps followed by its censored current interval, newest last
+    owner = np.concatenate([gap_owner, np.arange(groups)])
+    order = np.argsort(owner, kind='stable')
+    owner = owner[order]
+    intervals = np.concatenate([gaps, age])[order]
+    observed = np.concatenate([np.ones(len(gaps)), np.zeros(groups)])[order]
+    rank_from_end = np.cumsum(gap_counts + 1)[owner] - 1 - np.arange(len(owner))
+    weights = (1.0 - RECENCY_DECAY) ** rank_from_end
+
+    # Exponential: weighted exposure over weighted failures, plus one prior interval
+    exposure = np.bincount(owner, weights=weights * intervals, minlength=groups)
+    observed_failures = np.bincount(owner, weights=weights * observed, minlength=groups)
+    shape = np.ones(groups)
+    scale = (exposure + PRIOR_WEIGHT * prior_interval) / (observed_failures + PRIOR_WEIGHT)
+    eligible = gap_counts >= MIN_WEIBULL_GAPS
+    if eligible.any():
+        rows = eligible[owner]
+        # Renumber the eligible groups densely for the grouped Newton iterations
+        dense = np.cumsum(eligible) - 1
+        shape[eligible], scale[eligible] = _weibull(intervals[rows], observed[rows], weights[rows],
+                                                    dense[owner[rows]], int(eligible.sum()))
+    model = np.where(eligible, 'weibull', np.where(gap_counts > 0, 'exponential', 'fleet'))
+
+    # Conditional on surviving to `age`: S(t) = exp(-(t / scale)^shape)
+    cumulative = (age / scale) ** shape
+    risk = -np.expm1(cumulative - ((age + HORIZON_DAYS * 24.0) / scale) ** shape)
+    # Median of the next failure: S(t + u) / S(t) = 1/2
+    until = scale * (cumulative + math.log(2.0)) ** (1.0 / shape)
+    next_epoch = last_epoch + np.minimum(until, MAX_PREDICTION_DAYS * 24.0) * 3600.0
+
+    fitted = ~np.isnan(scale)
+    return {
+        'equipment_id': equipment_ids[fitted].astype(np.int64),
+        'failures': failures[fitted],
+        'model': model[fitted],
+        'shape': shape[fitted],
+        'scale_hours': scale[fitted],
+        # Mean of Weibull(shape, scale) is scale * Gamma(1 + 1/shape)
+        'mean_interval_hours': (scale * np.vectorize(math.gamma, otypes=[float])(1.0 + 1.0 / shape))[fitted],
+        'last_epoch': last_epoch[fitted],
+        'next_epoch': next_epoch[fitted],
+        'risk': risk[fitted],
+    }
+
+
+# ------------------------
+# The batch job
+# ------------------------
+def _datetimes(epochs):
+    """Epoch seconds -> naive UTC datetimes (to the microsecond)."""
+    return (np.round(epochs * 1e6).astype(np.int64).astype('datetime64[us]')).tolist()
+
+
+def _rows(result, fitted_at):
+    columns = ('equipment_id', 'failures', 'model', 'shape', 'scale_hours', 'mean_interval_hours', 'risk')
+    values = zip(*(result[name].tolist() for name in columns),
+                 _datetimes(result['last_epoch']), _datetimes(result['next_epoch']))
+    for *row, last_failure_at, next_failure_at in values:
+        yield dict(zip(columns, row), last_failure_at=last_failure_at, next_failure_at=next_failure_at,
+                   fitted_at=fitted_at)
+
+
+def _fleet_interval(conn):
+    """Average interval of the machines fitted so far (prior for small incremental batches)."""
+    return conn.scalar(select(func.avg(EquipmentRisk.mean_interval_hours))
+                       .where(EquipmentRisk.model != 'fleet'))
+
+
+def last_watermark():
+    return db.session.query(func.max(FailurePredictionRun.watermark)).scalar()
+
+
+def predict(full=False):
+    """
+    Refit risk scores (all machines, or only those with new requests since the
+    last run) and record the run. Returns the FailurePredictionRun; the caller commits.
+    """
+    started_at = datetime.utcnow()
+    conn = db.session.connection()
+    watermark = last_watermark()
+    mode = 'full' if full or watermark is None else 'incremental'
+    new_watermark = conn.scalar(select(func.coalesce(func.max(MaintenanceRequest.id), 0)))
+
+    start = started_at - timedelta(days=HISTORY_DAYS)
+    table = EquipmentRisk.__table__
+    if mode == 'full':
+        history = load_history(conn, start)
+        refit = None
+        prior = None
+    else:
+        refit = select(MaintenanceRequest.equipment_id)\
+            .where(MaintenanceRequest.id > watermark, MaintenanceRequest.id <= new_watermark)\
+            .distinct()
+        history = load_history(conn, start, refit)
+        prior = _fleet_interval(conn)
+    scrapped = select(EquipmentHealth.equipment_id).where(EquipmentHealth.state == 'scrapped')
+    history = history[~np.isin(history[:, 0], conn.scalars(scrapped).all())]
+    result = fit(history, (started_at - datetime(1970, 1, 1)).total_seconds(), prior)
+
+    if refit is None:
+        conn.execute(table.delete())
+    else:
+        conn.execute(table.delete().where(table.c.equipment_id.in_(refit)))
+        # Machines scrapped since their last fit (scrapping moves a request, it adds none)
+        conn.execute(table.delete().where(table.c.equipment_id.in_(scrapped)))
+    rows = list(_rows(result, started_at))
+    for i in range(0, len(rows), CHUNK_SIZE):
+        conn.execute(table.insert(), rows[i:i + CHUNK_SIZE])
+
+    run = FailurePredictionRun(mode=mode, started_at=started_at, finished_at=datetime.utcnow(),
+                               watermark=new_watermark, equipment_count=len(rows))
+    db.session.add(run)
+    db.session.flush()
+    return run
+
+
+# ------------------------
+# Reading
+# ------------------------
+def predicted_failures(start, end, limit=100):
+    """
+    Machines whose predicted next failure falls within [start, end), riskiest
+    first, as (equipment id, name, next_failure_at, risk) rows.
+    """
+    return db.session.query(EquipmentRisk.equipment_id, Equipment.name,
+                            EquipmentRisk.next_failure_at, EquipmentRisk.risk)\
+                     .join(Equipment, Equipment.id == EquipmentRisk.equipment_id)\
+                     .filter(EquipmentRisk.next_failure_at >= start, EquipmentRisk.next_failure_at < end)\
+                     .order_by(EquipmentRisk.risk.desc(), EquipmentRisk.equipment_id)\
+                     .limit(limit)\
+                     .all()
+
+
+@job_queue.task('predict_failures')
+def predict_failures_job(job, full=False):
+    """Background run of predict(); the worker commits it with the job result."""
+    run = predict(full)
+    return {'mode': run.mode, 'equipment_count': run.equipment_count, 'watermark': run.watermark}
+
+
+@click.command('predict-failures')
+@click.option('--full', is_flag=True, help="Refit every machine instead of only those with new requests.")
+@with_appcontext
+def predict_failures_command(full):
+    """Fit failure-interval models and write per-equipment risk scores."""
+    started = time.perf_counter()
+    run = predict(full)
+    db.session.commit()
+    high = db.session.query(func.count()).select_from(EquipmentRisk)\
+                     .filter(EquipmentRisk.risk >= LEVELS[0][1]).scalar()
+    click.echo(f"[SUCCESS] {run.mode} run: {run.equipment_count} machines refitted in "
+               f"{time.perf_counter() - started:.2f}s; {high} at high risk.")
+
+
+def init_app(app):
+    """Register the CLI command on the app."""
+    app.cli.add_command(predict_failures_command)
@@ -0,0 +1,233 @@
+"""
+Conditional GET (ETag / If-None-Match) and compression of large responses.
+
+Views decorated with @http_cache.conditional(*tags) get a weak ETag computed
+before the view runs, from one query of cheap validators of the models they
+read (see VALIDATORS):
+- every tagged model: max(updated_at), an index seek, plus the row count
+  (requests are counted from the monthly rollups, so deletes change the ETag
+  without counting 500k rows; archiving, which keeps the rollups, changes
+  max(archived_at) instead).
+The route, query string, user, UTC date (rolling windows such as "this month")
+and a deploy token (template and code mtimes) complete the tag; views over
+windows ending "now" also pass a clock (analytics.window_end) whose value is
+part of the tag, so their ETag changes whenever the window moves. A matching
+If-None-Match is answered with 304 without running the view's queries or
+rendering anything.
+A write stamped within HTTP_CACHE_SETTLE_SECONDS may still be followed by the
+commit of an older stamp from a concurrent transaction, so while the newest
+stamp is that recent no ETag is sent and the view renders normally.
+Pages carrying flashed messages are never validated.
+
+Compression: HTML, JSON and text bodies of at least COMPRESS_MIN_SIZE bytes
+are sent brotli-compressed when the brotli package is installed and the
+client accepts it, else gzip. Streamed responses (exports, SSE) are left alone,
+except those built with stream_response(), which compresses chunk by chunk
+(NDJSON collections, see serializers.py).
+"""
+
+import gzip
+import hashlib
+import os
+import threading
+import zlib
+from datetime import datetime, timedelta
+from functools import wraps
+
+from flask import Response, make_response, request, session, stream_with_context
+from flask_login import current_user
+from sqlalchemy import func, select
+
+from models import (db, ArchivedRequest, Department, Equipment, FailurePredictionRun, MaintenancePlan,
+                    MaintenanceRequest, MaintenanceTeam, MonthlyRollup, Technician, WorkCenter)
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+COMPRESSIBLE_MIMETYPES = ('text/html', 'application/json', 'text/plain', 'text/csv', 'application/javascript',
+                          'text/css')
+
+
+def _updated(model):
+    return [select(func.max(model.updated_at)), select(func.count()).select_from(model)]
+
+
+# Model tag -> scalar queries whose values change whenever the model's rows do
+VALIDATORS = {
+    'MaintenanceRequest': [select(func.max(MaintenanceRequest.updated_at)),
+                           select(func.coalesce(func.sum(MonthlyRollup.request_count), 0)),
+                           select(func.max(ArchivedRequest.archived_at))],
+    'Equipment': _updated(Equipment),
+    'WorkCenter': _updated(WorkCenter),
+    'Department': _updated(Department),
+    'MaintenanceTeam': _updated(MaintenanceTeam),
+    'Technician': _updated(Technician),
+    'MaintenancePlan': _updated(MaintenancePlan),
+    'FailurePredictionRun': _updated(FailurePredictionRun),
+}
+
+
+def _deploy_token(app):
+    """Changes whenever templates or code are redeployed, so old ETags never match new markup."""
+    digest = hashlib.blake2b(digest_size=8)
+    for root in (app.root_path, os.path.join(app.root_path, app.template_folder or 'templates')):
+        for name in sorted(os.listdir(root)):
+            full = os.path.join(root, name)
+            if os.path.isfile(full) and name.endswith(('.py', '.html')):
+                stat = os.stat(full)
+                digest.update(f'{name}:{stat.st_mtime_ns}:{stat.st_size};'.encode())
+    return digest.hexdigest()
+
+
+class HttpCache:
+    """Flask extension: ETag validation decorator and the compression hook."""
+
+    def __init__(self):
+        self.enabled = True
+        self.settle_seconds = 5
+        self.min_size = 1024
+        self.level = 6
+        self.token = ''
+        self._stats = {'validated': 0, 'not_modified': 0, 'unsettled': 0, 'compressed': 0,
+                       'bytes_in': 0, 'bytes_out': 0}
+        self._lock = threading.Lock()
+
+    def init_app(self, app):
+        """Read the settings and register the compression hook."""
+        self.enabled = app.config.get('HTTP_CACHE_ENABLED', True)
+        self.settle_seconds = app.config.get('HTTP_CACHE_SETTLE_SECONDS', 5)
+        self.min_size = app.config.get('COMPRESS_MIN_SIZE', 1024)
+        self.level = app.config.get('COMPRESS_LEVEL', 6)
+        self.token = _deploy_token(app)
+        if self.min_size is not None:
+            app.after_request(self._compress)
+
+    def _count(self, name, amount=1):
+        with self._lock:
+            self._stats[name] += amount
+
+    # ------------------------
+    # Validation
+    # ------------------------
+    def etag(self, tags, clock=None):
+        """Weak ETag for the current request, or None while a recent write may still be settling."""
+        queries = [query.scalar_subquery() for tag in tags for query in VALIDATORS[tag]]
+        values = db.session.execute(select(*queries)).one() if queries else ()
+        settled = datetime.utcnow() - timedelta(seconds=self.settle_seconds)
+        if any(isinstance(value, datetime) and value > settled for value in values):
+            self._count('unsettled')
+            return None
+        digest = hashlib.blake2b(digest_size=16)
+        moment = clock() if clock is not None else datetime.utcnow().date()
+        for part in (self.token, request.full_path, current_user.get_id(), moment, *values):
+            digest.update(f'{part}\x1f'.encode())
+        return digest.hexdigest()
+
+    def conditional(self, *tags, clock=None):
+        """
+        Decorator for GET views that depend only on the models in `tags` (and
+        the request's path, query string and user): answers a matching
+        If-None-Match with 304 before the view runs. `clock` replaces the UTC
+        date in the tag for views whose data also moves with time.
+        """
+        unknown = set(tags) - set(VALIDATORS)
+        if unknown:
+            raise ValueError(f"No validator for: {', '.join(sorted(unknown))}")
+
+        def decorator(view):
+            @wraps(view)
+            def wrapper(*args, **kwargs):
+                if not self.enabled or request.method not in ('GET', 'HEAD') or session.get('_flashes'):
+                    return view(*args, **kwargs)
+                self._count('validated')
+                etag = self.etag(tags, clock)
+                if etag is not None and request.if_none_match.contains_weak(etag):
+                    self._count('not_modified')
+                    response = Response(status=304)
+                else:
+                    response = make_response(view(*args, **kwargs))
+                    if etag is None or response.status_code != 200:
+                        return response
+                response.set_etag(etag, weak=True)
+                # Browsers may keep the page but must revalidate before showing it
+                response.headers['Cache-Control'] = 'private, no-cache'
+                return response
+            return wrapper
+        return decorator
+
+    # ------------------------
+    # Compression
+    # ------------------------
+    def _encoding(self):
+        accepted = request.accept_encodings
+        if brotli is not None and accepted['br']:
+            return 'br'
+        if accepted['gzip']:
+            return 'gzip'
+        return None
+
+    def _compress(self, response):
+        if (response.direct_passthrough or response.is_streamed or response.status_code in (204, 304)
+                or 'Content-Encoding' in response.headers or response.mimetype not in COMPRESSIBLE_MIMETYPES):
+            return response
+        response.vary.add('Accept-Encoding')
+        encoding = self._encoding()
+        if encoding is None or (response.content_length or 0) < self.min_size:
+            return response
+        data = response.get_data()
+        if encoding == 'br':
+            body = brotli.compress(data, quality=min(self.level, 11))
+        else:
+            body = gzip.compress(data, compresslevel=self.level)
+        response.set_data(body)
+        response.headers['Content-Encoding'] = encoding
+        self._count('compressed')
+        self._count('bytes_in', len(data))
+        self._count('bytes_out', len(body))
+        return response
+
+    def stream_response(self, chunks, mimetype, headers=None):
+        """
+        Streamed response of `chunks` (bytes) that is compressed on the fly
+        when the client accepts it. Each chunk is flushed, so the client can
+        parse it as soon as it arrives. The chunks are produced inside the
+        request context.
+        """
+        encoding = self._encoding() if self.min_size is not None else None
+        response = Response(stream_with_context(self._encode_stream(chunks, encoding)), mimetype=mimetype,
+                            headers=headers)
+        response.vary.add('Accept-Encoding')
+        if encoding is not None:
+            response.headers['Content-Encoding'] = encoding
+        return response
+
+    def _encode_stream(self, chunks, encoding):
+        if encoding is None:
+            yield from chunks
+            return
+        if encoding == 'br':
+            compressor = brotli.Compressor(quality=min(self.level, 11))
+            compress, flush, finish = compressor.process, compressor.flush, compressor.finish
+        else:
+            compressor = zlib.compressobj(self.level, zlib.DEFLATED, 31)  # 31: gzip container
+            compress, finish = compressor.compress, compressor.flush
+            flush = lambda: compressor.flush(zlib.Z_SYNC_FLUSH)  # noqa: E731
+        self._count('compressed')
+        for chunk in chunks:
+            body = compress(chunk) + flush()
+            self._count('bytes_in', len(chunk))
+            self._count('bytes_out', len(body))
+            yield body
+        yield finish()
+
+    def stats(self):
+        """Validation and compression counters for this process."""
+        with self._lock:
+            stats = dict(self._stats)
+        stats['compression_ratio'] = round(stats['bytes_out'] / stats['bytes_in'], 3) if stats['bytes_in'] else None
+        return stats
+
+
+http_cache = HttpCache()
@@ -0,0 +1,123 @@
+"""
+Identity cache for Flask-Login.
+
+load_user runs on every authenticated request, including the Kanban drag calls.
+Instead of a User query each time, it returns a read-only Principal (id, name,
+email, department) from a bounded, TTL-evicted in-process map, so warm requests
+never touch the database for the current user.
+- A committed write to a User evicts that user; a Department write clears the
+  map (principals carry the department name).
+- The map is per worker: another worker's write is picked up within
+  IDENTITY_CACHE_TTL seconds.
+Settings: IDENTITY_CACHE_TTL (seconds, 0 disables), IDENTITY_CACHE_MAX_ENTRIES.
+"""
+
+import threading
+
+from flask_login import UserMixin
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+from cache import MemoryBackend, NullBackend
+from models import db, User, Department
+
+
+class Principal(UserMixin):
+    """Read-only snapshot of a User, served as current_user."""
+
+    __slots__ = ('id', 'name', 'email', 'department_id', 'department_name')
+
+    def __init__(self, id, name, email, department_id, department_name):
+        for field, value in zip(self.__slots__, (id, name, email, department_id, department_name)):
+            object.__setattr__(self, field, value)
+
+    def __setattr__(self, name, value):
+        raise AttributeError("Principal is read-only; load the User model to modify it.")
+
+    def __repr__(self):
+        return f'<Principal {self.id} {self.email}>'
+
+
+class IdentityCache:
+    """user id -> Principal, with hit/miss counters."""
+
+    def __init__(self):
+        self.backend = NullBackend()
+        self.ttl = 60
+        self._stats = {'hits': 0, 'misses': 0, 'evictions': 0}
+        self._stats_lock = threading.Lock()
+
+    def init_app(self, app):
+        self.ttl = app.config.get('IDENTITY_CACHE_TTL', 60)
+        max_entries = app.config.get('IDENTITY_CACHE_MAX_ENTRIES', 10000)
+        self.backend = MemoryBackend(max_entries) if self.ttl > 0 else NullBackend()
+
+        if not event.contains(Session, 'after_flush', _collect_identity_writes):
+            event.listen(Session, 'after_flush', _collect_identity_writes)
+            event.listen(Session, 'after_commit', _evict_committed_identities)
+            event.listen(Session, 'after_soft_rollback', _forget_identity_writes)
+
+    def _count(self, name):
+        with self._stats_lock:
+            self._stats[name] += 1
+
+    def get(self, user_id):
+        """Principal for `user_id`, loaded with one query on a miss; None if no such user."""
+        hit = self.backend.get(user_id)
+        if hit is not None:
+            self._count('hits')
+            return hit[0]
+        self._count('misses')
+        row = db.session.query(User.id, User.name, User.email, User.department_id, Department.name)\
+                        .outerjoin(Department, Department.id == User.department_id)\
+                        .filter(User.id == user_id)\
+                        .first()
+        if row is None:
+            return None
+        principal = Principal(*row)
+        self.backend.set(user_id, principal, self.ttl, ())
+        return principal
+
+    def evict(self, user_ids):
+        for user_id in user_ids:
+            self.backend.delete(user_id)
+            self._count('evictions')
+
+    def clear(self):
+        self.backend.clear()
+
+    def stats(self):
+        with self._stats_lock:
+            stats = dict(self._stats)
+        stats['entries'] = len(self.backend)
+        return stats
+
+
+identity_cache = IdentityCache()
+
+
+# ------------------------
+# Write-driven invalidation
+# ------------------------
+def _collect_identity_writes(session, flush_context):
+    """Remember which users (or whether any department) this transaction wrote."""
+    pending = session.info.setdefault('identity_dirty', set())
+    for obj in list(session.dirty) + list(session.deleted):
+        if isinstance(obj, User) and obj.id is not None:
+            pending.add(obj.id)
+        elif isinstance(obj, Department):
+            pending.add(Department)
+
+
+def _evict_committed_identities(session):
+    pending = session.info.pop('identity_dirty', None)
+    if not pending:
+        return
+    if Department in pending:
+        identity_cache.clear()
+    else:
+        identity_cache.evict(pending)
+
+
+def _forget_identity_writes(session, previous_transaction):
+    session.info.pop('identity_dirty', None)
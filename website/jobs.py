@@ -0,0 +1,445 @@
+"""
+Background jobs: slow work submitted by requests and run by worker processes.
+
+Jobs live in the job table on the application database, so they survive
+restarts and every web worker can submit them and report their status:
+- modules register tasks with @job_queue.task('name') next to their CLI
+  commands; a task is called as func(job, **payload) and may report progress
+  with job.progress(done, total, message) and return a JSON-able result;
+- submit() queues a job inside the caller's transaction (it only becomes
+  visible to workers once the request commits); submit_for() is its HTTP
+  front door: only JOBS_HTTP_TASKS are accepted, and a task's user argument
+  (user_argument=) is always the submitting user;
+- `flask jobs-worker` runs JOBS_CONCURRENCY threads or forked processes that
+  claim due jobs (an indexed SELECT, FOR UPDATE SKIP LOCKED on PostgreSQL,
+  then a conditional UPDATE so two workers never run the same job), run them
+  in an app context and commit the task's work together with its result;
+- a failing task is retried up to its max_attempts with exponential backoff
+  (JOBS_RETRY_BASE_SECONDS doubled per attempt, capped and jittered); raise
+  JobError to fail at once;
+- running jobs keep a heartbeat; a job whose worker died is queued again
+  after JOBS_LEASE_SECONDS. Finished jobs are purged after JOBS_RETENTION_DAYS.
+On PostgreSQL progress is written on its own connection and is visible while
+the job runs; SQLite allows one writer at a time, so there it is committed
+together with the task's work.
+"""
+
+import inspect
+import json
+import logging
+import multiprocessing
+import os
+import random
+import signal
+import socket
+import threading
+import time
+from collections import namedtuple
+from datetime import datetime, timedelta
+
+import click
+from flask import current_app
+from flask.cli import with_appcontext
+from sqlalchemy import and_
+from sqlalchemy.exc import OperationalError
+
+from models import db, Job
+
+logger = logging.getLogger(__name__)
+
+STATUSES = ('queued', 'running', 'succeeded', 'failed')
+MODES = ('thread', 'process')
+# Progress is written at most this often (seconds) unless the job is done
+PROGRESS_INTERVAL = 1.0
+MAX_ERROR_LENGTH = 4000
+
+Task = namedtuple('Task', 'func max_attempts user_argument')
+
+
+class JobError(Exception):
+    """Raised by a task to fail its job without retrying."""
+
+
+class JobContext:
+    """Handle passed to a running task: its job id, attempt number and progress reporting."""
+
+    def __init__(self, queue, job_id, attempt, worker):
+        self.queue = queue
+        self.id = job_id
+        self.attempt = attempt
+        self.worker = worker
+        self._reported = 0.0
+
+    def progress(self, done, total=None, message=None):
+        """Report progress as done/total (or a fraction when total is None)."""
+        fraction = done / total if total else done
+        fraction = min(max(float(fraction), 0.0), 1.0)
+        now = time.monotonic()
+        if fraction < 1.0 and now - self._reported < PROGRESS_INTERVAL:
+            return
+        self._reported = now
+        values = {'progress': fraction, 'heartbeat_at': datetime.utcnow()}
+        if message is not None:
+            values['message'] = message[:200]
+        self.queue.update(self.id, self.worker, values, separate=True)
+
+
+class JobQueue:
+    """Task registry, submission and the worker loop."""
+
+    def __init__(self):
+        self.tasks = {}
+        self.concurrency = 2
+        self.mode = 'thread'
+        self.poll_interval = 1.0
+        self.lease = 300
+        self.retry_base = 10
+        self.retry_max = 3600
+        self.retention_days = 14
+        self.http_tasks = ()
+
+    def init_app(self, app):
+        """Read the JOBS_* settings and register the CLI commands on the app."""
+        self.concurrency = app.config.get('JOBS_CONCURRENCY', 2)
+        self.mode = app.config.get('JOBS_MODE', 'thread')
+        if self.mode not in MODES:
+            raise ValueError(f"Unknown JOBS_MODE: {self.mode!r}")
+        self.poll_interval = app.config.get('JOBS_POLL_INTERVAL', 1.0)
+        self.lease = app.config.get('JOBS_LEASE_SECONDS', 300)
+        self.retry_base = app.config.get('JOBS_RETRY_BASE_SECONDS', 10)
+        self.retry_max = app.config.get('JOBS_RETRY_MAX_SECONDS', 3600)
+        self.retention_days = app.config.get('JOBS_RETENTION_DAYS', 14)
+        self.http_tasks = tuple(app.config.get('JOBS_HTTP_TASKS', ()))
+        app.cli.add_command(worker_command)
+        app.cli.add_command(submit_command)
+
+    def task(self, name, max_attempts=3, user_argument=None):
+        """
+        Decorator registering func(job, **payload) as the task `name`;
+        `user_argument` names the argument that acts on behalf of a user.
+        """
+        def decorator(func):
+            self.tasks[name] = Task(func, max_attempts, user_argument)
+            return func
+        return decorator
+
+    # ------------------------
+    # Submitting and reading
+    # ------------------------
+    def submit(self, name, payload=None, user_id=None, delay=0, max_attempts=None):
+        """
+        Queue a job in the current session (the caller commits) and return it.
+        Raises ValueError for unknown tasks, payloads that are not JSON objects
+        and payloads that don't match the task's arguments.
+        """
+        if name not in self.tasks:
+            raise ValueError(f"Unknown task '{name}'.")
+        if payload is not None and not isinstance(payload, dict):
+            raise ValueError("'payload' must be an object of task arguments.")
+        self.check_payload(name, payload or {})
+        try:
+            payload_text = json.dumps(payload or {})
+        except (TypeError, ValueError):
+            raise ValueError("'payload' must be JSON serializable.")
+        now = datetime.utcnow()
+        job = Job(name=name, payload=payload_text, status='queued', attempts=0,
+                  max_attempts=max_attempts or self.tasks[name].max_attempts, progress=0.0,
+                  run_at=now + timedelta(seconds=delay), created_by=user_id, created_at=now)
+        db.session.add(job)
+        db.session.flush()
+        return job
+
+    def submit_for(self, user_id, name, payload=None):
+        """
+        Queue a job requested over HTTP by user `user_id`. Raises PermissionError
+        for tasks outside JOBS_HTTP_TASKS and for a user argument naming someone
+        else (it defaults to the submitter), ValueError as submit() does.
+        """
+        if name not in self.http_tasks:
+            raise PermissionError(f"Task '{name}' cannot be submitted over HTTP.")
+        task = self.tasks.get(name)
+        if task is not None and task.user_argument and (payload is None or isinstance(payload, dict)):
+            payload = dict(payload or {})
+            if payload.setdefault(task.user_argument, user_id) != user_id:
+                raise PermissionError(f"'{task.user_argument}' must be your own user id.")
+        return self.submit(name, payload, user_id=user_id)
+
+    def check_payload(self, name, payload):
+        """Raise ValueError unless func(job, **payload) of task `name` accepts `payload`."""
+        try:
+            inspect.signature(self.tasks[name].func).bind(None, **payload)
+        except TypeError as e:
+            raise ValueError(f"Invalid payload for '{name}': {e}.")
+
+    def update(self, job_id, worker, values, separate=False):
+        """
+        Write job fields if `worker` still holds the job (it may have been
+        requeued after a lost heartbeat). With `separate`, the write goes on its
+        own connection where the database allows a second writer. Returns
+        whether the job was updated.
+        """
+        table = Job.__table__
+        statement = table.update()\
+            .where(and_(table.c.id == job_id, table.c.status == 'running', table.c.locked_by == worker))\
+            .values(**values)
+        if separate and db.engine.dialect.name != 'sqlite':
+            with db.engine.begin() as conn:
+                return conn.execute(statement).rowcount == 1
+        return db.session.execute(statement).rowcount == 1
+
+    # ------------------------
+    # Claiming and running
+    # ------------------------
+    def claim(self, worker):
+        """Mark the oldest due job as running for `worker`; returns its id or None."""
+        table = Job.__table__
+        now = datetime.utcnow()
+        while True:
+            job_id = db.session.query(Job.id)\
+                               .filter(Job.status == 'queued', Job.run_at <= now)\
+                               .order_by(Job.run_at, Job.id)\
+                               .limit(1)\
+                               .with_for_update(skip_locked=True)\
+                               .scalar()
+            if job_id is None:
+                db.session.commit()
+                return None
+            claimed = db.session.execute(
+                table.update()
+                .where(and_(table.c.id == job_id, table.c.status == 'queued'))
+                .values(status='running', locked_by=worker, attempts=table.c.attempts + 1,
+                        started_at=now, heartbeat_at=now, progress=0.0, message=None)).rowcount
+            db.session.commit()
+            if claimed:
+                return job_id
+            # Another worker won the race (SQLite has no SKIP LOCKED); try the next job
+
+    def _retry_delay(self, attempts):
+        delay = min(self.retry_max, self.retry_base * 2 ** max(attempts - 1, 0))
+        return delay * random.uniform(0.8, 1.2)
+
+    def run(self, job_id, worker):
+        """Run a claimed job and record its outcome."""
+        job = db.session.get(Job, job_id)
+        task = self.tasks.get(job.name)
+        name, attempts, max_attempts, payload = job.name, job.attempts, job.max_attempts, job.payload
+        started = time.perf_counter()
+        try:
+            if task is None:
+                raise JobError(f"Unknown task '{name}'; is the module that registers it imported?")
+            arguments = json.loads(payload or '{}')
+            try:
+                # Queued before the task's arguments changed: no retry can succeed
+                self.check_payload(name, arguments)
+            except ValueError as e:
+                raise JobError(str(e))
+            result = task.func(JobContext(self, job_id, attempts, worker), **arguments)
+            json.dumps(result)
+            done = self.update(job_id, worker, {'status': 'succeeded', 'progress': 1.0,
+                                                'result': json.dumps(result), 'error': None,
+                                                'finished_at': datetime.utcnow()})
+            # The task's own writes commit together with its result
+            db.session.commit() if done else db.session.rollback()
+            logger.info("Job %s (%s) succeeded in %.2fs", job_id, name, time.perf_counter() - started)
+        except Exception as e:
+            db.session.rollback()
+            error = f"{type(e).__name__}: {e}"[:MAX_ERROR_LENGTH]
+            if isinstance(e, JobError) or attempts >= max_attempts:
+                values = {'status': 'failed', 'error': error, 'finished_at': datetime.utcnow()}
+                log = logger.error if isinstance(e, JobError) else logger.exception
+                log("Job %s (%s) failed after %s attempts: %s", job_id, name, attempts, error)
+            else:
+                retry_at = datetime.utcnow() + timedelta(seconds=self._retry_delay(attempts))
+                values = {'status': 'queued', 'error': error, 'run_at': retry_at, 'locked_by': None}
+                logger.warning("Job %s (%s) attempt %s failed (%s); retrying at %s",
+                               job_id, name, attempts, error, retry_at)
+            self.update(job_id, worker, values)
+            db.session.commit()
+
+    # ------------------------
+    # Housekeeping
+    # ------------------------
+    def heartbeat(self, workers):
+        """Refresh the lease of every job held by `workers`."""
+        table = Job.__table__
+        with db.engine.begin() as conn:
+            conn.execute(table.update()
+                         .where(and_(table.c.status == 'running', table.c.locked_by.in_(workers)))
+                         .values(heartbeat_at=datetime.utcnow()))
+
+    def recover(self):
+        """Queue again the jobs whose worker stopped sending heartbeats."""
+        table = Job.__table__
+        cutoff = datetime.utcnow() - timedelta(seconds=self.lease)
+        with db.engine.begin() as conn:
+            return conn.execute(table.update()
+                                .where(and_(table.c.status == 'running', table.c.heartbeat_at < cutoff))
+                                .values(status='queued', locked_by=None, run_at=datetime.utcnow(),
+                                        error='Worker lost; requeued.')).rowcount
+
+    def purge(self):
+        """Delete finished jobs older than the retention period."""
+        table = Job.__table__
+        cutoff = datetime.utcnow() - timedelta(days=self.retention_days)
+        with db.engine.begin() as conn:
+            return conn.execute(table.delete()
+                                .where(and_(table.c.status.in_(('succeeded', 'failed')),
+                                            table.c.finished_at < cutoff))).rowcount
+
+    # ------------------------
+    # Workers
+    # ------------------------
+    def _work(self, app, worker, stop, burst):
+        """One worker thread: claim and run jobs until stopped (or, in burst mode, idle)."""
+        with app.app_context():
+            while not stop.is_set():
+                try:
+                    job_id = self.claim(worker)
+                except OperationalError:
+                    db.session.rollback()
+                    logger.exception("Worker %s could not claim a job", worker)
+                    job_id = None
+                if job_id is not None:
+                    self.run(job_id, worker)
+                elif burst:
+                    break
+                else:
+                    stop.wait(self.poll_interval)
+                db.session.remove()
+
+    def _housekeeping(self, app, workers, stop):
+        """Heartbeats for this process's workers, lost-job recovery and purging."""
+        interval = max(1.0, self.lease / 3)
+        last_purge = 0.0
+        with app.app_context():
+            while not stop.wait(interval):
+                try:
+                    self.heartbeat(workers)
+                    recovered = self.recover()
+                    if recovered:
+                        logger.warning("Requeued %s jobs of lost workers", recovered)
+                    if time.monotonic() - last_purge > 3600:
+                        last_purge = time.monotonic()
+                        self.purge()
+                except OperationalError:
+                    logger.exception("Job housekeeping failed; retrying in %ss", interval)
+
+    def work(self, app, threads, stop, burst=False):
+        """Run `threads` worker threads in this process until `stop` is set."""
+        prefix = f"{socket.gethostname()}:{os.getpid()}"
+        workers = [f"{prefix}:{i}" for i in range(threads)]
+        with app.app_context():
+            self.recover()
+        pool = [threading.Thread(target=self._work, args=(app, worker, stop, burst), name=worker)
+                for worker in workers]
+        housekeeping = threading.Thread(target=self._housekeeping, args=(app, workers, stop), daemon=True)
+        for thread in pool:
+            thread.start()
+        housekeeping.start()
+        for thread in pool:
+            while thread.is_alive():
+                thread.join(0.5)
+        stop.set()
+
+    def stats(self):
+        """Job counts per status."""
+        counts = dict(db.session.query(Job.status, db.func.count()).group_by(Job.status).all())
+        return {status: counts.get(status, 0) for status in STATUSES}
+
+
+job_queue = JobQueue()
+
+
+def job_dict(job):
+    """JSON-ready representation of a job."""
+    return {
+        'id': job.id,
+        'name': job.name,
+        'status': job.status,
+        'progress': round(job.progress or 0.0, 4),
+        'message': job.message,
+        'attempts': job.attempts,
+        'max_attempts': job.max_attempts,
+        'result': json.loads(job.result) if job.result else None,
+        'error': job.error,
+        'created_at': job.created_at.isoformat() if job.created_at else None,
+        'run_at': job.run_at.isoformat() if job.run_at else None,
+        'started_at': job.started_at.isoformat() if job.started_at else None,
+        'finished_at': job.finished_at.isoformat() if job.finished_at else None,
+    }
+
+
+def recent_jobs(status=None, name=None, limit=50):
+    """Newest jobs first, optionally filtered by status and task name."""
+    query = Job.query
+    if status:
+        query = query.filter(Job.status == status)
+    if name:
+        query = query.filter(Job.name == name)
+    return query.order_by(Job.created_at.desc(), Job.id.desc()).limit(limit).all()
+
+
+# ------------------------
+# CLI
+# ------------------------
+def _process_main(app, threads, burst):
+    """Entry point of a forked worker process."""
+    # Connections inherited from the parent must not be shared with it
+    with app.app_context():
+        for engine in db.engines.values():
+            engine.dispose(close=False)
+    stop = threading.Event()
+    signal.signal(signal.SIGTERM, lambda *_: stop.set())
+    signal.signal(signal.SIGINT, lambda *_: stop.set())
+    job_queue.work(app, threads, stop, burst)
+
+
+@click.command('jobs-worker')
+@click.option('--concurrency', '-c', type=int, default=None, help="Worker threads/processes (JOBS_CONCURRENCY).")
+@click.option('--mode', type=click.Choice(MODES), default=None, help="Threads or forked processes (JOBS_MODE).")
+@click.option('--burst', is_flag=True, help="Exit once no job is due instead of polling forever.")
+@with_appcontext
+def worker_command(concurrency, mode, burst):
+    """Run background jobs until interrupted."""
+    app = current_app._get_current_object()
+    concurrency = concurrency or job_queue.concurrency
+    mode = mode or job_queue.mode
+    click.echo(f"Job worker: {concurrency} {mode}{'es' if mode == 'process' else 's'}, "
+               f"tasks: {', '.join(sorted(job_queue.tasks)) or 'none'}")
+    stop = threading.Event()
+    if mode == 'thread':
+        signal.signal(signal.SIGTERM, lambda *_: stop.set())
+        signal.signal(signal.SIGINT, lambda *_: stop.set())
+        job_queue.work(app, concurrency, stop, burst)
+        return
+    # Fork so children inherit the configured app (and its registered tasks)
+    context = multiprocessing.get_context('fork')
+    for engine in db.engines.values():
+        engine.dispose()
+    children = [context.Process(target=_process_main, args=(app, 1, burst), name=f'jobs-{i}')
+                for i in range(concurrency)]
+    for child in children:
+        child.start()
+
+    def forward(signum, frame):
+        for child in children:
+            if child.is_alive():
+                os.kill(child.pid, signal.SIGTERM)
+    signal.signal(signal.SIGTERM, forward)
+    signal.signal(signal.SIGINT, forward)
+    for child in children:
+        child.join()
+
+
+@click.command('jobs-submit')
+@click.argument('name')
+@click.option('--payload', default=None, help="Task arguments as a JSON object.")
+@with_appcontext
+def submit_command(name, payload):
+    """Queue a background job."""
+    try:
+        job = job_queue.submit(name, json.loads(payload) if payload else None)
+    except ValueError as e:
+        raise click.BadParameter(str(e))
+    db.session.commit()
+    click.echo(f"[SUCCESS] Job {job.id} ({name}) queued.")
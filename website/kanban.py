@@ -0,0 +1,193 @@
+"""
+Kanban board queries for the dashboard.
+
+- column_counts: card count for every status from one GROUP BY.
+- first_pages: newest cards of every column in a single round trip.
+- column_page: keyset-paginated "load more" for one column.
+- apply_moves: batch stage transitions with optimistic concurrency.
+All card queries eager-load equipment and technician so rendering a card never
+triggers a lazy load.
+"""
+
+from collections import defaultdict
+from datetime import datetime
+
+from sqlalchemy import func, select, union_all, update, tuple_
+from sqlalchemy.orm import joinedload
+
+from models import db, MaintenanceRequest
+from pagination import encode_cursor, after_key, next_page_cursor
+from changes import TRACKED_FIELDS, RequestChange, state_from_row, publish
+
+# Kanban columns in display order, with the labels used by the UI
+STATUS_LABELS = {
+    'new': 'New Request',
+    'in_progress': 'In Progress',
+    'repaired': 'Repaired',
+    'scrap': 'Scrap',
+}
+STAGE_TO_STATUS = {label: status for status, label in STATUS_LABELS.items()}
+
+# Cards rendered per column before "load more"
+PAGE_SIZE = 50
+# Upper bound for moves accepted in one batch request
+MAX_BATCH_MOVES = 1000
+
+SORT_KEY = (MaintenanceRequest.created_at, MaintenanceRequest.id)
+# Types of a decoded column cursor (see pagination.decode_cursor)
+CURSOR_TYPES = (datetime, int)
+
+
+def _card_query():
+    """Base query for cards: eager-load what the card template reads."""
+    return MaintenanceRequest.query.options(
+        joinedload(MaintenanceRequest.equipment),
+        joinedload(MaintenanceRequest.technician),
+    )
+
+
+def _newest_first(query):
+    return query.order_by(MaintenanceRequest.created_at.desc(), MaintenanceRequest.id.desc())
+
+
+def next_cursor(cards, has_more):
+    """Cursor pointing after the last card, or None when the column is exhausted."""
+    if not has_more or not cards:
+        return None
+    last = cards[-1]
+    return encode_cursor(last.created_at, last.id)
+
+
+def column_counts():
+    """Return {status: count} for every Kanban column using one GROUP BY."""
+    counts = dict.fromkeys(STATUS_LABELS, 0)
+    rows = db.session.query(MaintenanceRequest.status, func.count(MaintenanceRequest.id))\
+                     .group_by(MaintenanceRequest.status)\
+                     .all()
+    for status, count in rows:
+        if status in counts:
+            counts[status] = count
+    return counts
+
+
+def first_pages(limit=PAGE_SIZE):
+    """
+    Return {status: [cards]} with the newest `limit` cards of every column.
+    The per-status top-N id lists are combined with UNION ALL so the whole board
+    loads in one statement; each branch is a bounded index range scan.
+    """
+    branches = []
+    for status in STATUS_LABELS:
+        top = select(MaintenanceRequest.id)\
+            .where(MaintenanceRequest.status == status)\
+            .order_by(MaintenanceRequest.created_at.desc(), MaintenanceRequest.id.desc())\
+            .limit(limit)\
+            .subquery()
+        branches.append(select(top.c.id))
+
+    cards = _newest_first(_card_query().filter(MaintenanceRequest.id.in_(union_all(*branches)))).all()
+
+    columns = {status: [] for status in STATUS_LABELS}
+    for card in cards:
+        columns[card.status].append(card)
+    return columns
+
+
+def column_page(status, cursor_key=None, limit=PAGE_SIZE):
+    """
+    Return (cards, next_cursor) for one column, starting after `cursor_key`
+    (a decoded (created_at, id) pair) when given.
+    """
+    query = _card_query().filter(MaintenanceRequest.status == status)
+    if cursor_key:
+        query = query.filter(after_key(SORT_KEY, cursor_key))
+    # Fetch one extra row to know whether another page exists
+    cards = _newest_first(query).limit(limit + 1).all()
+    return next_page_cursor(cards, limit, lambda card: (card.created_at, card.id))
+
+
+def _parse_move(item):
+    """Validate one move; return (task_id, status, expected_version) or None."""
+    if not isinstance(item, dict):
+        return None
+    try:
+        task_id = int(item.get('task_id'))
+        expected_version = int(item.get('expected_version'))
+    except (TypeError, ValueError):
+        return None
+    status = STAGE_TO_STATUS.get(item.get('new_stage'))
+    if not status:
+        return None
+    return task_id, status, expected_version
+
+
+def apply_moves(moves):
+    """
+    Apply a batch of Kanban moves in one transaction.
+    Each move is {task_id, new_stage, expected_version}. Current versions are read
+    (and row-locked where supported) in one SELECT, then one bulk UPDATE per
+    target status bumps version for every move whose expected_version matches.
+    Returns one result per input item with status 'ok', 'conflict',
+    'not_found' or 'invalid'; applied moves are published as RequestChanges.
+    The caller commits.
+    """
+    results = [None] * len(moves)
+    accepted = {}  # task_id -> (index, status, expected_version)
+    for index, item in enumerate(moves):
+        parsed = _parse_move(item)
+        task_id = item.get('task_id') if isinstance(item, dict) else None
+        if parsed is None or parsed[0] in accepted:
+            # Malformed, unknown stage, or the same card moved twice in one batch
+            results[index] = {'task_id': task_id, 'status': 'invalid'}
+            continue
+        accepted[parsed[0]] = (index, parsed[1], parsed[2])
+
+    current = {}
+    previous = {}
+    if accepted:
+        # Read the tracked columns too: they feed the change notifications below
+        rows = db.session.query(MaintenanceRequest.id,
+                                *(getattr(MaintenanceRequest, f) for f in TRACKED_FIELDS))\
+                         .filter(MaintenanceRequest.id.in_(list(accepted)))\
+                         .with_for_update()\
+                         .all()
+        previous = {row.id: state_from_row(row) for row in rows}
+        current = {task_id: state.version for task_id, state in previous.items()}
+
+    changes = []
+    by_status = defaultdict(list)
+    for task_id, (index, status, expected_version) in accepted.items():
+        if task_id not in current:
+            results[index] = {'task_id': task_id, 'status': 'not_found'}
+        elif current[task_id] != expected_version:
+            results[index] = {'task_id': task_id, 'status': 'conflict', 'version': current[task_id]}
+        else:
+            by_status[status].append((task_id, expected_version))
+
+    for status, pairs in by_status.items():
+        # The (id, version) guard keeps the UPDATE safe even without row locks
+        result = db.session.execute(
+            update(MaintenanceRequest)
+            .where(tuple_(MaintenanceRequest.id, MaintenanceRequest.version).in_(pairs))
+            .values(status=status, version=MaintenanceRequest.version + 1)
+            .execution_options(synchronize_session=False)
+        )
+        applied = {task_id for task_id, _ in pairs}
+        if result.rowcount != len(pairs):
+            # Someone slipped in between the read and the write; find out who lost
+            applied = {task_id for task_id, version in
+                       db.session.query(MaintenanceRequest.id, MaintenanceRequest.version)
+                                 .filter(MaintenanceRequest.id.in_(list(applied)))
+                       if version == current[task_id] + 1}
+        for task_id, expected_version in pairs:
+            index = accepted[task_id][0]
+            if task_id in applied:
+                results[index] = {'task_id': task_id, 'status': 'ok', 'version': expected_version + 1}
+                old = previous[task_id]
+                changes.append(RequestChange(task_id, old, old._replace(status=status, version=expected_version + 1)))
+            else:
+                results[index] = {'task_id': task_id, 'status': 'conflict'}
+
+    # Bulk UPDATEs bypass the unit of work, so report them explicitly
+    publish(db.session(), changes)
+    return results
@@ -0,0 +1,68 @@
+"""request version and reporting rollups
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2026-10-18 17:09:42.461576
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0002'
+down_revision = '0001'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('maintenance_request', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('version', sa.Integer(), server_default='1', nullable=False))
+
+    op.create_table('monthly_rollup',
+    sa.Column('month', sa.Date(), nullable=False),
+    sa.Column('status', sa.String(length=20), nullable=False),
+    sa.Column('request_count', sa.Integer(), nullable=False),
+    sa.Column('duration_total', sa.Float(), nullable=False),
+    sa.PrimaryKeyConstraint('month', 'status')
+    )
+    op.create_table('equipment_rollup',
+    sa.Column('equipment_id', sa.Integer(), nullable=False),
+    sa.Column('status', sa.String(length=20), nullable=False),
+    sa.Column('request_count', sa.Integer(), nullable=False),
+    sa.Column('duration_total', sa.Float(), nullable=False),
+    sa.ForeignKeyConstraint(['equipment_id'], ['equipment.id'], ),
+    sa.PrimaryKeyConstraint('equipment_id', 'status')
+    )
+    op.create_table('team_rollup',
+    sa.Column('team_id', sa.Integer(), nullable=False),
+    sa.Column('status', sa.String(length=20), nullable=False),
+    sa.Column('request_count', sa.Integer(), nullable=False),
+    sa.Column('duration_total', sa.Float(), nullable=False),
+    sa.ForeignKeyConstraint(['team_id'], ['maintenance_team.id'], ),
+    sa.PrimaryKeyConstraint('team_id', 'status')
+    )
+
+    # Backfill the rollups from existing requests
+    if op.get_bind().dialect.name == 'postgresql':
+        month = "CAST(date_trunc('month', created_at) AS DATE)"
+    else:
+        month = "date(created_at, 'start of month')"
+    op.execute(
+        "INSERT INTO monthly_rollup (month, status, request_count, duration_total) "
+        f"SELECT {month}, status, COUNT(id), COALESCE(SUM(duration_hours), 0) FROM maintenance_request "
+        f"WHERE created_at IS NOT NULL GROUP BY {month}, status")
+    for key, table in (('equipment_id', 'equipment_rollup'), ('team_id', 'team_rollup')):
+        op.execute(
+            f"INSERT INTO {table} ({key}, status, request_count, duration_total) "
+            f"SELECT {key}, status, COUNT(id), COALESCE(SUM(duration_hours), 0) FROM maintenance_request "
+            f"WHERE {key} IS NOT NULL GROUP BY {key}, status")
+
+
+def downgrade():
+    op.drop_table('team_rollup')
+    op.drop_table('equipment_rollup')
+    op.drop_table('monthly_rollup')
+    with op.batch_alter_table('maintenance_request', schema=None) as batch_op:
+        batch_op.drop_column('version')
@@ -0,0 +1,45 @@
+"""request full-text search
+
+Revision ID: 0006
+Revises: 0005
+Create Date: 2026-10-18 17:41:02.118230
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0006'
+down_revision = '0005'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # The index is dialect specific and not part of the ORM metadata (see search.py)
+    if op.get_bind().dialect.name == 'postgresql':
+        op.execute(
+            "CREATE TABLE request_search ("
+            "request_id INTEGER PRIMARY KEY REFERENCES maintenance_request (id) ON DELETE CASCADE,"
+            " document TSVECTOR NOT NULL)")
+        op.execute("CREATE INDEX ix_request_search_document ON request_search USING GIN (document)")
+        op.execute(
+            "INSERT INTO request_search (request_id, document) "
+            "SELECT r.id, "
+            "setweight(to_tsvector('english', coalesce(r.description, '')), 'A') || "
+            "setweight(to_tsvector('english', coalesce(e.name, '')), 'B') || "
+            "setweight(to_tsvector('english', coalesce(e.serial_number, '') || ' ' || coalesce(e.location, '')), 'C') "
+            "FROM maintenance_request r JOIN equipment e ON e.id = r.equipment_id")
+    else:
+        op.execute(
+            "CREATE VIRTUAL TABLE request_search USING fts5("
+            "description, equipment, serial_number, location, tokenize='porter unicode61')")
+        op.execute(
+            "INSERT INTO request_search (rowid, description, equipment, serial_number, location) "
+            "SELECT r.id, r.description, e.name, e.serial_number, e.location "
+            "FROM maintenance_request r JOIN equipment e ON e.id = r.equipment_id")
+
+
+def downgrade():
+    op.execute("DROP TABLE request_search")
@@ -0,0 +1,32 @@
+"""repair technician workloads
+
+Revision ID: 0014
+Revises: 0013
+Create Date: 2026-10-18 18:25:43.886109
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0014'
+down_revision = '0013'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # The 0007 backfill (and `flask rebuild-workload` until now) gave every idle technician
+    # the 4 h default estimate of a request they don't have; recount from their open requests
+    open_work = ("FROM maintenance_request r WHERE r.technician_id = technician_workload.technician_id "
+                 "AND r.status IN ('new', 'in_progress')")
+    op.execute(
+        f"UPDATE technician_workload SET "
+        f"open_requests = (SELECT COUNT(*) {open_work}), "
+        f"estimated_hours = (SELECT COALESCE(SUM(COALESCE(r.estimated_hours, 4.0)), 0.0) {open_work})")
+
+
+def downgrade():
+    # Data repair only: nothing to undo
+    pass
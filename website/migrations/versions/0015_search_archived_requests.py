@@ -0,0 +1,50 @@
+"""search archived requests
+
+Revision ID: 0015
+Revises: 0014
+Create Date: 2026-10-18 18:29:09.248609
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0015'
+down_revision = '0014'
+branch_labels = None
+depends_on = None
+
+
+# Same documents as search._index_where, over the archive
+_PG_INDEX_ARCHIVE = (
+    "INSERT INTO request_search (request_id, document) "
+    "SELECT r.id, "
+    "setweight(to_tsvector('english', coalesce(r.description, '')), 'A') || "
+    "setweight(to_tsvector('english', coalesce(e.name, '')), 'B') || "
+    "setweight(to_tsvector('english', coalesce(e.serial_number, '') || ' ' || coalesce(e.location, '')), 'C') "
+    "FROM maintenance_request_archive r JOIN equipment e ON e.id = r.equipment_id "
+    "ON CONFLICT (request_id) DO UPDATE SET document = excluded.document")
+_SQLITE_INDEX_ARCHIVE = (
+    "INSERT INTO request_search (rowid, description, equipment, serial_number, location) "
+    "SELECT r.id, r.description, e.name, e.serial_number, e.location "
+    "FROM maintenance_request_archive r JOIN equipment e ON e.id = r.equipment_id")
+
+
+def upgrade():
+    # Archived requests stay searchable: the index no longer references maintenance_request
+    # (its cascade dropped entries as requests moved), and requests archived so far are indexed again
+    if op.get_bind().dialect.name == 'postgresql':
+        op.execute("ALTER TABLE request_search DROP CONSTRAINT IF EXISTS request_search_request_id_fkey")
+        op.execute(_PG_INDEX_ARCHIVE)
+    else:
+        op.execute("DELETE FROM request_search WHERE rowid IN (SELECT id FROM maintenance_request_archive)")
+        op.execute(_SQLITE_INDEX_ARCHIVE)
+
+
+def downgrade():
+    key = 'request_id' if op.get_bind().dialect.name == 'postgresql' else 'rowid'
+    op.execute(f"DELETE FROM request_search WHERE {key} IN (SELECT id FROM maintenance_request_archive)")
+    if op.get_bind().dialect.name == 'postgresql':
+        op.execute("ALTER TABLE request_search ADD CONSTRAINT request_search_request_id_fkey "
+                   "FOREIGN KEY (request_id) REFERENCES maintenance_request (id) ON DELETE CASCADE")
@@ -0,0 +1,48 @@
+"""updated_at on reference tables
+
+Revision ID: 0016
+Revises: 0015
+Create Date: 2026-10-18 19:02:41.518204
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0016'
+down_revision = '0015'
+branch_labels = None
+depends_on = None
+
+
+# Table -> best "last write" existing rows have (see 0011)
+_BACKFILL = {
+    'department': 'CURRENT_TIMESTAMP',
+    'maintenance_team': 'CURRENT_TIMESTAMP',
+    'technician': 'CURRENT_TIMESTAMP',
+    'maintenance_plan': 'COALESCE(created_at, CURRENT_TIMESTAMP)',
+    'failure_prediction_run': 'finished_at',
+}
+
+
+def upgrade():
+    # Renames and moves of teams, technicians and plans change the pages' ETags (see http_cache.py)
+    for table in _BACKFILL:
+        with op.batch_alter_table(table, schema=None) as batch_op:
+            batch_op.add_column(sa.Column('updated_at', sa.DateTime(), nullable=True))
+
+    for table, value in _BACKFILL.items():
+        op.execute(f"UPDATE {table} SET updated_at = {value}")
+
+    for table in _BACKFILL:
+        with op.batch_alter_table(table, schema=None) as batch_op:
+            batch_op.alter_column('updated_at', existing_type=sa.DateTime(), nullable=False)
+            batch_op.create_index(batch_op.f(f'ix_{table}_updated_at'), ['updated_at'], unique=False)
+
+
+def downgrade():
+    for table in reversed(list(_BACKFILL)):
+        with op.batch_alter_table(table, schema=None) as batch_op:
+            batch_op.drop_index(batch_op.f(f'ix_{table}_updated_at'))
+            batch_op.drop_column('updated_at')
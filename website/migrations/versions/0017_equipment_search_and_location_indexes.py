@@ -0,0 +1,34 @@
+"""equipment search and location sort indexes
+
+Revision ID: 0017
+Revises: 0016
+Create Date: 2026-10-18 19:24:13.906512
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0017'
+down_revision = '0016'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Expression indexes matching equipment_listing: the location sort key and the prefix search
+    with op.batch_alter_table('equipment', schema=None) as batch_op:
+        batch_op.create_index('ix_equipment_location_name', [sa.text("coalesce(location, '')"), 'name', 'id'],
+                              unique=False)
+        batch_op.create_index('ix_equipment_lower_name', [sa.text('lower(name)')], unique=False)
+        batch_op.create_index('ix_equipment_lower_serial_number', [sa.text('lower(serial_number)')], unique=False)
+        batch_op.create_index('ix_equipment_lower_location', [sa.text('lower(location)')], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('equipment', schema=None) as batch_op:
+        batch_op.drop_index('ix_equipment_lower_location')
+        batch_op.drop_index('ix_equipment_lower_serial_number')
+        batch_op.drop_index('ix_equipment_lower_name')
+        batch_op.drop_index('ix_equipment_location_name')
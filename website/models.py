@@ -2,13 +2,18 @@ from flask_sqlalchemy import SQLAlchemy
 from flask_login import UserMixin
 from datetime import datetime
 
+from routing import RoutingSession
+
 # 👇 DATABASE INSTANCE YAHIN BANEGA
-db = SQLAlchemy()
+# (its session routes the reads of replica-enabled requests to read replicas, see routing.py)
+db = SQLAlchemy(session_options={'class_': RoutingSession})
 
 # 1. DEPARTMENTS
 class Department(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     name = db.Column(db.String(100), unique=True, nullable=False)
+    updated_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow, onupdate=datetime.utcnow,
+                           index=True)
     users = db.relationship('User', backref='department', lazy=True)
     equipment = db.relationship('Equipment', backref='department', lazy=True)
 
@@ -16,6 +21,8 @@ class Department(db.Model):
 class MaintenanceTeam(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     name = db.Column(db.String(100), unique=True, nullable=False)
+    updated_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow, onupdate=datetime.utcnow,
+                           index=True)
     technicians = db.relationship('Technician', backref='team', lazy=True)
     equipment = db.relationship('Equipment', backref='team', lazy=True)
 
@@ -35,6 +42,8 @@ class Technician(db.Model):
     name = db.Column(db.String(150), nullable=False)
     password_hash = db.Column(db.String(256), nullable=False)
     team_id = db.Column(db.Integer, db.ForeignKey('maintenance_team.id'), nullable=False)
+    updated_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow, onupdate=datetime.utcnow,
+                           index=True)
 
 # 5. EQUIPMENT (Machines)
 class Equipment(db.Model):
@@ -42,9 +51,29 @@ class Equipment(db.Model):
     name = db.Column(db.String(100), nullable=False)
     serial_number = db.Column(db.String(100), unique=True, nullable=False)
     location = db.Column(db.String(100))
+    category = db.Column(db.String(50))  # equipment type, e.g. "Hydraulic Press"; drives repair estimates
     department_id = db.Column(db.Integer, db.ForeignKey('department.id'))
     team_id = db.Column(db.Integer, db.ForeignKey('maintenance_team.id'))
+    # Production cell the machine runs in; its cost_per_hour prices the machine's downtime
+    work_center_id = db.Column(db.Integer, db.ForeignKey('work_center.id'), nullable=True)
+    # Last write (ORM or Core UPDATE); max(updated_at) validates cached pages (see http_cache.py)
+    updated_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow, onupdate=datetime.utcnow)
     requests = db.relationship('MaintenanceRequest', backref='equipment', lazy=True)
+    health = db.relationship('EquipmentHealth', uselist=False, lazy=True)
+    work_center = db.relationship('WorkCenter', lazy=True)
+
+    # Keyset pagination of the equipment list: each sort/filter pairs with its own index;
+    # the expression indexes match equipment_listing's location sort and prefix search
+    __table_args__ = (
+        db.Index('ix_equipment_name', 'name', 'id'),
+        db.Index('ix_equipment_department_name', 'department_id', 'name', 'id'),
+        db.Index('ix_equipment_team_name', 'team_id', 'name', 'id'),
+        db.Index('ix_equipment_location_name', db.func.coalesce(location, db.literal_column("''")), name, id),
+        db.Index('ix_equipment_lower_name', db.func.lower(name)),
+        db.Index('ix_equipment_lower_serial_number', db.func.lower(serial_number)),
+        db.Index('ix_equipment_lower_location', db.func.lower(location)),
+        db.Index('ix_equipment_updated_at', 'updated_at'),
+    )
 
 # 6. MAINTENANCE REQUESTS
 class MaintenanceRequest(db.Model):
@@ -57,11 +86,28 @@ class MaintenanceRequest(db.Model):
     created_by = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     duration_hours = db.Column(db.Float, default=0.0)
+    estimated_hours = db.Column(db.Float, nullable=True)  # expected repair time, set on assignment
+    # Optimistic concurrency: bumped on every update, stale writers are rejected
+    version = db.Column(db.Integer, nullable=False, default=1, server_default='1')
+    # Last write (ORM or Core UPDATE); max(updated_at) validates cached pages (see http_cache.py)
+    updated_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow, onupdate=datetime.utcnow)
     
     # Relationships for easy access
     technician = db.relationship('Technician', backref='requests')
     creator = db.relationship('User', backref='requests')
 
+    # Indexes follow the app's access paths: Kanban columns and request lists
+    # (status/created_at), per-machine/team/technician lookups, date ranges.
+    __table_args__ = (
+        db.Index('ix_maintenance_request_status_created_at', 'status', 'created_at', 'id'),
+        db.Index('ix_maintenance_request_created_at', 'created_at', 'id'),
+        db.Index('ix_maintenance_request_equipment_status', 'equipment_id', 'status'),
+        db.Index('ix_maintenance_request_team_status', 'team_id', 'status'),
+        db.Index('ix_maintenance_request_technician_status', 'technician_id', 'status'),
+        db.Index('ix_maintenance_request_updated_at', 'updated_at'),
+    )
+    __mapper_args__ = {'version_id_col': version}
+
 # 7. WORK CENTERS
 class WorkCenter(db.Model):
     id = db.Column(db.Integer, primary_key=True)
@@ -69,4 +115,181 @@ class WorkCenter(db.Model):
     code = db.Column(db.String(50), unique=True, nullable=False)
     cost_per_hour = db.Column(db.Float, default=0.0)
     capacity_efficiency = db.Column(db.Integer, default=100)
-    oee_target = db.Column(db.Integer, default=85)
\ No newline at end of file
+    oee_target = db.Column(db.Integer, default=85)
+    updated_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow, onupdate=datetime.utcnow,
+                           index=True)
+
+# 8. REPORTING ROLLUPS (kept in step with MaintenanceRequest by rollups.py)
+class MonthlyRollup(db.Model):
+    month = db.Column(db.Date, primary_key=True)  # first day of the month requests were created in
+    status = db.Column(db.String(20), primary_key=True)
+    request_count = db.Column(db.Integer, nullable=False, default=0)
+    duration_total = db.Column(db.Float, nullable=False, default=0.0)
+
+class EquipmentRollup(db.Model):
+    equipment_id = db.Column(db.Integer, db.ForeignKey('equipment.id'), primary_key=True)
+    status = db.Column(db.String(20), primary_key=True)
+    request_count = db.Column(db.Integer, nullable=False, default=0)
+    duration_total = db.Column(db.Float, nullable=False, default=0.0)
+
+class TeamRollup(db.Model):
+    team_id = db.Column(db.Integer, db.ForeignKey('maintenance_team.id'), primary_key=True)
+    status = db.Column(db.String(20), primary_key=True)
+    request_count = db.Column(db.Integer, nullable=False, default=0)
+    duration_total = db.Column(db.Float, nullable=False, default=0.0)
+
+# 9. PREVENTIVE MAINTENANCE PLANS (occurrences are expanded on read, see scheduler.py)
+class MaintenancePlan(db.Model):
+    id = db.Column(db.Integer, primary_key=True)
+    title = db.Column(db.String(150), nullable=False)
+    equipment_id = db.Column(db.Integer, db.ForeignKey('equipment.id'), nullable=True)
+    work_center_id = db.Column(db.Integer, db.ForeignKey('work_center.id'), nullable=True)
+    # Recurrence: every N days, or every N run-hours at an expected daily utilization
+    interval_days = db.Column(db.Integer, nullable=True)
+    interval_run_hours = db.Column(db.Float, nullable=True)
+    run_hours_per_day = db.Column(db.Float, nullable=True)
+    start_date = db.Column(db.Date, nullable=False)
+    end_date = db.Column(db.Date, nullable=True)
+    active = db.Column(db.Boolean, nullable=False, default=True, server_default=db.true())
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    updated_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow, onupdate=datetime.utcnow,
+                           index=True)
+
+    equipment = db.relationship('Equipment', backref='maintenance_plans')
+    work_center = db.relationship('WorkCenter', backref='maintenance_plans')
+
+    __table_args__ = (
+        db.Index('ix_maintenance_plan_active_start_date', 'active', 'start_date'),
+    )
+
+# 10. EQUIPMENT HEALTH (kept in step with MaintenanceRequest by equipment_health.py)
+class EquipmentHealth(db.Model):
+    equipment_id = db.Column(db.Integer, db.ForeignKey('equipment.id'), primary_key=True)
+    open_requests = db.Column(db.Integer, nullable=False, default=0)        # new + in_progress
+    in_progress_requests = db.Column(db.Integer, nullable=False, default=0)
+    scrap_requests = db.Column(db.Integer, nullable=False, default=0)
+    last_failure_at = db.Column(db.DateTime, nullable=True)                 # newest request created_at
+    state = db.Column(db.String(20), nullable=False, default='active')     # active, maintenance, scrapped
+
+    __table_args__ = (
+        db.Index('ix_equipment_health_state', 'state', 'equipment_id'),
+        db.Index('ix_equipment_health_open_requests', 'open_requests', 'equipment_id'),
+    )
+
+# 11. TECHNICIAN WORKLOAD (kept in step with MaintenanceRequest by assignment.py)
+class TechnicianWorkload(db.Model):
+    technician_id = db.Column(db.Integer, db.ForeignKey('technician.id', ondelete='CASCADE'), primary_key=True)
+    team_id = db.Column(db.Integer, db.ForeignKey('maintenance_team.id'), nullable=False)
+    open_requests = db.Column(db.Integer, nullable=False, default=0)      # assigned new + in_progress
+    estimated_hours = db.Column(db.Float, nullable=False, default=0.0)    # summed estimates of that work
+
+    technician = db.relationship('Technician', backref=db.backref('workload', uselist=False))
+
+    # Least-loaded technician of a team = first entry of this index
+    __table_args__ = (
+        db.Index('ix_technician_workload_team_load', 'team_id', 'estimated_hours', 'open_requests', 'technician_id'),
+    )
+
+# 12. FAILURE PREDICTION (written by the batch job in failure_prediction.py)
+class EquipmentRisk(db.Model):
+    equipment_id = db.Column(db.Integer, db.ForeignKey('equipment.id', ondelete='CASCADE'), primary_key=True)
+    failures = db.Column(db.Integer, nullable=False)              # requests in the fitted history
+    model = db.Column(db.String(20), nullable=False)              # weibull, exponential, fleet
+    shape = db.Column(db.Float, nullable=False)                   # Weibull k (1 = exponential)
+    scale_hours = db.Column(db.Float, nullable=False)             # Weibull lambda
+    mean_interval_hours = db.Column(db.Float, nullable=False)     # fitted mean time between failures
+    last_failure_at = db.Column(db.DateTime, nullable=False)
+    next_failure_at = db.Column(db.DateTime, nullable=False)      # median of the next failure time
+    risk = db.Column(db.Float, nullable=False)                    # P(failure within the horizon) at fitted_at
+    fitted_at = db.Column(db.DateTime, nullable=False)
+
+    equipment = db.relationship('Equipment', backref=db.backref('risk', uselist=False, passive_deletes=True))
+
+    __table_args__ = (
+        db.Index('ix_equipment_risk_risk', 'risk', 'equipment_id'),
+        db.Index('ix_equipment_risk_next_failure_at', 'next_failure_at', 'equipment_id'),
+    )
+
+class FailurePredictionRun(db.Model):
+    id = db.Column(db.Integer, primary_key=True)
+    mode = db.Column(db.String(20), nullable=False)               # full, incremental
+    started_at = db.Column(db.DateTime, nullable=False)
+    finished_at = db.Column(db.DateTime, nullable=False)
+    watermark = db.Column(db.Integer, nullable=False)             # highest request id the run had seen
+    equipment_count = db.Column(db.Integer, nullable=False)       # machines refitted
+    updated_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow, onupdate=datetime.utcnow,
+                           index=True)
+
+# 13. BACKGROUND JOBS (queued by requests, run by `flask jobs-worker`, see jobs.py)
+class Job(db.Model):
+    id = db.Column(db.Integer, primary_key=True)
+    name = db.Column(db.String(100), nullable=False)              # registered task name
+    payload = db.Column(db.Text, nullable=False)                  # task arguments as JSON
+    status = db.Column(db.String(20), nullable=False, default='queued')  # queued, running, succeeded, failed
+    attempts = db.Column(db.Integer, nullable=False, default=0)
+    max_attempts = db.Column(db.Integer, nullable=False, default=3)
+    run_at = db.Column(db.DateTime, nullable=False)               # not before (retries back off)
+    progress = db.Column(db.Float, nullable=False, default=0.0)   # 0..1
+    message = db.Column(db.String(200))
+    result = db.Column(db.Text)                                   # task return value as JSON
+    error = db.Column(db.Text)                                    # last failure
+    locked_by = db.Column(db.String(100))                         # host:pid:thread of the running worker
+    heartbeat_at = db.Column(db.DateTime)
+    created_by = db.Column(db.Integer, db.ForeignKey('user.id', name='fk_job_created_by_user', ondelete='SET NULL'))
+    created_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+    started_at = db.Column(db.DateTime)
+    finished_at = db.Column(db.DateTime)
+
+    __table_args__ = (
+        db.Index('ix_job_status_run_at', 'status', 'run_at', 'id'),
+        db.Index('ix_job_created_at', 'created_at'),
+    )
+
+# 14. STATUS HISTORY (append-only, written with every status change by status_history.py)
+class StatusTransition(db.Model):
+    # ts is part of the key because PostgreSQL partitions the table by month on it.
+    # No foreign key on request_id: the request is in maintenance_request or, once
+    # archived, in maintenance_request_archive (deletes are cascaded by status_history.py)
+    request_id = db.Column(db.Integer, primary_key=True, autoincrement=False)
+    version = db.Column(db.Integer, primary_key=True, autoincrement=False)  # request version the change produced
+    ts = db.Column(db.DateTime, primary_key=True, default=datetime.utcnow)
+    from_status = db.Column(db.String(20), nullable=True)        # None when the request was created
+    to_status = db.Column(db.String(20), nullable=False)
+    technician_id = db.Column(db.Integer, db.ForeignKey('technician.id', ondelete='SET NULL'), nullable=True)
+
+    __table_args__ = (
+        db.Index('ix_status_transition_request_ts', 'request_id', 'ts'),
+        db.Index('ix_status_transition_ts', 'ts'),
+        {'postgresql_partition_by': 'RANGE (ts)'},
+    )
+
+# 15. ARCHIVED REQUESTS (closed requests moved out of maintenance_request by archive.py)
+class ArchivedRequest(db.Model):
+    __tablename__ = 'maintenance_request_archive'
+    # Same columns and ids as MaintenanceRequest; rows are read-only once archived
+    id = db.Column(db.Integer, primary_key=True, autoincrement=False)
+    description = db.Column(db.String(500), nullable=False)
+    status = db.Column(db.String(20), nullable=False)  # repaired, scrap
+    equipment_id = db.Column(db.Integer, db.ForeignKey('equipment.id'), nullable=False)
+    team_id = db.Column(db.Integer, db.ForeignKey('maintenance_team.id'))
+    technician_id = db.Column(db.Integer, db.ForeignKey('technician.id'), nullable=True)
+    created_by = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
+    created_at = db.Column(db.DateTime)
+    duration_hours = db.Column(db.Float)
+    estimated_hours = db.Column(db.Float, nullable=True)
+    version = db.Column(db.Integer, nullable=False)
+    updated_at = db.Column(db.DateTime, nullable=False)  # last write before archiving
+    archived_at = db.Column(db.DateTime, nullable=False)
+
+    equipment = db.relationship('Equipment')
+    technician = db.relationship('Technician')
+    creator = db.relationship('User')
+
+    # Date ranges (lists, calendar, analytics), per-machine history, the newest
+    # archived update (archive.horizon) and the last run (validates cached pages)
+    __table_args__ = (
+        db.Index('ix_maintenance_request_archive_created_at', 'created_at', 'id'),
+        db.Index('ix_maintenance_request_archive_equipment_created_at', 'equipment_id', 'created_at'),
+        db.Index('ix_maintenance_request_archive_updated_at', 'updated_at'),
+        db.Index('ix_maintenance_request_archive_archived_at', 'archived_at'),
+    )
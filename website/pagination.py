@@ -0,0 +1,99 @@
+"""
+Keyset (cursor) pagination helpers.
+
+Pages are addressed by the sort key of the last row already shown instead of
+an OFFSET, so fetching page N costs the same index range scan as page 1.
+- encode_cursor / decode_cursor: turn a sort key into an opaque URL-safe token and back.
+- after_key: WHERE clause selecting rows strictly after a sort key.
+- next_page_cursor: trim a limit+1 fetch to a page and compute its next cursor.
+- page_size / parse_int: client supplied limits and integer filter arguments.
+"""
+
+import base64
+import json
+from datetime import datetime
+
+from sqlalchemy import tuple_
+
+# Upper bound for client supplied page sizes
+MAX_PAGE_SIZE = 200
+# What a decoded cursor may hold: sort key values, never lists or objects
+_SCALARS = (str, int, float, type(None), datetime)
+
+
+def encode_cursor(*values):
+    """Encode a sort key (e.g. created_at, id) as an opaque cursor string."""
+    payload = [{'dt': v.isoformat()} if isinstance(v, datetime) else v for v in values]
+    raw = json.dumps(payload, separators=(',', ':')).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+
+def decode_cursor(cursor, types=None):
+    """
+    Decode a cursor produced by encode_cursor.
+    Returns None for an empty cursor; raises ValueError if it is malformed: not
+    a list of scalars, or (when `types` is given, one per sort column) of the
+    wrong length or types.
+    """
+    if not cursor:
+        return None
+    try:
+        raw = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4))
+        payload = json.loads(raw)
+        if not isinstance(payload, list):
+            raise TypeError(payload)
+        values = [datetime.fromisoformat(v['dt']) if isinstance(v, dict) else v for v in payload]
+    except (ValueError, TypeError, KeyError) as e:
+        raise ValueError(f"Invalid cursor: {cursor!r}") from e
+    if not all(isinstance(v, _SCALARS) for v in values) or types is not None and (
+            len(values) != len(types) or not all(isinstance(v, t) for v, t in zip(values, types))):
+        raise ValueError(f"Invalid cursor: {cursor!r}")
+    return values
+
+
+def after_key(columns, values, descending=True):
+    """
+    Build a row-value comparison selecting rows after `values` in the sort order
+    given by `columns`. Uses (a, b) < (x, y) so a composite index on the same
+    columns serves both the filter and the ORDER BY.
+    """
+    if len(columns) != len(values):
+        raise ValueError("Cursor does not match the sort key.")
+    if descending:
+        return tuple_(*columns) < tuple_(*values)
+    return tuple_(*columns) > tuple_(*values)
+
+
+def next_page_cursor(rows, limit, sort_key):
+    """
+    Split a query fetched with LIMIT limit+1 into (page, next_cursor).
+    `sort_key(row)` returns the values the query is ordered by; next_cursor is
+    None when there is no further page.
+    """
+    page = rows[:limit]
+    if len(rows) <= limit or not page:
+        return page, None
+    return page, encode_cursor(*sort_key(page[-1]))
+
+
+def page_size(value, default=50):
+    """Parse a client supplied limit, clamped to [1, MAX_PAGE_SIZE]."""
+    try:
+        size = int(value) if value is not None else default
+    except (TypeError, ValueError):
+        size = default
+    return max(1, min(size, MAX_PAGE_SIZE))
+
+
+def parse_int(args, name):
+    """
+    Parse the optional integer argument `name` of request args (None when
+    absent or empty); raises ValueError with a user-facing message otherwise.
+    """
+    value = args.get(name)
+    if value in (None, ''):
+        return None
+    try:
+        return int(value)
+    except ValueError:
+        raise ValueError(f"'{name}' must be an integer.")
@@ -0,0 +1,224 @@
+"""
+Per-request SQL profiling, N+1 detection and Prometheus metrics.
+
+Enabled with SQL_PROFILING = True. When disabled nothing is registered, so
+there are no engine listeners, signal receivers or routes and no overhead.
+For every request it records:
+- query count, total SQL time and the slowest statement (SQLAlchemy engine events)
+- template render time (Flask template signals)
+- statement shapes executed SQL_PROFILING_N_PLUS_ONE_THRESHOLD+ times, logged
+  as suspected N+1 (e.g. one lazy load per Kanban card)
+Results go to a Server-Timing header, /api/profiling/recent and /metrics
+(Prometheus text format: per-route latency histograms and SQL counters).
+Metrics are per worker process; scrape every worker or aggregate upstream.
+"""
+
+import logging
+import re
+import threading
+import time
+from collections import Counter, defaultdict, deque
+
+from flask import Response, g, has_request_context, jsonify, request
+from flask import request_started, request_finished, before_render_template, template_rendered
+from flask_login import login_required
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+logger = logging.getLogger('gearguard.profiling')
+
+# Latency histogram bucket bounds in seconds
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+_IN_LIST = re.compile(r'\((?:\s*(?:\?|%\(\w+\)s|%s|:\w+)\s*,)+\s*(?:\?|%\(\w+\)s|%s|:\w+)\s*\)')
+_NUMBER = re.compile(r'\b\d+\b')
+_WHITESPACE = re.compile(r'\s+')
+
+
+def statement_shape(statement):
+    """Normalize SQL so repeated executions with different parameters compare equal."""
+    shape = _IN_LIST.sub('(?)', statement)
+    shape = _NUMBER.sub('N', shape)
+    return _WHITESPACE.sub(' ', shape).strip()
+
+
+class RequestProfile:
+    """Measurements collected while serving one request."""
+
+    __slots__ = ('started', 'query_count', 'sql_time', 'slowest', 'slowest_time',
+                 'render_time', 'render_started', 'shapes')
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.query_count = 0
+        self.sql_time = 0.0
+        self.slowest = None
+        self.slowest_time = 0.0
+        self.render_time = 0.0
+        self.render_started = None
+        self.shapes = Counter()
+
+    def add_query(self, statement, elapsed):
+        self.query_count += 1
+        self.sql_time += elapsed
+        if elapsed > self.slowest_time:
+            self.slowest, self.slowest_time = statement, elapsed
+        self.shapes[statement_shape(statement)] += 1
+
+
+class RouteStats:
+    """Per-route aggregates exported to Prometheus."""
+
+    __slots__ = ('buckets', 'count', 'latency_sum', 'queries', 'sql_time', 'render_time', 'n_plus_one')
+
+    def __init__(self):
+        self.buckets = [0] * len(LATENCY_BUCKETS)
+        self.count = 0
+        self.latency_sum = 0.0
+        self.queries = 0
+        self.sql_time = 0.0
+        self.render_time = 0.0
+        self.n_plus_one = 0
+
+
+class Profiler:
+    """Flask extension wiring engine events and request signals together."""
+
+    def __init__(self):
+        self.enabled = False
+        self.threshold = 5
+        self._routes = defaultdict(RouteStats)
+        self._recent = deque(maxlen=50)
+        self._lock = threading.Lock()
+
+    def init_app(self, app):
+        if not app.config.get('SQL_PROFILING', False):
+            return
+        self.enabled = True
+        self.threshold = app.config.get('SQL_PROFILING_N_PLUS_ONE_THRESHOLD', 5)
+
+        event.listen(Engine, 'before_cursor_execute', _before_cursor_execute)
+        event.listen(Engine, 'after_cursor_execute', _after_cursor_execute)
+        request_started.connect(_request_started, app)
+        request_finished.connect(self._request_finished, app)
+        before_render_template.connect(_before_render, app)
+        template_rendered.connect(_after_render, app)
+
+        app.add_url_rule('/metrics', 'metrics', self.metrics_view)
+        app.add_url_rule('/api/profiling/recent', 'profiling_recent', login_required(self.recent_view))
+
+    # ------------------------
+    # Request lifecycle
+    # ------------------------
+    def _request_finished(self, sender, response, **extra):
+        profile = g.pop('sql_profile', None)
+        if profile is None:
+            return
+        elapsed = time.perf_counter() - profile.started
+        route = request.endpoint or 'unmatched'
+        suspects = [(shape, n) for shape, n in profile.shapes.most_common() if n >= self.threshold]
+        for shape, n in suspects:
+            logger.warning("Suspected N+1 on %s: %d executions of %s", route, n, shape)
+
+        with self._lock:
+            stats = self._routes[route]
+            stats.count += 1
+            stats.latency_sum += elapsed
+            for i, bound in enumerate(LATENCY_BUCKETS):
+                if elapsed <= bound:
+                    stats.buckets[i] += 1
+            stats.queries += profile.query_count
+            stats.sql_time += profile.sql_time
+            stats.render_time += profile.render_time
+            stats.n_plus_one += len(suspects)
+            self._recent.append({
+                'route': route,
+                'path': request.path,
+                'status': response.status_code,
+                'duration_ms': round(elapsed * 1000, 2),
+                'query_count': profile.query_count,
+                'sql_ms': round(profile.sql_time * 1000, 2),
+                'render_ms': round(profile.render_time * 1000, 2),
+                'slowest_statement': profile.slowest,
+                'slowest_ms': round(profile.slowest_time * 1000, 2),
+                'n_plus_one': [{'statement': shape, 'count': n} for shape, n in suspects],
+            })
+
+        response.headers['Server-Timing'] = (
+            f'sql;dur={profile.sql_time * 1000:.1f};desc="{profile.query_count} queries", '
+            f'render;dur={profile.render_time * 1000:.1f}, total;dur={elapsed * 1000:.1f}')
+
+    # ------------------------
+    # Views
+    # ------------------------
+    def recent_view(self):
+        """Profiles of the most recent requests served by this worker."""
+        with self._lock:
+            return jsonify(list(self._recent))
+
+    def metrics_view(self):
+        """Prometheus text exposition of per-route latency and SQL metrics."""
+        with self._lock:
+            routes = sorted(self._routes.items())
+            lines = [
+                '# HELP gearguard_request_duration_seconds Request latency by route.',
+                '# TYPE gearguard_request_duration_seconds histogram',
+            ]
+            for route, stats in routes:
+                # Buckets are stored cumulatively (Prometheus "le" semantics)
+                for bound, count in zip(LATENCY_BUCKETS, stats.buckets):
+                    lines.append(f'gearguard_request_duration_seconds_bucket{{route="{route}",le="{bound}"}} {count}')
+                lines.append(f'gearguard_request_duration_seconds_bucket{{route="{route}",le="+Inf"}} {stats.count}')
+                lines.append(f'gearguard_request_duration_seconds_sum{{route="{route}"}} {stats.latency_sum:.6f}')
+                lines.append(f'gearguard_request_duration_seconds_count{{route="{route}"}} {stats.count}')
+            counters = (
+                ('gearguard_sql_queries_total', 'SQL statements executed.', 'queries', '{}'),
+                ('gearguard_sql_duration_seconds_total', 'Time spent in SQL.', 'sql_time', '{:.6f}'),
+                ('gearguard_render_duration_seconds_total', 'Time spent rendering templates.', 'render_time', '{:.6f}'),
+                ('gearguard_n_plus_one_suspected_total', 'Repeated statement shapes within one request.', 'n_plus_one', '{}'),
+            )
+            for name, help_text, attr, fmt in counters:
+                lines.append(f'# HELP {name} {help_text}')
+                lines.append(f'# TYPE {name} counter')
+                for route, stats in routes:
+                    lines.append(f'{name}{{route="{route}"}} ' + fmt.format(getattr(stats, attr)))
+        return Response('\n'.join(lines) + '\n', mimetype='text/plain; version=0.0.4')
+
+
+# ------------------------
+# Signal and engine event handlers
+# ------------------------
+def _request_started(sender, **extra):
+    g.sql_profile = RequestProfile()
+
+
+def _current_profile():
+    return g.get('sql_profile') if has_request_context() else None
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if _current_profile() is not None:
+        conn.info.setdefault('profiling_started', []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    profile = _current_profile()
+    starts = conn.info.get('profiling_started')
+    if profile is not None and starts:
+        profile.add_query(statement, time.perf_counter() - starts.pop())
+
+
+def _before_render(sender, template, context, **extra):
+    profile = _current_profile()
+    if profile is not None:
+        profile.render_started = time.perf_counter()
+
+
+def _after_render(sender, template, context, **extra):
+    profile = _current_profile()
+    if profile is not None and profile.render_started is not None:
+        profile.render_time += time.perf_counter() - profile.render_started
+        profile.render_started = None
+
+
+profiler = Profiler()
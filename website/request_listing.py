@@ -0,0 +1,121 @@
+"""
+Maintenance request listing shared by the HTML page and the JSON API.
+
+Pages are keyset-paginated on (created_at, id), newest first, and equipment
+(with its team) is joined eagerly, so every page costs one query regardless of
+how many requests exist or how deep the client has paged.
+Archived requests (see archive.py) are listed only when a date filter reaches
+back into the archive; the page is then merged from one keyset query per table.
+JSON clients pick fields and loading through serializers.py.
+"""
+
+import heapq
+from datetime import datetime, date, timedelta
+
+from sqlalchemy.orm import joinedload, undefer
+
+from models import MaintenanceRequest, ArchivedRequest, Equipment
+from pagination import after_key, next_page_cursor, parse_int
+import archive
+
+FILTER_STATUSES = ('new', 'in_progress', 'repaired', 'scrap')
+
+
+def _parse_date(args, name):
+    value = args.get(name)
+    if value in (None, ''):
+        return None
+    try:
+        return date.fromisoformat(value)
+    except ValueError:
+        raise ValueError(f"'{name}' must be a date (YYYY-MM-DD).")
+
+
+def parse_filters(args):
+    """
+    Read listing filters from request args:
+    equipment_id, status, team_id, date_from, date_to (inclusive, YYYY-MM-DD).
+    Raises ValueError with a user-facing message on malformed input.
+    """
+    status = args.get('status') or None
+    if status and status not in FILTER_STATUSES:
+        raise ValueError(f"'status' must be one of: {', '.join(FILTER_STATUSES)}.")
+    filters = {
+        'equipment_id': parse_int(args, 'equipment_id'),
+        'team_id': parse_int(args, 'team_id'),
+        'status': status,
+        'date_from': _parse_date(args, 'date_from'),
+        'date_to': _parse_date(args, 'date_to'),
+    }
+    return {k: v for k, v in filters.items() if v is not None}
+
+
+def filtered_query(filters, model=MaintenanceRequest):
+    """`model` (MaintenanceRequest or ArchivedRequest) query with the given filters applied (no ordering)."""
+    query = model.query
+    if 'equipment_id' in filters:
+        query = query.filter(model.equipment_id == filters['equipment_id'])
+    if 'team_id' in filters:
+        query = query.filter(model.team_id == filters['team_id'])
+    if 'status' in filters:
+        query = query.filter(model.status == filters['status'])
+    if 'date_from' in filters:
+        query = query.filter(model.created_at >= datetime.combine(filters['date_from'], datetime.min.time()))
+    if 'date_to' in filters:
+        end = datetime.combine(filters['date_to'] + timedelta(days=1), datetime.min.time())
+        query = query.filter(model.created_at < end)
+    return query
+
+
+def includes_archive(filters):
+    """Whether the filters select a date range that reaches into the archive."""
+    if not ('date_from' in filters or 'date_to' in filters):
+        return False
+    if filters.get('status', archive.CLOSED_STATUSES[0]) not in archive.CLOSED_STATUSES:
+        return False
+    start = datetime.combine(filters['date_from'], datetime.min.time()) if 'date_from' in filters else None
+    return archive.reaches(start)
+
+
+def default_options(model):
+    """Loader options of listed requests of `model`: equipment and its team, joined in the same query."""
+    return [joinedload(model.equipment).joinedload(Equipment.team)]
+
+
+def _sort_key(req):
+    return req.created_at, req.id
+
+
+def _ordered_query(filters, model, cursor_key, options):
+    # The sort key is always loaded, whatever columns `options` select (it makes the cursor)
+    query = filtered_query(filters, model).options(*(options or default_options)(model), undefer(model.created_at))
+    if cursor_key:
+        query = query.filter(after_key((model.created_at, model.id), cursor_key))
+    return query.order_by(model.created_at.desc(), model.id.desc())
+
+
+def request_page(filters, cursor_key=None, limit=50, options=None):
+    """
+    Return (requests, next_cursor) for one page, newest first.
+    `options(model)` gives the loader options (default: equipment and its
+    team, joined in the same query for the template/API). Archived requests
+    (ArchivedRequest rows, same attributes) are merged in when
+    includes_archive(filters).
+    """
+    reqs = _ordered_query(filters, MaintenanceRequest, cursor_key, options).limit(limit + 1).all()
+    if includes_archive(filters):
+        archived = _ordered_query(filters, ArchivedRequest, cursor_key, options).limit(limit + 1).all()
+        # Ids are unique across both tables, so the merge keeps the keyset order total
+        reqs = list(heapq.merge(reqs, archived, key=_sort_key, reverse=True))[:limit + 1]
+    return next_page_cursor(reqs, limit, _sort_key)
+
+
+def request_stream(filters, cursor_key=None, options=None, chunk_size=1000):
+    """
+    Every request matching the filters after `cursor_key`, newest first, read
+    from a cursor `chunk_size` rows at a time (an iterator, for NDJSON exports).
+    """
+    streams = [_ordered_query(filters, MaintenanceRequest, cursor_key, options).yield_per(chunk_size)]
+    if includes_archive(filters):
+        streams.append(_ordered_query(filters, ArchivedRequest, cursor_key, options).yield_per(chunk_size))
+    return heapq.merge(*streams, key=_sort_key, reverse=True) if len(streams) > 1 else iter(streams[0])
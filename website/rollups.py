@@ -0,0 +1,180 @@
+"""
+Incrementally maintained reporting rollups.
+
+MonthlyRollup, EquipmentRollup and TeamRollup hold request counts and summed
+repair hours per status. Every RequestChange (see changes.py) is turned into
++1/-1 deltas applied with an upsert inside the writing transaction, so the
+reporting page reads O(months) rows instead of scanning maintenance_request.
+- rebuild_rollups: recompute all rollups from scratch (backfill / repair),
+  archived requests included (archive.py moves requests without touching them).
+- status_totals, monthly_series, top_equipment: read helpers for reporting.
+"""
+
+from collections import defaultdict
+from datetime import date
+
+import click
+from flask.cli import with_appcontext
+from sqlalchemy import func, select, and_, cast
+from sqlalchemy.dialects import postgresql, sqlite
+
+from models import db, Equipment, MonthlyRollup, EquipmentRollup, TeamRollup
+from changes import request_changes
+import archive
+
+ROLLUPS = (MonthlyRollup, EquipmentRollup, TeamRollup)
+OPEN_STATUSES = ('new', 'in_progress')
+
+
+def month_start(value):
+    """First day of the month of a datetime/date."""
+    return date(value.year, value.month, 1)
+
+
+def _keys(state):
+    """Yield (model, key) for every rollup row a request state contributes to."""
+    if state.created_at is not None:
+        yield MonthlyRollup, {'month': month_start(state.created_at), 'status': state.status}
+    if state.equipment_id is not None:
+        yield EquipmentRollup, {'equipment_id': state.equipment_id, 'status': state.status}
+    if state.team_id is not None:
+        yield TeamRollup, {'team_id': state.team_id, 'status': state.status}
+
+
+def _deltas(changes):
+    """Fold RequestChange records into {(model, key): [count_delta, duration_delta]}."""
+    deltas = defaultdict(lambda: [0, 0.0])
+    for change in changes:
+        for state, sign in ((change.old, -1), (change.new, 1)):
+            if state is None:
+                continue
+            for model, key in _keys(state):
+                delta = deltas[(model, tuple(sorted(key.items())))]
+                delta[0] += sign
+                delta[1] += sign * (state.duration_hours or 0.0)
+    return deltas
+
+
+def _upsert(conn, model, key, count_delta, duration_delta):
+    """Add deltas to one rollup row, creating it if needed."""
+    table = model.__table__
+    values = dict(key, request_count=count_delta, duration_total=duration_delta)
+    increments = {
+        'request_count': table.c.request_count + count_delta,
+        'duration_total': table.c.duration_total + duration_delta,
+    }
+    dialect = conn.dialect.name
+    if dialect in ('postgresql', 'sqlite'):
+        insert = postgresql.insert if dialect == 'postgresql' else sqlite.insert
+        stmt = insert(table).values(**values)\
+                            .on_conflict_do_update(index_elements=list(key), set_=increments)
+        conn.execute(stmt)
+        return
+    result = conn.execute(table.update()
+                          .where(and_(*(table.c[k] == v for k, v in key.items())))
+                          .values(**increments))
+    if result.rowcount == 0:
+        conn.execute(table.insert().values(**values))
+
+
+@request_changes.connect
+def apply_changes(session, changes):
+    """Signal receiver: apply request changes to the rollup tables."""
+    conn = session.connection()
+    for (model, key), (count_delta, duration_delta) in _deltas(changes).items():
+        if count_delta or duration_delta:
+            _upsert(conn, model, dict(key), count_delta, duration_delta)
+
+
+def _month_expr(dialect, created):
+    if dialect == 'postgresql':
+        return cast(func.date_trunc('month', created), db.Date)
+    return func.date(created, 'start of month')
+
+
+def rebuild_rollups():
+    """Recompute every rollup table from maintenance_request and its archive (caller commits)."""
+    conn = db.session.connection()
+    for model in ROLLUPS:
+        conn.execute(model.__table__.delete())
+
+    req = archive.history_source(conn).c
+    count = func.count(req.id)
+    duration = func.coalesce(func.sum(req.duration_hours), 0.0)
+    sources = (
+        (MonthlyRollup, _month_expr(conn.dialect.name, req.created_at), req.created_at.isnot(None)),
+        (EquipmentRollup, req.equipment_id, req.equipment_id.isnot(None)),
+        (TeamRollup, req.team_id, req.team_id.isnot(None)),
+    )
+    for model, group_col, not_null in sources:
+        table = model.__table__
+        query = select(group_col, req.status, count, duration)\
+            .where(not_null)\
+            .group_by(group_col, req.status)
+        key_col = table.primary_key.columns.values()[0].name
+        conn.execute(table.insert().from_select(
+            [key_col, 'status', 'request_count', 'duration_total'], query))
+
+
+def status_totals():
+    """Return {status: (request_count, duration_total)} across all months."""
+    rows = db.session.query(MonthlyRollup.status,
+                            func.sum(MonthlyRollup.request_count),
+                            func.sum(MonthlyRollup.duration_total))\
+                     .group_by(MonthlyRollup.status)\
+                     .all()
+    return {status: (count or 0, duration or 0.0) for status, count, duration in rows}
+
+
+def monthly_series(months=6, today=None):
+    """
+    Return (labels, totals, completed) for the last `months` calendar months,
+    counting requests created in each month and how many of those are repaired.
+    """
+    current = month_start(today or date.today())
+    starts = []
+    year, month = current.year, current.month
+    for _ in range(months):
+        starts.append(date(year, month, 1))
+        year, month = (year, month - 1) if month > 1 else (year - 1, 12)
+    starts.reverse()
+
+    totals = dict.fromkeys(starts, 0)
+    completed = dict.fromkeys(starts, 0)
+    rows = db.session.query(MonthlyRollup.month, MonthlyRollup.status, MonthlyRollup.request_count)\
+                     .filter(MonthlyRollup.month >= starts[0])\
+                     .all()
+    for month, status, count in rows:
+        if month in totals:
+            totals[month] += count
+            if status == 'repaired':
+                completed[month] += count
+
+    labels = [m.strftime('%b') for m in starts]
+    return labels, [totals[m] for m in starts], [completed[m] for m in starts]
+
+
+def top_equipment(limit=3):
+    """Return [(equipment name, request count)] for the most requested machines."""
+    total = func.sum(EquipmentRollup.request_count)
+    return db.session.query(Equipment.name, total)\
+                     .join(EquipmentRollup, EquipmentRollup.equipment_id == Equipment.id)\
+                     .group_by(Equipment.id, Equipment.name)\
+                     .having(total > 0)\
+                     .order_by(total.desc())\
+                     .limit(limit)\
+                     .all()
+
+
+@click.command('rebuild-rollups')
+@with_appcontext
+def rebuild_rollups_command():
+    """Backfill the reporting rollup tables from maintenance_request and its archive."""
+    rebuild_rollups()
+    db.session.commit()
+    click.echo("[SUCCESS] Reporting rollups rebuilt.")
+
+
+def init_app(app):
+    """Register the rollup CLI command on the app."""
+    app.cli.add_command(rebuild_rollups_command)
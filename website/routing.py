@@ -0,0 +1,232 @@
+"""
+Read-replica routing for db.session.
+
+db.session is a RoutingSession (see models.py). Everything goes to the
+primary unless a view opts in with @replica_reads (GET/HEAD only) or code runs
+inside `with read_replica():`; then the reads of that session go to a replica:
+- flushes, INSERT/UPDATE/DELETE and SELECT ... FOR UPDATE always use the
+  primary, and once a transaction has written, the rest of it stays there so
+  it reads its own writes;
+- a user whose request committed a write is pinned to the primary for
+  REPLICA_READ_AFTER_WRITE_SECONDS (a timestamp in their session cookie), so
+  the page after a change never comes from a replica that lags behind it;
+- one replica is picked per transaction, round robin over the healthy ones.
+  Health is a SELECT 1 (plus replay lag on PostgreSQL: more than
+  REPLICA_MAX_LAG_SECONDS counts as down) rechecked every REPLICA_CHECK_SECONDS;
+  a replica that fails a check or drops a connection is skipped for
+  REPLICA_RETRY_SECONDS and reads fall back to the primary meanwhile. The
+  statement that hits a replica as it dies still fails.
+Replicas are the SQLALCHEMY_BINDS 'replica_0', 'replica_1', ... built from
+DATABASE_REPLICA_URLS by configure(app), which must run before db.init_app.
+Every engine shares SQLALCHEMY_ENGINE_OPTIONS (pool size, overflow, pre-ping,
+recycle), so each worker holds at most pool_size + max_overflow connections
+per database.
+"""
+
+import contextlib
+import itertools
+import logging
+import threading
+import time
+from functools import wraps
+
+from flask import current_app, has_request_context, request, session as flask_session
+from flask_sqlalchemy.session import Session
+from sqlalchemy import Select, UpdateBase, event
+
+logger = logging.getLogger(__name__)
+
+REPLICA_PREFIX = 'replica_'
+# Key in the user's (cookie) session: epoch seconds until which their reads use the primary
+PRIMARY_UNTIL = '_primary_until'
+
+_LAG_SQL = ("SELECT CASE WHEN NOT pg_is_in_recovery() THEN 0"
+            " WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0"
+            " ELSE COALESCE(EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()), 0) END")
+
+
+def _writes(clause):
+    """Whether a statement must run on the primary."""
+    if isinstance(clause, UpdateBase):
+        return True
+    return isinstance(clause, Select) and clause._for_update_arg is not None
+
+
+class RoutingSession(Session):
+    """Flask-SQLAlchemy session that sends the reads of replica-enabled sessions to a replica."""
+
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        if bind is None:
+            if self._flushing or _writes(clause):
+                self.info['wrote'] = True
+            elif self.info.get('read_replica') and not self.info.get('wrote'):
+                engine = replicas.engine(self)
+                if engine is not None:
+                    return engine
+        return super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
+
+
+class ReplicaSet:
+    """Replica binds, their health and the read-after-write window."""
+
+    def __init__(self):
+        self.keys = []
+        self.read_after_write = 10
+        self.check_interval = 10
+        self.retry = 30
+        self.max_lag = 30
+        self._engines = {}
+        self._health = {}  # key -> (healthy, monotonic time of the last check)
+        self._turn = itertools.count()
+        self._stats = {'replica_transactions': 0, 'fallback_reads': 0, 'failures': 0}
+        self._lock = threading.Lock()
+
+    def configure(self, app):
+        """Add a bind per DATABASE_REPLICA_URLS entry; call before db.init_app(app)."""
+        urls = app.config.get('DATABASE_REPLICA_URLS') or []
+        binds = dict(app.config.get('SQLALCHEMY_BINDS') or {})
+        self.keys = []
+        for i, url in enumerate(urls):
+            key = f'{REPLICA_PREFIX}{i}'
+            binds[key] = url
+            self.keys.append(key)
+        app.config['SQLALCHEMY_BINDS'] = binds
+        # Health of another app's replicas (tests, several apps per process) says nothing about these
+        self._health = {}
+        self.read_after_write = app.config.get('REPLICA_READ_AFTER_WRITE_SECONDS', 10)
+        self.check_interval = app.config.get('REPLICA_CHECK_SECONDS', 10)
+        self.retry = app.config.get('REPLICA_RETRY_SECONDS', 30)
+        self.max_lag = app.config.get('REPLICA_MAX_LAG_SECONDS', 30)
+
+    def init_app(self, app):
+        """Watch replica engines for dropped connections and pin writers; call after db.init_app(app)."""
+        with app.app_context():
+            engines = app.extensions['sqlalchemy'].engines
+            self._engines = {key: engines[key] for key in self.keys}
+        for key, engine in self._engines.items():
+            event.listen(engine, 'handle_error', self._error_listener(key))
+        if not event.contains(RoutingSession, 'after_commit', _after_commit):
+            event.listen(RoutingSession, 'after_commit', _after_commit)
+            event.listen(RoutingSession, 'after_soft_rollback', _after_rollback)
+
+    @property
+    def enabled(self):
+        return bool(self._engines)
+
+    def _count(self, name):
+        with self._lock:
+            self._stats[name] += 1
+
+    # ------------------------
+    # Health
+    # ------------------------
+    def _error_listener(self, key):
+        def on_error(context):
+            if context.is_disconnect or context.connection is None:
+                self.mark_down(key, context.original_exception)
+        return on_error
+
+    def mark_down(self, key, reason):
+        """Skip `key` for the retry period."""
+        now = time.monotonic()
+        with self._lock:
+            healthy, checked = self._health.get(key, (True, None))
+            # A failed connect is reported by both the engine event and the health check
+            if not healthy and checked is not None and now - checked < 1:
+                return
+            self._health[key] = (False, now)
+        logger.warning("Replica %s unavailable (%s); reading from the primary for %ss", key, reason, self.retry)
+        self._count('failures')
+
+    def _check(self, key):
+        engine = self._engines[key]
+        try:
+            with engine.connect() as conn:
+                conn.exec_driver_sql('SELECT 1')
+                if engine.dialect.name == 'postgresql':
+                    lag = conn.exec_driver_sql(_LAG_SQL).scalar() or 0
+                    if lag > self.max_lag:
+                        raise RuntimeError(f"replication lag {lag:.0f}s")
+        except Exception as e:
+            self.mark_down(key, e)
+            return False
+        with self._lock:
+            self._health[key] = (True, time.monotonic())
+        return True
+
+    def healthy(self, key):
+        """Cached health of `key`, rechecked when the check (or retry) interval has passed."""
+        with self._lock:
+            healthy, checked = self._health.get(key, (True, None))
+        interval = self.check_interval if healthy else self.retry
+        if checked is not None and time.monotonic() - checked < interval:
+            return healthy
+        return self._check(key)
+
+    # ------------------------
+    # Routing
+    # ------------------------
+    def engine(self, session):
+        """Replica engine for this transaction of `session`, or None to use the primary."""
+        key = session.info.get('replica_key')
+        if key is not None and self.healthy(key):
+            return self._engines[key]
+        start = next(self._turn)
+        for i in range(len(self.keys)):
+            key = self.keys[(start + i) % len(self.keys)]
+            if self.healthy(key):
+                session.info['replica_key'] = key
+                self._count('replica_transactions')
+                return self._engines[key]
+        session.info.pop('replica_key', None)
+        self._count('fallback_reads')
+        return None
+
+    def pinned(self):
+        """Whether the current user wrote recently enough that replicas may not have their change."""
+        return has_request_context() and flask_session.get(PRIMARY_UNTIL, 0) > time.time()
+
+    def stats(self):
+        """Routing counters for this process and the current health of each replica."""
+        with self._lock:
+            stats = dict(self._stats)
+            stats['replicas'] = {key: self._health.get(key, (True, None))[0] for key in self.keys}
+        return stats
+
+
+replicas = ReplicaSet()
+
+
+def _after_commit(session):
+    wrote = session.info.pop('wrote', False)
+    session.info.pop('replica_key', None)
+    # Requests that change data are POSTs; their users read from the primary for a while
+    if replicas.enabled and has_request_context() and (wrote or request.method not in ('GET', 'HEAD')):
+        flask_session[PRIMARY_UNTIL] = time.time() + replicas.read_after_write
+
+
+def _after_rollback(session, previous_transaction):
+    session.info.pop('wrote', None)
+    session.info.pop('replica_key', None)
+
+
+def replica_reads(view):
+    """View decorator: GET/HEAD requests read from a replica unless the user just wrote."""
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        if replicas.enabled and request.method in ('GET', 'HEAD') and not replicas.pinned():
+            current_app.extensions['sqlalchemy'].session.info['read_replica'] = True
+        return view(*args, **kwargs)
+    return wrapper
+
+
+@contextlib.contextmanager
+def read_replica():
+    """Send the reads of db.session inside the block to a replica (e.g. for reports in jobs)."""
+    info = current_app.extensions['sqlalchemy'].session.info
+    previous = info.get('read_replica', False)
+    info['read_replica'] = replicas.enabled
+    try:
+        yield
+    finally:
+        info['read_replica'] = previous
@@ -0,0 +1,177 @@
+"""
+Preventive-maintenance scheduling for the calendar.
+
+Recurring MaintenancePlans are stored as rules, never as materialized
+occurrences. calendar_events() expands only the occurrences falling inside the
+requested window and merges in corrective MaintenanceRequests found through an
+indexed created_at range query, so a month view costs O(plans + requests in
+that month) no matter how far the plans extend into the future. Predicted
+failures are read from the precomputed equipment_risk table (riskiest
+PREDICTED_LIMIT machines whose expected next failure falls in the window).
+"""
+
+import math
+from datetime import date, datetime, timedelta
+
+from sqlalchemy import or_, select
+from sqlalchemy.orm import joinedload
+
+from models import db, MaintenancePlan, Equipment, WorkCenter
+from failure_prediction import predicted_failures, risk_level
+import archive
+
+# Largest window one calendar request may expand (a month view plus padding)
+MAX_WINDOW_DAYS = 93
+# Predicted failures shown per window (riskiest first)
+PREDICTED_LIMIT = 100
+
+
+def plan_interval_days(plan):
+    """Recurrence interval in (possibly fractional) days, or None if the plan has no usable rule."""
+    if plan.interval_days:
+        return float(plan.interval_days)
+    if plan.interval_run_hours and plan.run_hours_per_day:
+        return plan.interval_run_hours / plan.run_hours_per_day
+    return None
+
+
+def occurrences(plan, start, end):
+    """Yield the dates on which `plan` is due within [start, end)."""
+    interval = plan_interval_days(plan)
+    if not interval or interval <= 0:
+        return
+    last = min(end, plan.end_date + timedelta(days=1)) if plan.end_date else end
+    # Jump straight to the first occurrence inside the window
+    k = max(0, math.ceil((start - plan.start_date).days / interval))
+    while True:
+        due = plan.start_date + timedelta(days=math.floor(k * interval))
+        if due >= last:
+            break
+        if due >= start:
+            yield due
+        k += 1
+
+
+def _plan_target(plan):
+    if plan.equipment is not None:
+        return plan.equipment.name
+    if plan.work_center is not None:
+        return plan.work_center.name
+    return None
+
+
+def preventive_events(start, end):
+    """Calendar events for every active plan occurring within [start, end)."""
+    plans = MaintenancePlan.query\
+        .filter(MaintenancePlan.active.is_(True),
+                MaintenancePlan.start_date < end,
+                or_(MaintenancePlan.end_date.is_(None), MaintenancePlan.end_date >= start))\
+        .options(joinedload(MaintenancePlan.equipment).load_only(Equipment.name),
+                 joinedload(MaintenancePlan.work_center).load_only(WorkCenter.name))\
+        .all()
+    events = []
+    for plan in plans:
+        target = _plan_target(plan)
+        for due in occurrences(plan, start, end):
+            events.append({
+                'date': due.isoformat(),
+                'title': plan.title,
+                'type': 'Preventive',
+                'plan_id': plan.id,
+                'equipment': target,
+            })
+    return events
+
+
+def corrective_events(start, end):
+    """Calendar events for maintenance requests created within [start, end), archived ones included."""
+    start = datetime.combine(start, datetime.min.time())
+    req = archive.history_source(start=start).c
+    rows = db.session.execute(select(req.id, req.description, req.status, req.created_at)
+                              .where(req.created_at >= start,
+                                     req.created_at < datetime.combine(end, datetime.min.time()))).all()
+    return [{
+        'date': row.created_at.date().isoformat(),
+        'title': row.description,
+        'type': 'Corrective',
+        'request_id': row.id,
+        'status': row.status,
+    } for row in rows]
+
+
+def predicted_events(start, end):
+    """Calendar events for machines expected to fail within [start, end)."""
+    rows = predicted_failures(datetime.combine(start, datetime.min.time()),
+                              datetime.combine(end, datetime.min.time()), limit=PREDICTED_LIMIT)
+    return [{
+        'date': row.next_failure_at.date().isoformat(),
+        'title': f"Predicted failure: {row.name}",
+        'type': 'Predicted',
+        'equipment_id': row.equipment_id,
+        'equipment': row.name,
+        'risk': round(row.risk, 4),
+        'risk_level': risk_level(row.risk),
+    } for row in rows]
+
+
+def calendar_events(start, end):
+    """All preventive, corrective and predicted events within [start, end), ordered by date."""
+    events = preventive_events(start, end) + corrective_events(start, end) + predicted_events(start, end)
+    events.sort(key=lambda e: e['date'])
+    return events
+
+
+def parse_window(args, today=None):
+    """
+    Read the [start, end) window from request args (YYYY-MM-DD).
+    Defaults to the current month; raises ValueError for bad or oversized windows.
+    """
+    today = today or date.today()
+    try:
+        start = date.fromisoformat(args['start']) if args.get('start') else today.replace(day=1)
+        if args.get('end'):
+            end = date.fromisoformat(args['end'])
+        else:
+            end = (start.replace(day=28) + timedelta(days=4)).replace(day=1)
+    except ValueError:
+        raise ValueError("'start' and 'end' must be dates (YYYY-MM-DD).")
+    if end <= start:
+        raise ValueError("'end' must be after 'start'.")
+    if (end - start).days > MAX_WINDOW_DAYS:
+        raise ValueError(f"The window may span at most {MAX_WINDOW_DAYS} days.")
+    return start, end
+
+
+def plan_from_json(data):
+    """
+    Build a MaintenancePlan from a JSON payload, validating the recurrence rule.
+    Raises ValueError with a user-facing message on invalid input.
+    """
+    title = (data.get('title') or '').strip()
+    if not title:
+        raise ValueError("'title' is required.")
+    try:
+        plan = MaintenancePlan(
+            title=title,
+            equipment_id=int(data['equipment_id']) if data.get('equipment_id') else None,
+            work_center_id=int(data['work_center_id']) if data.get('work_center_id') else None,
+            interval_days=int(data['interval_days']) if data.get('interval_days') else None,
+            interval_run_hours=float(data['interval_run_hours']) if data.get('interval_run_hours') else None,
+            run_hours_per_day=float(data['run_hours_per_day']) if data.get('run_hours_per_day') else None,
+            start_date=date.fromisoformat(data['start_date']) if data.get('start_date') else date.today(),
+            end_date=date.fromisoformat(data['end_date']) if data.get('end_date') else None,
+        )
+    except (TypeError, ValueError):
+        raise ValueError("Invalid number or date in plan.")
+    if plan.equipment_id is None and plan.work_center_id is None:
+        raise ValueError("A plan needs an 'equipment_id' or a 'work_center_id'.")
+    # Unknown ids would only fail at commit (or never, on SQLite without foreign keys)
+    for field, model in (('equipment_id', Equipment), ('work_center_id', WorkCenter)):
+        value = getattr(plan, field)
+        if value is not None and db.session.get(model, value) is None:
+            raise ValueError(f"Unknown '{field}' {value}.")
+    if not plan_interval_days(plan) or plan_interval_days(plan) <= 0:
+        raise ValueError("Give 'interval_days', or 'interval_run_hours' with 'run_hours_per_day'.")
+    if plan.end_date is not None and plan.end_date < plan.start_date:
+        raise ValueError("'end_date' must not be before 'start_date'.")
+    return plan
@@ -0,0 +1,45 @@
+"""
+Schema bootstrap, kept out of application startup.
+
+create_app() never touches the schema, so starting a worker costs no DDL and
+no migration checks. Deployments run one explicit step before the workers:
+- `flask --app app init-db`: an empty database gets every table from the models
+  in one create_all() and is stamped at the latest migration (much faster than
+  replaying the history); an existing one is upgraded with the pending migrations.
+- `flask --app app init-db --drop [--yes]`: drop everything first (demo data, tests).
+`flask --app app db upgrade` / `db migrate` remain the tools for existing databases.
+"""
+
+import click
+from flask_migrate import stamp, upgrade
+from sqlalchemy import inspect
+
+from models import db
+import search  # noqa: F401 - registers the search index DDL on the metadata
+
+
+def bootstrap(drop=False):
+    """Create or upgrade the schema of the app in context; returns 'created' or 'upgraded'."""
+    # The primary only: replica binds (routing.py) are copies that replication keeps in step
+    if drop:
+        db.drop_all(bind_key=None)
+    if not inspect(db.engine).has_table('user'):
+        db.create_all(bind_key=None)
+        # Tables now match the latest models; record that for Alembic
+        stamp()
+        return 'created'
+    upgrade()
+    return 'upgraded'
+
+
+def init_app(app):
+    """Register the init-db CLI command on the app."""
+    @app.cli.command('init-db')
+    @click.option('--drop', is_flag=True, help="Drop all tables first (destroys all data).")
+    @click.option('--yes', is_flag=True, help="Don't ask before dropping.")
+    def init_db_command(drop, yes):
+        """Create the schema (empty database) or apply pending migrations."""
+        if drop and not yes:
+            click.confirm("Drop every table and all data?", abort=True)
+        outcome = bootstrap(drop=drop)
+        click.echo(f"Database schema {outcome} ({db.engine.url.render_as_string(hide_password=True)}).")
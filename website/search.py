@@ -0,0 +1,243 @@
+"""
+Full-text search over maintenance requests.
+
+Each request is indexed with its description and its equipment's name, serial
+number and location, so "hydraulic leak floor 2" finds tickets by what broke
+and where. The index lives next to the ORM tables and is dialect specific:
+- PostgreSQL: request_search(request_id, document tsvector) with a GIN index;
+  ranked with ts_rank_cd (description weighted above equipment fields).
+- SQLite: FTS5 virtual table request_search (rowid = request id), porter
+  stemming, ranked with bm25.
+The table is created/dropped together with the metadata (create_all/drop_all)
+and by migration 0006; Alembic autogenerate ignores it (include_object).
+
+Maintenance is incremental: flushes that insert/update/delete requests, or
+change an equipment's searchable fields, re-index just the affected requests
+inside the same transaction. `flask reindex-search` rebuilds everything.
+Archived requests (archive.py) keep their entries, under the same ids.
+Results are ranked, combined with the request list filters and keyset
+paginated on (score, id); like the request list, a date range that reaches
+back into the archive merges archived matches in.
+"""
+
+import heapq
+import re
+
+import click
+from flask.cli import with_appcontext
+from sqlalchemy import DDL, bindparam, column, event, func, inspect, literal_column, select, table, text
+from sqlalchemy.orm import Session
+
+from models import db, MaintenanceRequest, ArchivedRequest, Equipment
+from pagination import after_key, next_page_cursor
+from request_listing import default_options, filtered_query, includes_archive
+
+SEARCH_TABLE = 'request_search'
+# Re-index in chunks so IN lists stay well below driver parameter limits
+CHUNK_SIZE = 500
+EQUIPMENT_FIELDS = ('name', 'serial_number', 'location')
+MAX_TERMS = 16
+# Tables holding indexed requests (ids are unique across both)
+SOURCES = (MaintenanceRequest.__tablename__, ArchivedRequest.__tablename__)
+
+_TOKEN = re.compile(r'\w+', re.UNICODE)
+
+# PostgreSQL document: description weighs most, then equipment name, then serial/location
+_PG_DOCUMENT = (
+    "setweight(to_tsvector('english', coalesce(r.description, '')), 'A') || "
+    "setweight(to_tsvector('english', coalesce(e.name, '')), 'B') || "
+    "setweight(to_tsvector('english', coalesce(e.serial_number, '') || ' ' || coalesce(e.location, '')), 'C')"
+)
+
+# ------------------------
+# DDL (kept in step with migration 0006)
+# ------------------------
+event.listen(db.metadata, 'after_create', DDL(
+    f"CREATE VIRTUAL TABLE IF NOT EXISTS {SEARCH_TABLE} USING fts5("
+    "description, equipment, serial_number, location, tokenize='porter unicode61')"
+).execute_if(dialect='sqlite'))
+# No foreign key: entries outlive the move of their request to the archive (migration 0015)
+event.listen(db.metadata, 'after_create', DDL(
+    f"CREATE TABLE IF NOT EXISTS {SEARCH_TABLE} ("
+    "request_id INTEGER PRIMARY KEY,"
+    " document TSVECTOR NOT NULL)"
+).execute_if(dialect='postgresql'))
+event.listen(db.metadata, 'after_create', DDL(
+    f"CREATE INDEX IF NOT EXISTS ix_{SEARCH_TABLE}_document ON {SEARCH_TABLE} USING GIN (document)"
+).execute_if(dialect='postgresql'))
+event.listen(db.metadata, 'before_drop', DDL(f"DROP TABLE IF EXISTS {SEARCH_TABLE}"))
+
+
+def include_object(obj, name, type_, reflected, compare_to):
+    """Alembic filter: the search index is managed here, not by autogenerate."""
+    return not (type_ == 'table' and reflected and compare_to is None and name.startswith(SEARCH_TABLE))
+
+
+# ------------------------
+# Indexing
+# ------------------------
+def _chunks(ids):
+    ids = sorted(ids)
+    for i in range(0, len(ids), CHUNK_SIZE):
+        yield ids[i:i + CHUNK_SIZE]
+
+
+def _sql(statement, ids):
+    """text() statement, with :ids bound as an expanding IN list when given."""
+    statement = text(statement)
+    return statement if ids is None else statement.bindparams(bindparam('ids', list(ids), expanding=True))
+
+
+def _index_where(conn, where, ids=None, source=SOURCES[0]):
+    """(Re)index the requests selected by `where` (SQL over r = the `source` table)."""
+    if conn.dialect.name == 'postgresql':
+        conn.execute(_sql(
+            f"INSERT INTO {SEARCH_TABLE} (request_id, document) "
+            f"SELECT r.id, {_PG_DOCUMENT} FROM {source} r "
+            f"JOIN equipment e ON e.id = r.equipment_id WHERE {where} "
+            "ON CONFLICT (request_id) DO UPDATE SET document = excluded.document", ids))
+        return
+    conn.execute(_sql(
+        f"DELETE FROM {SEARCH_TABLE} WHERE rowid IN (SELECT r.id FROM {source} r WHERE {where})", ids))
+    conn.execute(_sql(
+        f"INSERT INTO {SEARCH_TABLE} (rowid, description, equipment, serial_number, location) "
+        f"SELECT r.id, r.description, e.name, e.serial_number, e.location FROM {source} r "
+        f"JOIN equipment e ON e.id = r.equipment_id WHERE {where}", ids))
+
+
+def index_requests(conn, request_ids):
+    """(Re)index the given requests, e.g. after a bulk insert."""
+    for chunk in _chunks(request_ids):
+        _index_where(conn, "r.id IN :ids", chunk)
+
+
+def index_equipment(conn, equipment_ids):
+    """Re-index every request, archived or not, of the given machines (their name/serial/location changed)."""
+    for chunk in _chunks(equipment_ids):
+        for source in SOURCES:
+            _index_where(conn, "r.equipment_id IN :ids", chunk, source)
+
+
+def unindex_requests(conn, request_ids):
+    key = 'request_id' if conn.dialect.name == 'postgresql' else 'rowid'
+    for chunk in _chunks(request_ids):
+        conn.execute(_sql(f"DELETE FROM {SEARCH_TABLE} WHERE {key} IN :ids", chunk))
+
+
+def rebuild_index():
+    """Re-index every request, archived ones included, from scratch (caller commits)."""
+    conn = db.session.connection()
+    conn.execute(text(f"DELETE FROM {SEARCH_TABLE}"))
+    for source in SOURCES:
+        _index_where(conn, "1 = 1", source=source)
+
+
+def _changed(obj, fields):
+    attrs = inspect(obj).attrs
+    return any(attrs[field].history.has_changes() for field in fields)
+
+
+def _sync_after_flush(session, flush_context):
+    """Re-index requests touched by this flush, inside the same transaction."""
+    requests, removed, machines = set(), set(), set()
+    for obj in session.new:
+        if isinstance(obj, MaintenanceRequest):
+            requests.add(obj.id)
+    for obj in session.dirty:
+        if isinstance(obj, MaintenanceRequest) and _changed(obj, ('description', 'equipment_id')):
+            requests.add(obj.id)
+        elif isinstance(obj, Equipment) and _changed(obj, EQUIPMENT_FIELDS):
+            machines.add(obj.id)
+    for obj in session.deleted:
+        if isinstance(obj, MaintenanceRequest):
+            removed.add(obj.id)
+    if not (requests or removed or machines):
+        return
+    conn = session.connection()
+    if removed:
+        unindex_requests(conn, removed)
+    if requests:
+        index_requests(conn, requests)
+    if machines:
+        index_equipment(conn, machines)
+
+
+# ------------------------
+# Querying
+# ------------------------
+def search_terms(q):
+    """
+    Word tokens of a user query (punctuation and operators are dropped).
+    Every term must match, as a prefix, so "leak" also finds "leakage".
+    """
+    return _TOKEN.findall(q or '')[:MAX_TERMS]
+
+
+def _match_subquery(dialect, terms):
+    """Subquery of (id, score) for requests matching every term; higher score ranks first."""
+    if dialect == 'postgresql':
+        search = table(SEARCH_TABLE, column('request_id'), column('document'))
+        # Terms are bare word tokens, so this can't inject tsquery operators
+        query = func.to_tsquery('english', ' & '.join(f'{term}:*' for term in terms))
+        return select(search.c.request_id.label('id'),
+                      func.ts_rank_cd(search.c.document, query).label('score'))\
+            .where(search.c.document.op('@@')(query))\
+            .subquery('matches')
+    search = table(SEARCH_TABLE, column('rowid'))
+    # Each term is a quoted FTS5 string, so user input can never be parsed as query syntax
+    match = ' '.join('"' + term.replace('"', '""') + '"*' for term in terms)
+    return select(search.c.rowid.label('id'),
+                  (-func.bm25(literal_column(SEARCH_TABLE), 10.0, 4.0, 2.0, 2.0)).label('score'))\
+        .where(literal_column(SEARCH_TABLE).op('MATCH')(match))\
+        .subquery('matches')
+
+
+def _ranked_query(model, matches, filters, cursor_key, options):
+    sort_key = (matches.c.score, model.id)
+    query = filtered_query(filters, model)\
+        .join(matches, matches.c.id == model.id)\
+        .add_columns(matches.c.score)\
+        .options(*(options or default_options)(model))
+    if cursor_key:
+        query = query.filter(after_key(sort_key, cursor_key))
+    return query.order_by(matches.c.score.desc(), model.id.desc())
+
+
+def _sort_key(row):
+    return row.score, row[0].id
+
+
+def search_page(q, filters, cursor_key=None, limit=50, options=None):
+    """
+    Return (results, next_cursor) for one page of ranked matches of `q`, where
+    results are (request, score) pairs and `filters` are the request list
+    filters (status, team_id, equipment_id, date range). `options(model)`
+    gives the loader options (default: equipment and its team). Archived
+    requests (ArchivedRequest rows) are merged in when includes_archive(filters).
+    """
+    terms = search_terms(q)
+    if not terms:
+        return [], None
+    matches = _match_subquery(db.session.get_bind().dialect.name, terms)
+    rows = _ranked_query(MaintenanceRequest, matches, filters, cursor_key, options).limit(limit + 1).all()
+    if includes_archive(filters):
+        archived = _ranked_query(ArchivedRequest, matches, filters, cursor_key, options).limit(limit + 1).all()
+        # Ids are unique across both tables, so (score, id) stays a total order
+        rows = list(heapq.merge(rows, archived, key=_sort_key, reverse=True))[:limit + 1]
+    return next_page_cursor(rows, limit, _sort_key)
+
+
+@click.command('reindex-search')
+@with_appcontext
+def reindex_search_command():
+    """Rebuild the full-text search index from the requests (archived too) and equipment."""
+    rebuild_index()
+    db.session.commit()
+    click.echo("[SUCCESS] Search index rebuilt.")
+
+
+def init_app(app):
+    """Hook incremental indexing and register the CLI command on the app."""
+    if not event.contains(Session, 'after_flush', _sync_after_flush):
+        event.listen(Session, 'after_flush', _sync_after_flush)
+    app.cli.add_command(reindex_search_command)
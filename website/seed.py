@@ -1,8 +1,37 @@
+"""
+Database seeding.
+
+python seed.py                     small demo dataset (login: samarth@gear.com / 123)
+python seed.py --requests 5_000_000 --equipment 50_000 [--users N --technicians N --seed N]
+                                   bulk dataset for load testing
+
+Both modes are reproducible: the same --seed always produces the same rows.
+Bulk mode streams rows in chunks through Core executemany inserts (COPY on
+PostgreSQL), hashes the shared password once and rebuilds the derived tables
+(rollups, health, workloads, status history, search, failure risk) at the end instead of
+maintaining them row by row.
+"""
+
+import argparse
+import csv
+import io
+import math
 import random
+import time
 from datetime import datetime, timedelta
 from werkzeug.security import generate_password_hash
-from app import app, db
-from models import Department, MaintenanceTeam, Technician, User, Equipment, MaintenanceRequest, WorkCenter
+from app import create_app
+from models import db, Department, MaintenanceTeam, Technician, User, Equipment, MaintenanceRequest, WorkCenter
+import rollups
+import equipment_health
+import search
+import assignment
+import failure_prediction
+import status_history
+import schema
+
+DEFAULT_SEED = 42
+DEFAULT_CHUNK_SIZE = 10_000
 
 # --- DATA LISTS ---
 DEPT_NAMES = ['Production', 'Logistics', 'Quality Control', 'Research & Development', 'Assembly Line']
@@ -23,73 +52,96 @@ ISSUES = [
     "Emergency stop stuck", "Bearing noise", "Motor burnout", "Coolant leak", "Misalignment detected"
 ]
 
-def get_random_date():
-    # Generate a random date within last 90 days for graphs
-    days_back = random.randint(0, 90)
-    return datetime.utcnow() - timedelta(days=days_back)
+STATUSES = ('new', 'in_progress', 'repaired', 'scrap')
+# Status weights by request age: fresh requests are mostly open, old ones closed
+STATUS_WEIGHTS_BY_AGE = (
+    (2, (70, 25, 5, 0)),        # younger than 2 days
+    (14, (15, 45, 38, 2)),      # younger than 2 weeks
+    (None, (1, 4, 90, 5)),      # everything older
+)
+# Skew of equipment popularity (Zipf exponent): a few machines fail far more often
+EQUIPMENT_SKEW = 0.8
+
+def get_random_date(rng):
+    # Generate a random date within last 90 days for graphs (anchored at midnight so seeds repeat)
+    days_back = rng.randint(0, 90)
+    today = datetime.utcnow().replace(hour=0, minute=0, second=0, microsecond=0)
+    return today - timedelta(days=days_back)
 
-def run_seed():
+def reset_database():
+    schema.bootstrap(drop=True)
+    print("🧹 Old data cleared.")
+
+def seed_reference_data():
+    """Departments, teams and the 10 work centers shared by both seed modes."""
+    # 2. CREATE DEPARTMENTS
+    depts = []
+    for name in DEPT_NAMES:
+        d = Department(name=name)
+        depts.append(d)
+    db.session.add_all(depts)
+    db.session.commit()
+    print(f"✅ {len(depts)} Departments Added.")
+
+    # 3. CREATE TEAMS
+    teams = []
+    for name in TEAM_NAMES:
+        t = MaintenanceTeam(name=name)
+        teams.append(t)
+    db.session.add_all(teams)
+    db.session.commit()
+    print(f"✅ {len(teams)} Teams Added.")
+
+    # 4. CREATE WORK CENTERS (10 Entries)
+    wc_data = [
+        ("Main Assembly A", "WC-001", 150.0, 92, 85),
+        ("CNC Machining B", "WC-002", 200.0, 88, 80),
+        ("Packaging Zone", "WC-003", 75.0, 95, 90),
+        ("Quality Lab 1", "WC-004", 120.0, 98, 95),
+        ("Welding Station", "WC-005", 180.0, 85, 78),
+        ("Paint Shop", "WC-006", 130.0, 90, 82),
+        ("Elec. Assembly", "WC-007", 160.0, 94, 88),
+        ("Finishing Line", "WC-008", 100.0, 91, 85),
+        ("Raw Material Depot", "WC-009", 60.0, 96, 90),
+        ("Robotic Cell X", "WC-010", 250.0, 82, 80)
+    ]
+    work_centers = []
+    for name, code, cost, eff, target in wc_data:
+        wc = WorkCenter(name=name, code=code, cost_per_hour=cost, capacity_efficiency=eff, oee_target=target)
+        work_centers.append(wc)
+    db.session.add_all(work_centers)
+    db.session.commit()
+    print("✅ 10 Work Centers Added.")
+    return depts, teams, work_centers
+
+def run_seed(seed=DEFAULT_SEED, app=None):
+    """Small demo dataset; the same seed always produces the same data (in `app`, default create_app())."""
+    rng = random.Random(seed)
+    password_hash = generate_password_hash('123')
+    app = app or create_app()
     with app.app_context():
         print("🌱 Database Resetting & Seeding started...")
-        
+
         # 1. CLEAN DATABASE
-        db.drop_all()
-        db.create_all()
-        print("🧹 Old data cleared.")
-
-        # 2. CREATE DEPARTMENTS
-        depts = []
-        for name in DEPT_NAMES:
-            d = Department(name=name)
-            depts.append(d)
-        db.session.add_all(depts)
-        db.session.commit()
-        print(f"✅ {len(depts)} Departments Added.")
-
-        # 3. CREATE TEAMS
-        teams = []
-        for name in TEAM_NAMES:
-            t = MaintenanceTeam(name=name)
-            teams.append(t)
-        db.session.add_all(teams)
-        db.session.commit()
-        print(f"✅ {len(teams)} Teams Added.")
-
-        # 4. CREATE WORK CENTERS (10 Entries)
-        wc_data = [
-            ("Main Assembly A", "WC-001", 150.0, 92, 85),
-            ("CNC Machining B", "WC-002", 200.0, 88, 80),
-            ("Packaging Zone", "WC-003", 75.0, 95, 90),
-            ("Quality Lab 1", "WC-004", 120.0, 98, 95),
-            ("Welding Station", "WC-005", 180.0, 85, 78),
-            ("Paint Shop", "WC-006", 130.0, 90, 82),
-            ("Elec. Assembly", "WC-007", 160.0, 94, 88),
-            ("Finishing Line", "WC-008", 100.0, 91, 85),
-            ("Raw Material Depot", "WC-009", 60.0, 96, 90),
-            ("Robotic Cell X", "WC-010", 250.0, 82, 80)
-        ]
-        for name, code, cost, eff, target in wc_data:
-            wc = WorkCenter(name=name, code=code, cost_per_hour=cost, capacity_efficiency=eff, oee_target=target)
-            db.session.add(wc)
-        db.session.commit()
-        print("✅ 10 Work Centers Added.")
+        reset_database()
+        depts, teams, work_centers = seed_reference_data()
 
         # 5. CREATE USERS (Employees - 20 Entries)
         # Samarth (Admin/User) ko fix rakhenge login ke liye
         all_users = []
-        admin = User(name='Samarth', email='samarth@gear.com', password_hash=generate_password_hash('123'), department_id=depts[0].id)
+        admin = User(name='Samarth', email='samarth@gear.com', password_hash=password_hash, department_id=depts[0].id)
         all_users.append(admin)
         
         full_names = NAMES_MALE + NAMES_FEMALE
-        random.shuffle(full_names)
+        rng.shuffle(full_names)
 
         for i in range(19): # 19 more users
             name = full_names[i]
             u = User(
-                name=f"{name} {random.choice(['Sharma', 'Verma', 'Patel', 'Singh', 'Gupta'])}",
+                name=f"{name} {rng.choice(['Sharma', 'Verma', 'Patel', 'Singh', 'Gupta'])}",
                 email=f"{name.lower()}{i}@gear.com",
-                password_hash=generate_password_hash('123'),
-                department_id=random.choice(depts).id
+                password_hash=password_hash,
+                department_id=rng.choice(depts).id
             )
             all_users.append(u)
         
@@ -100,19 +152,19 @@ def run_seed():
         # 6. CREATE TECHNICIANS (15 Entries)
         # Mike (Tech) ko fix rakhenge login ke liye
         all_techs = []
-        mike = Technician(name='Mike Ross', email='mike@gear.com', password_hash=generate_password_hash('123'), team_id=teams[0].id)
+        mike = Technician(name='Mike Ross', email='mike@gear.com', password_hash=password_hash, team_id=teams[0].id)
         all_techs.append(mike)
 
         tech_names = NAMES_MALE[5:] + NAMES_FEMALE[5:] # Use remaining names
-        random.shuffle(tech_names)
+        rng.shuffle(tech_names)
 
         for i in range(14):
             name = tech_names[i]
             t = Technician(
-                name=f"{name} {random.choice(['Yadav', 'Khan', 'Das', 'Nair', 'Reddy'])}",
+                name=f"{name} {rng.choice(['Yadav', 'Khan', 'Das', 'Nair', 'Reddy'])}",
                 email=f"tech{i}@gear.com",
-                password_hash=generate_password_hash('123'),
-                team_id=random.choice(teams).id
+                password_hash=password_hash,
+                team_id=rng.choice(teams).id
             )
             all_techs.append(t)
 
@@ -123,13 +175,15 @@ def run_seed():
         # 7. CREATE EQUIPMENT (25 Entries)
         all_equipment = []
         for i in range(1, 26):
-            eq_type, prefix = random.choice(EQUIP_TYPES)
+            eq_type, prefix = rng.choice(EQUIP_TYPES)
             eq = Equipment(
-                name=f"{eq_type} #{random.randint(100, 999)}",
+                name=f"{eq_type} #{rng.randint(100, 999)}",
                 serial_number=f"{prefix}-2025-{i:03d}",
-                location=f"Floor {random.randint(1,3)}, Zone {random.choice(['A','B','C','D'])}",
-                department_id=random.choice(depts).id,
-                team_id=random.choice(teams).id
+                location=f"Floor {rng.randint(1,3)}, Zone {rng.choice(['A','B','C','D'])}",
+                category=eq_type,
+                department_id=rng.choice(depts).id,
+                team_id=rng.choice(teams).id,
+                work_center_id=rng.choice(work_centers).id
             )
             all_equipment.append(eq)
         
@@ -145,17 +199,17 @@ def run_seed():
         weighted_statuses = ['new']*8 + ['in_progress']*10 + ['repaired']*20 + ['scrap']*2
 
         for i in range(40):
-            status = random.choice(weighted_statuses)
-            eq = random.choice(all_equipment)
-            creator = random.choice(all_users)
+            status = rng.choice(weighted_statuses)
+            eq = rng.choice(all_equipment)
+            creator = rng.choice(all_users)
             
             req = MaintenanceRequest(
-                description=random.choice(ISSUES),
+                description=rng.choice(ISSUES),
                 status=status,
                 equipment_id=eq.id,
                 team_id=eq.team_id,
                 created_by=creator.id,
-                created_at=get_random_date() # Random date in last 3 months
+                created_at=get_random_date(rng) # Random date in last 3 months
             )
 
             # Assign technician only if NOT 'new'
@@ -163,11 +217,11 @@ def run_seed():
                 # Pick a tech from the correct team
                 possible_techs = [t for t in all_techs if t.team_id == eq.team_id]
                 if possible_techs:
-                    req.technician_id = random.choice(possible_techs).id
+                    req.technician_id = rng.choice(possible_techs).id
                 
                 # Add duration if repaired
                 if status == 'repaired':
-                    req.duration_hours = round(random.uniform(1.0, 48.0), 1)
+                    req.duration_hours = round(rng.uniform(1.0, 48.0), 1)
             
             requests.append(req)
 
@@ -175,8 +229,204 @@ def run_seed():
         db.session.commit()
         print("✅ 40 Maintenance Requests Added (with graph history).")
 
+        # 9. FAILURE RISK (normally a scheduled batch job)
+        failure_prediction.predict(full=True)
+        db.session.commit()
+        print("✅ Failure risk scores computed.")
+
         print("\n🎉 MEGA SEED COMPLETE! Database full bhara hua hai.")
         print("👉 User Login: samarth@gear.com / 123")
 
+
+# ------------------------
+# Bulk mode
+# ------------------------
+def _status_for_age(rng, age_days):
+    for max_age, weights in STATUS_WEIGHTS_BY_AGE:
+        if max_age is None or age_days < max_age:
+            return rng.choices(STATUSES, weights=weights)[0]
+
+def _chunks(rows, size):
+    chunk = []
+    for row in rows:
+        chunk.append(row)
+        if len(chunk) >= size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+def _copy_chunk(conn, table, chunk):
+    """COPY one chunk through psycopg2; returns False when COPY is unavailable."""
+    cursor = conn.connection.dbapi_connection.cursor()
+    if not hasattr(cursor, 'copy_expert'):
+        return False
+    columns = list(chunk[0])
+    buf = io.StringIO()
+    writer = csv.writer(buf)
+    for row in chunk:
+        writer.writerow(['\\N' if row[c] is None else row[c] for c in columns])
+    buf.seek(0)
+    column_list = ', '.join(f'"{c}"' for c in columns)
+    cursor.copy_expert(f'COPY "{table.name}" ({column_list}) FROM STDIN WITH (FORMAT csv, NULL \'\\N\')', buf)
+    return True
+
+def bulk_insert(table, rows, chunk_size, total):
+    """Stream `rows` (dicts) into `table` chunk by chunk, committing after each chunk."""
+    started = time.perf_counter()
+    use_copy = db.engine.dialect.name == 'postgresql'
+    done = 0
+    for chunk in _chunks(rows, chunk_size):
+        conn = db.session.connection()
+        if not (use_copy and _copy_chunk(conn, table, chunk)):
+            use_copy = False
+            conn.execute(table.insert(), chunk)
+        db.session.commit()
+        done += len(chunk)
+        rate = done / max(time.perf_counter() - started, 1e-9)
+        print(f"   {table.name}: {done:,}/{total:,} rows ({rate:,.0f} rows/s)", end='\r', flush=True)
+    print()
+
+def _reset_sequences(tables):
+    """Explicit ids bypass PostgreSQL sequences; move them past the inserted ids."""
+    if db.engine.dialect.name != 'postgresql':
+        return
+    conn = db.session.connection()
+    for table in tables:
+        conn.exec_driver_sql(
+            f"SELECT setval(pg_get_serial_sequence('\"{table.name}\"', 'id'),"
+            f" COALESCE((SELECT MAX(id) FROM \"{table.name}\"), 1))")
+    db.session.commit()
+
+def _user_rows(count, depts, password_hash, rng, now):
+    yield {'id': 1, 'name': 'Samarth', 'email': 'samarth@gear.com', 'password_hash': password_hash,
+           'department_id': depts[0].id, 'created_at': now}
+    for i in range(2, count + 1):
+        first = rng.choice(NAMES_MALE + NAMES_FEMALE)
+        yield {'id': i, 'name': f"{first} {rng.choice(['Sharma', 'Verma', 'Patel', 'Singh', 'Gupta'])}",
+               'email': f"user{i}@gear.com", 'password_hash': password_hash,
+               'department_id': rng.choice(depts).id, 'created_at': now}
+
+def _technician_rows(count, teams, password_hash, rng, now):
+    yield {'id': 1, 'name': 'Mike Ross', 'email': 'mike@gear.com', 'password_hash': password_hash,
+           'team_id': teams[0].id, 'updated_at': now}
+    for i in range(2, count + 1):
+        first = rng.choice(NAMES_MALE + NAMES_FEMALE)
+        yield {'id': i, 'name': f"{first} {rng.choice(['Yadav', 'Khan', 'Das', 'Nair', 'Reddy'])}",
+               'email': f"tech{i}@gear.com", 'password_hash': password_hash,
+               'team_id': rng.choice(teams).id, 'updated_at': now}
+
+def _equipment_rows(count, depts, teams, work_centers, rng, now):
+    for i in range(1, count + 1):
+        eq_type, prefix = rng.choice(EQUIP_TYPES)
+        yield {'id': i, 'name': f"{eq_type} #{i}", 'serial_number': f"{prefix}-{i:07d}",
+               'location': f"Floor {rng.randint(1, 3)}, Zone {rng.choice(['A', 'B', 'C', 'D'])}",
+               'category': eq_type,
+               'department_id': rng.choice(depts).id, 'team_id': rng.choice(teams).id,
+               'work_center_id': rng.choice(work_centers).id, 'updated_at': now}
+
+def _request_rows(count, equipment_teams, techs_by_team, user_count, days, rng, now):
+    """
+    Requests in id order with created_at increasing across the window (plus
+    jitter), like a real system. Equipment is drawn with a Zipf-like skew,
+    status depends on age and repair hours are log-normal.
+    """
+    equipment_ids = list(range(1, len(equipment_teams) + 1))
+    rng.shuffle(equipment_ids)
+    cum_weights, total = [], 0.0
+    for rank in range(1, len(equipment_ids) + 1):
+        total += 1.0 / rank ** EQUIPMENT_SKEW
+        cum_weights.append(total)
+
+    window = days * 86400
+    step = window / max(count, 1)
+    first = now - timedelta(seconds=window)
+    for i in range(1, count + 1):
+        offset = min(window, max(0.0, (i - 1) * step + rng.uniform(0, step)))
+        created_at = first + timedelta(seconds=offset)
+        age_days = (now - created_at).total_seconds() / 86400
+        status = _status_for_age(rng, age_days)
+        equipment_id = rng.choices(equipment_ids, cum_weights=cum_weights)[0]
+        team_id = equipment_teams[equipment_id - 1]
+        technician_id = None
+        if status != 'new' and techs_by_team.get(team_id):
+            technician_id = rng.choice(techs_by_team[team_id])
+        duration = 0.0
+        if status == 'repaired':
+            duration = round(min(240.0, max(0.5, rng.lognormvariate(math.log(6), 0.9))), 1)
+        yield {'id': i, 'description': rng.choice(ISSUES), 'status': status,
+               'equipment_id': equipment_id, 'team_id': team_id, 'technician_id': technician_id,
+               'created_by': rng.randint(1, user_count), 'created_at': created_at,
+               'duration_hours': duration, 'version': 1, 'updated_at': created_at}
+
+def run_bulk_seed(requests, equipment, users=200, technicians=100, seed=DEFAULT_SEED,
+                  chunk_size=DEFAULT_CHUNK_SIZE, days=730, app=None):
+    """Production-sized dataset for load testing (in `app`, default create_app()); see the module docstring."""
+    rng = random.Random(seed)
+    # All generated timestamps are relative to midnight so reruns match exactly
+    now = datetime.utcnow().replace(hour=0, minute=0, second=0, microsecond=0)
+    users, technicians, equipment = max(users, 1), max(technicians, 1), max(equipment, 1)
+    password_hash = generate_password_hash('123')
+    app = app or create_app()
+    with app.app_context():
+        print(f"🌱 Bulk seeding {requests:,} requests / {equipment:,} equipment (seed {seed})...")
+        started = time.perf_counter()
+        reset_database()
+        depts, teams, work_centers = seed_reference_data()
+
+        bulk_insert(User.__table__, _user_rows(users, depts, password_hash, rng, now), chunk_size, users)
+        tech_rows = list(_technician_rows(technicians, teams, password_hash, rng, now))
+        bulk_insert(Technician.__table__, tech_rows, chunk_size, technicians)
+
+        equipment_teams = []
+        def track_team(rows):
+            for row in rows:
+                equipment_teams.append(row['team_id'])
+                yield row
+        bulk_insert(Equipment.__table__,
+                    track_team(_equipment_rows(equipment, depts, teams, work_centers, rng, now)),
+                    chunk_size, equipment)
+
+        techs_by_team = {}
+        for row in tech_rows:
+            techs_by_team.setdefault(row['team_id'], []).append(row['id'])
+        bulk_insert(MaintenanceRequest.__table__,
+                    _request_rows(requests, equipment_teams, techs_by_team, users, days, rng, now),
+                    chunk_size, requests)
+        _reset_sequences([User.__table__, Technician.__table__, Equipment.__table__,
+                          MaintenanceRequest.__table__])
+
+        # Core inserts bypass the ORM events that maintain derived tables
+        print("📊 Rebuilding reporting rollups, equipment health, workloads, status history and the search index...")
+        rollups.rebuild_rollups()
+        status_history.backfill()
+        equipment_health.rebuild_health()
+        assignment.rebuild_workload()
+        search.rebuild_index()
+        db.session.commit()
+        print("🔮 Fitting failure-prediction models...")
+        failure_prediction.predict(full=True)
+        db.session.commit()
+
+        print(f"\n🎉 BULK SEED COMPLETE in {time.perf_counter() - started:,.1f}s.")
+        print("👉 User Login: samarth@gear.com / 123")
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Reset and seed the GearGuard database.")
+    parser.add_argument('--requests', type=int, help="bulk mode: number of maintenance requests")
+    parser.add_argument('--equipment', type=int, help="bulk mode: number of equipment rows")
+    parser.add_argument('--users', type=int, default=200)
+    parser.add_argument('--technicians', type=int, default=100)
+    parser.add_argument('--days', type=int, default=730, help="history window for created_at")
+    parser.add_argument('--chunk-size', type=int, default=DEFAULT_CHUNK_SIZE)
+    parser.add_argument('--seed', type=int, default=DEFAULT_SEED)
+    args = parser.parse_args(argv)
+
+    if args.requests is None and args.equipment is None:
+        run_seed(args.seed)
+    else:
+        run_bulk_seed(args.requests or 0, args.equipment or 1000, args.users, args.technicians,
+                      args.seed, args.chunk_size, args.days)
+
 if __name__ == '__main__':
-    run_seed()
\ No newline at end of file
+    main()
\ No newline at end of file
@@ -0,0 +1,254 @@
+"""
+Field-selectable JSON for API and mobile clients.
+
+Requests, equipment, teams, technicians and work centers each have a Schema:
+the columns a client may read, computed fields, and the relations it may
+expand into nested objects. Clients ask for what they need with
+?fields=id,status,equipment.name,equipment.team.name:
+- parse_fields turns that list into a tree (a relation on its own means its
+  default fields) and rejects unknown names with a user-facing ValueError;
+- loader_options turns the same tree into the query's loading plan:
+  load_only() of the selected columns, joinedload() for expanded many-to-one
+  relations and selectinload() for collections, raiseload for everything
+  else. Unselected columns and relations are never fetched, and touching one
+  by mistake raises instead of issuing a query per row;
+- serialize builds plain dicts in the requested order, dumps encodes them
+  with orjson when it is installed (datetimes as ISO 8601) or the json module;
+- ndjson_lines writes one object per line from a yield_per cursor, so whole
+  collections stream in constant memory (?format=ndjson), compressed on the
+  fly by http_cache.stream_response.
+Secrets (password hashes) are simply not in any schema.
+"""
+
+import json
+from collections import namedtuple
+from datetime import date, datetime
+
+from flask import Response
+from sqlalchemy import inspect
+from sqlalchemy.orm import joinedload, load_only, raiseload, selectinload
+
+from models import (ArchivedRequest, Department, Equipment, EquipmentHealth, EquipmentRisk, MaintenanceRequest,
+                    MaintenanceTeam, Technician, WorkCenter)
+from failure_prediction import risk_level
+from pagination import after_key
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+NDJSON_MIMETYPE = 'application/x-ndjson'
+# Objects encoded per streamed chunk (and rows fetched per cursor round trip)
+STREAM_CHUNK_SIZE = 1000
+MAX_FIELDS = 100
+
+# columns: readable attributes; computed: name -> (function(obj), columns it reads);
+# relations: name -> schema name; default: fields used when a client names none
+Schema = namedtuple('Schema', 'model columns computed relations default')
+
+SCHEMAS = {
+    'request': Schema(
+        MaintenanceRequest,
+        columns=('id', 'description', 'status', 'version', 'equipment_id', 'team_id', 'technician_id',
+                 'created_by', 'created_at', 'updated_at', 'duration_hours', 'estimated_hours'),
+        computed={'archived': (lambda req: isinstance(req, ArchivedRequest), ())},
+        relations={'equipment': 'equipment', 'technician': 'technician'},
+        default=('id', 'description', 'status', 'version', 'created_at', 'duration_hours', 'team_id',
+                 'technician_id', 'archived', 'equipment.id', 'equipment.name', 'equipment.serial_number',
+                 'equipment.team.id', 'equipment.team.name')),
+    'equipment': Schema(
+        Equipment,
+        columns=('id', 'name', 'serial_number', 'location', 'category', 'department_id', 'team_id',
+                 'work_center_id', 'updated_at'),
+        computed={},
+        relations={'department': 'department', 'team': 'team', 'work_center': 'work_center',
+                   'health': 'health', 'risk': 'risk'},
+        default=('id', 'name', 'serial_number', 'location', 'category', 'department_id', 'team_id',
+                 'work_center_id')),
+    'team': Schema(
+        MaintenanceTeam,
+        columns=('id', 'name'),
+        computed={},
+        relations={'technicians': 'technician'},
+        default=('id', 'name')),
+    'technician': Schema(
+        Technician,
+        columns=('id', 'name', 'email', 'team_id'),
+        computed={},
+        relations={'team': 'team'},
+        default=('id', 'name', 'email', 'team_id')),
+    'work_center': Schema(
+        WorkCenter,
+        columns=('id', 'name', 'code', 'cost_per_hour', 'capacity_efficiency', 'oee_target', 'updated_at'),
+        computed={},
+        relations={},
+        default=('id', 'name', 'code', 'cost_per_hour', 'capacity_efficiency', 'oee_target')),
+    'department': Schema(
+        Department, columns=('id', 'name'), computed={}, relations={}, default=('id', 'name')),
+    'health': Schema(
+        EquipmentHealth,
+        columns=('state', 'open_requests', 'in_progress_requests', 'scrap_requests', 'last_failure_at'),
+        computed={},
+        relations={},
+        default=('state', 'open_requests', 'in_progress_requests', 'last_failure_at')),
+    'risk': Schema(
+        EquipmentRisk,
+        columns=('risk', 'model', 'failures', 'mean_interval_hours', 'last_failure_at', 'next_failure_at',
+                 'fitted_at'),
+        computed={'level': (lambda risk: risk_level(risk.risk), ('risk',))},
+        relations={},
+        default=('risk', 'level', 'next_failure_at')),
+}
+
+# /api/sync/<collection> -> schema
+COLLECTIONS = {
+    'requests': 'request',
+    'equipment': 'equipment',
+    'teams': 'team',
+    'technicians': 'technician',
+    'work_centers': 'work_center',
+}
+FORMATS = ('json', 'ndjson')
+
+
+# ------------------------
+# Field selection
+# ------------------------
+def _add(tree, schema_name, path, field):
+    schema = SCHEMAS[schema_name]
+    name, _, rest = path.partition('.')
+    if name in schema.relations:
+        subtree = tree.get(name)
+        if not isinstance(subtree, dict):
+            subtree = tree[name] = {}
+        target = schema.relations[name]
+        for part in (rest,) if rest else SCHEMAS[target].default:
+            _add(subtree, target, part, field)
+    elif not rest and (name in schema.columns or name in schema.computed):
+        tree.setdefault(name, None)
+    else:
+        raise ValueError(f"Unknown field '{field}'.")
+
+
+def parse_fields(schema_name, value=None):
+    """
+    Field tree for `value` ('id,status,equipment.name'; None or '' = the
+    schema's defaults): {name: None} for values, {relation: subtree}.
+    Raises ValueError with a user-facing message for unknown fields.
+    """
+    fields = [field.strip() for field in (value or '').split(',') if field.strip()]
+    if len(fields) > MAX_FIELDS:
+        raise ValueError(f"At most {MAX_FIELDS} fields can be selected.")
+    tree = {}
+    for field in fields or SCHEMAS[schema_name].default:
+        _add(tree, schema_name, field, field)
+    return tree
+
+
+def loader_options(schema_name, tree, model=None):
+    """
+    Loader options reading exactly the fields of `tree` for `model` (default:
+    the schema's model; ArchivedRequest works with the 'request' schema).
+    """
+    schema = SCHEMAS[schema_name]
+    model = model or schema.model
+    columns = []
+    for name, subtree in tree.items():
+        if subtree is None:
+            columns.extend(schema.computed[name][1] if name in schema.computed else (name,))
+    attributes = [getattr(model, name) for name in dict.fromkeys(columns) if name in schema.columns]
+    # The primary key is always loaded; load_only needs at least one attribute
+    attributes = attributes or [getattr(model, column.key) for column in inspect(model).primary_key]
+    options = [load_only(*attributes, raiseload=True)]
+    for name, subtree in tree.items():
+        if subtree is not None:
+            attribute = getattr(model, name)
+            target = schema.relations[name]
+            strategy = selectinload if attribute.property.uselist else joinedload
+            options.append(strategy(attribute).options(*loader_options(target, subtree)))
+    options.append(raiseload('*'))
+    return options
+
+
+def parse_format(args):
+    """'json' (default, one page) or 'ndjson' (every row, streamed) from the format arg."""
+    fmt = args.get('format') or 'json'
+    if fmt not in FORMATS:
+        raise ValueError(f"'format' must be one of: {', '.join(FORMATS)}.")
+    return fmt
+
+
+def parse_since(collection, args):
+    """The updated_since arg as a datetime (None when absent); only for models with updated_at."""
+    value = args.get('updated_since')
+    if value in (None, ''):
+        return None
+    if not hasattr(SCHEMAS[COLLECTIONS[collection]].model, 'updated_at'):
+        raise ValueError(f"'updated_since' is not supported for {collection}.")
+    try:
+        return datetime.fromisoformat(value)
+    except ValueError:
+        raise ValueError("'updated_since' must be an ISO 8601 timestamp.")
+
+
+def collection_query(collection, tree, updated_since=None, cursor_key=None):
+    """Rows of `collection` (operational requests only) by id, loading just the fields of `tree`."""
+    schema_name = COLLECTIONS[collection]
+    model = SCHEMAS[schema_name].model
+    query = model.query.options(*loader_options(schema_name, tree))
+    if updated_since is not None:
+        query = query.filter(model.updated_at >= updated_since)
+    if cursor_key:
+        query = query.filter(after_key((model.id,), cursor_key, descending=False))
+    return query.order_by(model.id)
+
+
+# ------------------------
+# Serialization
+# ------------------------
+def serialize(obj, schema_name, tree):
+    """The fields of `tree` of `obj` as a dict (datetimes are left to dumps)."""
+    schema = SCHEMAS[schema_name]
+    data = {}
+    for name, subtree in tree.items():
+        if subtree is None:
+            data[name] = schema.computed[name][0](obj) if name in schema.computed else getattr(obj, name)
+            continue
+        value = getattr(obj, name)
+        target = schema.relations[name]
+        if isinstance(value, list):
+            data[name] = [serialize(item, target, subtree) for item in value]
+        else:
+            data[name] = serialize(value, target, subtree) if value is not None else None
+    return data
+
+
+def _default(value):
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+def dumps(payload):
+    """Encode `payload` as compact UTF-8 JSON bytes."""
+    if orjson is not None:
+        return orjson.dumps(payload)
+    return json.dumps(payload, default=_default, separators=(',', ':'), ensure_ascii=False).encode()
+
+
+def json_response(payload, status=200, headers=None):
+    """A JSON response encoded with dumps() (key order kept as built)."""
+    return Response(dumps(payload), status=status, headers=headers, mimetype='application/json')
+
+
+def ndjson_lines(objects, schema_name, tree):
+    """Yield NDJSON bytes for `objects`, STREAM_CHUNK_SIZE lines per chunk."""
+    lines = []
+    for obj in objects:
+        lines.append(dumps(serialize(obj, schema_name, tree)))
+        if len(lines) == STREAM_CHUNK_SIZE:
+            yield b'\n'.join(lines) + b'\n'
+            lines = []
+    if lines:
+        yield b'\n'.join(lines) + b'\n'
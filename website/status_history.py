@@ -0,0 +1,178 @@
+"""
+Append-only status history of maintenance requests.
+
+Every RequestChange (see changes.py) that creates a request or changes its
+status appends a StatusTransition row (request, version, from/to status,
+assignee, timestamp) through session.connection(), so a transition commits or
+rolls back together with the change it records, whichever path wrote it (ORM
+forms, the Kanban endpoints, imports). Rows are never updated; deleting a
+request deletes its history, archiving it (archive.py) keeps it.
+- creation is logged as from_status None at the request's created_at, so
+  imported history keeps its dates; later moves are logged at commit time;
+- backfill: history for requests that have none (bulk seeds, and migration
+  0012 ran the same for the requests that existed before the log): creation
+  in the status it has if it was never updated, else creation as 'new' plus
+  the current status at updated_at. Moves in between are unknown.
+Queue, repair and downtime metrics are window queries over this log (see
+analytics.status_durations).
+On PostgreSQL the table is partitioned by month on ts. Rows land in
+status_transition_default until `flask partition-status-history` creates the
+monthly partitions (moving rows already in the default partition); run it
+monthly, e.g. from cron, to keep a few months ahead.
+"""
+
+from datetime import date, datetime
+
+import click
+from flask.cli import with_appcontext
+from sqlalchemy import DDL, case, delete, event, exists, func, insert, literal, null, select, text, union_all
+
+from models import db, MaintenanceRequest, StatusTransition
+from changes import request_changes
+
+DEFAULT_PARTITION = 'status_transition_default'
+PARTITION_PREFIX = 'status_transition_'
+
+event.listen(StatusTransition.__table__, 'after_create', DDL(
+    f"CREATE TABLE IF NOT EXISTS {DEFAULT_PARTITION} PARTITION OF status_transition DEFAULT"
+).execute_if(dialect='postgresql'))
+
+
+def include_object(obj, name, type_, reflected, compare_to):
+    """Alembic filter: the monthly partitions are managed here, not by autogenerate."""
+    return not (type_ == 'table' and reflected and compare_to is None and name.startswith(PARTITION_PREFIX))
+
+
+# ------------------------
+# Recording
+# ------------------------
+def _transitions(changes, now):
+    """StatusTransition rows for the RequestChanges that create a request or change its status."""
+    rows = []
+    for change in changes:
+        old, new = change.old, change.new
+        if new is None or (old is not None and old.status == new.status):
+            continue
+        rows.append({
+            'request_id': change.request_id,
+            'version': new.version or 1,
+            'ts': (new.created_at or now) if old is None else now,
+            'from_status': old.status if old is not None else None,
+            'to_status': new.status,
+            'technician_id': new.technician_id,
+        })
+    return rows
+
+
+@request_changes.connect
+def record_transitions(session, changes):
+    """Signal receiver: append the status changes of this flush to the log."""
+    rows = _transitions(changes, datetime.utcnow())
+    deleted = [change.request_id for change in changes if change.new is None]
+    if not rows and not deleted:
+        return
+    conn = session.connection()
+    if deleted:
+        # request_id has no foreign key (it may point into the archive): cascade here
+        conn.execute(delete(StatusTransition).where(StatusTransition.request_id.in_(deleted)))
+    if rows:
+        conn.execute(insert(StatusTransition), rows)
+
+
+def history(request_id):
+    """Transitions of one request, oldest first."""
+    return StatusTransition.query.filter_by(request_id=request_id)\
+                                 .order_by(StatusTransition.ts, StatusTransition.version)\
+                                 .all()
+
+
+# ------------------------
+# Backfill
+# ------------------------
+def backfill():
+    """Log creation (and the current status) of every request without history; returns rows added."""
+    req, st = MaintenanceRequest, StatusTransition
+    no_history = ~exists().where(st.request_id == req.id)
+    created = func.coalesce(req.created_at, req.updated_at)
+    updated = case((req.updated_at > created, req.updated_at), else_=created)
+    status = func.coalesce(req.status, 'new')
+    never_moved = (req.version == 1) | (status == 'new')
+    creations = select(req.id, literal(1), created, null(), case((never_moved, status), else_='new'),
+                       req.technician_id)\
+        .where(no_history)
+    moves = select(req.id, req.version, updated, literal('new'), req.status, req.technician_id)\
+        .where(no_history, ~never_moved)
+    columns = ['request_id', 'version', 'ts', 'from_status', 'to_status', 'technician_id']
+    result = db.session.execute(insert(st).from_select(columns, union_all(creations, moves)))
+    return result.rowcount
+
+
+# ------------------------
+# PostgreSQL partitions
+# ------------------------
+def _next_month(day):
+    return date(day.year + day.month // 12, day.month % 12 + 1, 1)
+
+
+def ensure_partitions(ahead=3):
+    """
+    Create the monthly partitions from the oldest row in the default partition
+    through `ahead` months from now, moving their rows out of the default
+    partition. Returns the names created. PostgreSQL only; the caller commits.
+    """
+    conn = db.session.connection()
+    oldest = conn.execute(text(f"SELECT min(ts) FROM {DEFAULT_PARTITION}")).scalar()
+    today = date.today()
+    month = date(today.year, today.month, 1)
+    if oldest is not None:
+        month = min(month, date(oldest.year, oldest.month, 1))
+    last = date(today.year, today.month, 1)
+    for _ in range(ahead):
+        last = _next_month(last)
+    created = []
+    while month <= last:
+        following = _next_month(month)
+        name = f'{PARTITION_PREFIX}{month:%Y%m}'
+        if conn.execute(text("SELECT to_regclass(:name)"), {'name': name}).scalar() is None:
+            bounds = {'lower': month, 'upper': following}
+            # A range can't be attached while the default partition holds rows in it:
+            # build the partition standalone, move the rows over, then attach it
+            conn.execute(text(f"CREATE TABLE {name} (LIKE status_transition INCLUDING DEFAULTS)"))
+            conn.execute(text(f"WITH moved AS (DELETE FROM {DEFAULT_PARTITION} WHERE ts >= :lower AND ts < :upper"
+                              f" RETURNING *) INSERT INTO {name} SELECT * FROM moved"), bounds)
+            conn.execute(text(f"ALTER TABLE status_transition ATTACH PARTITION {name}"
+                              f" FOR VALUES FROM ('{month.isoformat()}') TO ('{following.isoformat()}')"))
+            created.append(name)
+        month = following
+    return created
+
+
+# ------------------------
+# CLI
+# ------------------------
+@click.command('backfill-status-history')
+@with_appcontext
+def backfill_command():
+    """Log creation and current status of requests that have no history yet."""
+    count = backfill()
+    db.session.commit()
+    click.echo(f"[SUCCESS] {count:,} status transitions backfilled.")
+
+
+@click.command('partition-status-history')
+@click.option('--ahead', type=int, default=3, show_default=True, help="Months to create beyond the current one.")
+@with_appcontext
+def partition_command(ahead):
+    """Create monthly status history partitions (PostgreSQL)."""
+    if db.engine.dialect.name != 'postgresql':
+        click.echo("Status history is only partitioned on PostgreSQL; nothing to do.")
+        return
+    created = ensure_partitions(ahead)
+    db.session.commit()
+    click.echo(f"[SUCCESS] {len(created)} partitions created{': ' + ', '.join(created) if created else ''}.")
+
+
+def init_app(app):
+    """Register the status history CLI commands on the app."""
+    app.cli.add_command(backfill_command)
+    app.cli.add_command(partition_command)
@@ -0,0 +1,64 @@
+"""
+Shared fixtures.
+
+- make_app(...) builds a create_app('testing') app on a temporary SQLite file
+  and fills it with seed.run_bulk_seed (login: samarth@gear.com / 123);
+- login(app) returns a test client logged in as that user;
+- statements records every SQL statement executed while a test runs, with its
+  parameters and the URL of the engine that ran it.
+"""
+
+from collections import namedtuple
+
+import pytest
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+from website import create_app
+import seed
+
+LOGIN = {'email': 'samarth@gear.com', 'password': '123'}
+
+Statement = namedtuple('Statement', 'url sql parameters')
+
+
+@pytest.fixture
+def make_app(tmp_path):
+    """Factory: make_app(requests=200, equipment=20, name='gearguard', **config) -> seeded app."""
+    def make(requests=200, equipment=20, users=5, technicians=5, name='gearguard', **config):
+        config.setdefault('SQLALCHEMY_DATABASE_URI', f"sqlite:///{tmp_path / name}.sqlite3")
+        app = create_app('testing', **config)
+        seed.run_bulk_seed(requests, equipment, users, technicians, app=app)
+        return app
+    return make
+
+
+@pytest.fixture
+def app(make_app):
+    return make_app()
+
+
+def login(app):
+    """Client logged in as the seeded user (the dashboard it lands on shows, and clears, the login flash)."""
+    client = app.test_client()
+    response = client.post('/login', data=LOGIN, follow_redirects=True)
+    assert response.request.path == '/dashboard'
+    return client
+
+
+@pytest.fixture
+def client(app):
+    return login(app)
+
+
+@pytest.fixture
+def statements():
+    """List of Statement(url, sql, parameters) run from now on; clear() it to start counting afresh."""
+    recorded = []
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        recorded.append(Statement(conn.engine.url.render_as_string(hide_password=True), statement, parameters))
+
+    event.listen(Engine, 'before_cursor_execute', record)
+    yield recorded
+    event.remove(Engine, 'before_cursor_execute', record)
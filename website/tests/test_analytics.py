@@ -0,0 +1,70 @@
+"""Reliability and status-duration figures follow request writes and time, in the data cache and in the ETag."""
+
+import time
+
+import pytest
+
+from models import db, Equipment, MaintenanceRequest
+import analytics
+import views
+
+
+@pytest.fixture
+def app(make_app):
+    return make_app(CACHE_TYPE='memory', HTTP_CACHE_ENABLED=True, HTTP_CACHE_SETTLE_SECONDS=0)
+
+
+def file_request(app):
+    with app.app_context():
+        equipment = Equipment.query.first()
+        db.session.add(MaintenanceRequest(description='Spindle seized', equipment_id=equipment.id,
+                                          team_id=equipment.team_id, created_by=1, duration_hours=6.0))
+        db.session.commit()
+
+
+def test_new_request_refreshes_reliability(app, client):
+    first = client.get('/api/analytics/reliability')
+    failures = first.get_json()['fleet']['failures']
+
+    file_request(app)
+    response = client.get('/api/analytics/reliability', headers={'If-None-Match': first.headers['ETag']})
+    assert response.status_code == 200
+    assert response.get_json()['fleet']['failures'] == failures + 1
+
+
+def test_new_request_refreshes_the_reporting_page(app, client):
+    def fleet_failures():
+        with app.app_context():
+            return views.load_reliability(end=analytics.window_end())['fleet']['failures']
+
+    etag = client.get('/reporting').headers['ETag']
+    failures = fleet_failures()
+
+    file_request(app)
+    assert client.get('/reporting', headers={'If-None-Match': etag}).status_code == 200
+    assert fleet_failures() == failures + 1
+
+
+def test_status_durations_move_with_the_window(app, client, monkeypatch):
+    monkeypatch.setattr(analytics, 'WINDOW_STEP', 1)
+    first = client.get('/api/analytics/status-durations')
+    assert first.get_json()['summary']['open_requests'] > 0
+
+    time.sleep(1.1)
+    response = client.get('/api/analytics/status-durations', headers={'If-None-Match': first.headers['ETag']})
+    assert response.status_code == 200
+    assert response.headers['ETag'] != first.headers['ETag']
+    assert response.get_json()['window']['end'] > first.get_json()['window']['end']
+
+
+def test_request_move_refreshes_status_durations(app, client, monkeypatch):
+    monkeypatch.setattr(analytics, 'WINDOW_STEP', 1)
+    before = client.get('/api/analytics/status-durations').get_json()['summary']['queue_hours']['count']
+    with app.app_context():
+        req = MaintenanceRequest.query.filter(MaintenanceRequest.status == 'new').first()
+        move = {'task_id': req.id, 'new_stage': 'In Progress', 'expected_version': req.version}
+    assert client.post('/api/update_stages', json={'moves': [move]}).get_json()['applied'] == 1
+
+    time.sleep(1.1)
+    after = client.get('/api/analytics/status-durations').get_json()['summary']['queue_hours']['count']
+    assert after == before + 1
@@ -0,0 +1,90 @@
+"""Technician workloads: a rebuild matches the open requests, idle technicians carry nothing."""
+
+from collections import defaultdict
+
+from models import db, MaintenanceRequest, Technician, TechnicianWorkload
+import assignment
+
+
+def expected_workloads():
+    workloads = {tech.id: [0, 0.0] for tech in Technician.query}
+    for req in MaintenanceRequest.query.filter(MaintenanceRequest.status.in_(assignment.OPEN_STATUSES),
+                                               MaintenanceRequest.technician_id.isnot(None)):
+        workloads[req.technician_id][0] += 1
+        workloads[req.technician_id][1] += req.estimated_hours or assignment.DEFAULT_ESTIMATE_HOURS
+    return workloads
+
+
+def stored_workloads():
+    return {row.technician_id: [row.open_requests, row.estimated_hours] for row in TechnicianWorkload.query}
+
+
+def test_rebuild_gives_idle_technicians_zero_hours(make_app):
+    app = make_app(requests=30, equipment=5, technicians=40)
+    with app.app_context():
+        idle = Technician(name='Idle Tech', email='idle@gear.com', password_hash='x',
+                          team_id=Technician.query.first().team_id)
+        db.session.add(idle)
+        db.session.commit()
+
+        assignment.rebuild_workload()
+        db.session.commit()
+        stored = stored_workloads()
+        assert stored[idle.id] == [0, 0.0]
+        idle_ids = [tech_id for tech_id, (count, _) in stored.items() if count == 0]
+        assert len(idle_ids) > 1
+        assert all(stored[tech_id][1] == 0.0 for tech_id in idle_ids)
+        assert stored == expected_workloads()
+
+
+def test_rebuild_matches_the_incremental_workloads(make_app):
+    app = make_app(requests=300, equipment=20, technicians=10)
+    with app.app_context():
+        busy = defaultdict(list)
+        for req in MaintenanceRequest.query.filter(MaintenanceRequest.status == 'new').limit(20):
+            busy[req.team_id].append(req)
+        tech = Technician.query.filter(Technician.team_id.in_(list(busy))).first()
+        for req in busy[tech.team_id]:
+            req.technician_id = tech.id
+        db.session.commit()
+        incremental = stored_workloads()
+
+        assignment.rebuild_workload()
+        db.session.commit()
+        assert stored_workloads() == incremental == expected_workloads()
+
+
+def test_rebalance_ignores_requests_changed_concurrently(make_app, monkeypatch):
+    app = make_app(requests=300, equipment=20, technicians=10)
+    with app.app_context():
+        backlog = MaintenanceRequest.query.filter(MaintenanceRequest.status.in_(assignment.OPEN_STATUSES)).all()
+        for req in backlog:
+            req.status, req.technician_id = 'new', None
+        db.session.commit()
+        assert len(backlog) > 10
+        lost = backlog[0]
+        versions = {req.id: req.version for req in backlog}
+
+        # Another writer bumped `lost` between rebalance's read and its UPDATE
+        read = assignment.state_from_row
+        monkeypatch.setattr(assignment, 'state_from_row', lambda row: read(row)._replace(
+            version=row.version - 1) if row.id == lost.id else read(row))
+        assigned = assignment.rebalance()
+        db.session.commit()
+        db.session.expire_all()
+
+        assert lost.technician_id is None and lost.version == versions[lost.id]
+        moved = [req for req in backlog if req.version == versions[req.id] + 1]
+        assert len(moved) == len(backlog) - 1
+        assert sum(assigned.values()) == len(moved)
+        assert stored_workloads() == expected_workloads()
+
+
+def test_completed_repairs_refresh_the_estimates(make_app):
+    app = make_app(CACHE_TYPE='memory')
+    with app.app_context():
+        before = assignment.duration_estimates()['overall']
+        req = MaintenanceRequest.query.filter(MaintenanceRequest.status == 'in_progress').first()
+        req.status, req.duration_hours = 'repaired', 500.0
+        db.session.commit()
+        assert assignment.duration_estimates()['overall'] > before
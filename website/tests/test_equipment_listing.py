@@ -0,0 +1,16 @@
+"""Equipment search: q matches the start of the name, serial number or location, ignoring case."""
+
+import pytest
+
+from models import Equipment
+import equipment_listing
+
+
+@pytest.mark.parametrize('q', ['floor 2', 'lc-00000', 'cnc machine #1', '%', 'zone'])
+def test_search_matches_prefixes(app, q):
+    with app.app_context():
+        expected = {eq.id for eq in Equipment.query
+                    if any((value or '').lower().startswith(q.lower())
+                           for value in (eq.name, eq.serial_number, eq.location))}
+        rows, _ = equipment_listing.equipment_page({'q': q}, limit=200)
+        assert {row.id for row in rows} == expected
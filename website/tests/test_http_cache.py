@@ -0,0 +1,100 @@
+"""Conditional GET: unchanged data is answered 304 without rendering; large bodies are compressed."""
+
+import gzip
+
+import pytest
+from flask import template_rendered
+
+from models import db, MaintenanceRequest, MaintenanceTeam, Technician
+from tests.conftest import login
+
+
+@pytest.fixture
+def app(make_app):
+    return make_app(HTTP_CACHE_ENABLED=True, HTTP_CACHE_SETTLE_SECONDS=0)
+
+
+@pytest.fixture
+def rendered(app):
+    """Names of the templates rendered from now on."""
+    names = []
+
+    def record(sender, template, context, **extra):
+        names.append(template.name)
+
+    template_rendered.connect(record, app)
+    yield names
+    template_rendered.disconnect(record, app)
+
+
+def test_unchanged_page_is_not_rendered_again(client, rendered):
+    first = client.get('/maintenance_requests')
+    assert first.status_code == 200
+    assert first.headers['ETag'].startswith('W/')
+    assert rendered == ['maintenance_requests.html']
+
+    rendered.clear()
+    again = client.get('/maintenance_requests', headers={'If-None-Match': first.headers['ETag']})
+    assert again.status_code == 304
+    assert again.data == b''
+    assert rendered == []
+
+
+def test_orm_write_changes_the_etag(app, client, rendered):
+    etag = client.get('/maintenance_requests').headers['ETag']
+    with app.app_context():
+        req = db.session.get(MaintenanceRequest, 1)
+        req.description = 'Belt realigned'
+        db.session.commit()
+
+    rendered.clear()
+    response = client.get('/maintenance_requests', headers={'If-None-Match': etag})
+    assert response.status_code == 200
+    assert response.headers['ETag'] != etag
+    assert rendered == ['maintenance_requests.html']
+
+
+def rename_team():
+    MaintenanceTeam.query.first().name = 'Night Shift'
+
+
+def move_technician():
+    tech = Technician.query.first()
+    tech.team_id = MaintenanceTeam.query.filter(MaintenanceTeam.id != tech.team_id).first().id
+
+
+@pytest.mark.parametrize('edit', [rename_team, move_technician])
+def test_reference_data_edit_changes_the_etag(app, client, edit):
+    etag = client.get('/teams').headers['ETag']
+    with app.app_context():
+        edit()
+        db.session.commit()
+
+    response = client.get('/teams', headers={'If-None-Match': etag})
+    assert response.status_code == 200
+    assert response.headers['ETag'] != etag
+
+
+def test_batch_stage_update_changes_the_etag(app, client):
+    etag = client.get('/api/maintenance_requests').headers['ETag']
+    with app.app_context():
+        req = MaintenanceRequest.query.filter(MaintenanceRequest.status == 'new').first()
+        move = {'task_id': req.id, 'new_stage': 'In Progress', 'expected_version': req.version}
+    assert client.post('/api/update_stages', json={'moves': [move]}).get_json()['applied'] == 1
+
+    response = client.get('/api/maintenance_requests', headers={'If-None-Match': etag})
+    assert response.status_code == 200
+    assert response.headers['ETag'] != etag
+
+
+def test_large_responses_are_gzipped(app):
+    client = login(app)
+    headers = {'Accept-Encoding': 'gzip'}
+    large = client.get('/api/maintenance_requests?limit=100', headers=headers)
+    assert large.headers['Content-Encoding'] == 'gzip'
+    assert len(large.data) < len(gzip.decompress(large.data))
+    assert len(gzip.decompress(large.data)) >= app.config['COMPRESS_MIN_SIZE']
+
+    small = client.get('/api/maintenance_requests?limit=1&fields=id', headers=headers)
+    assert len(small.data) < app.config['COMPRESS_MIN_SIZE']
+    assert 'Content-Encoding' not in small.headers
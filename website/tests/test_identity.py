@@ -0,0 +1,56 @@
+"""Identity cache: warm requests load no user, committed User edits evict it."""
+
+import re
+
+import pytest
+
+from models import db, User
+from identity import identity_cache
+from tests.conftest import login
+
+USER_TABLE = re.compile(r'\b(FROM|JOIN|UPDATE)\s+"?user"?(\s|$)', re.IGNORECASE)
+
+
+def user_statements(statements):
+    return [statement.sql for statement in statements if USER_TABLE.search(statement.sql)]
+
+
+@pytest.fixture
+def app(make_app):
+    return make_app(IDENTITY_CACHE_TTL=60)
+
+
+@pytest.fixture(autouse=True)
+def empty_cache():
+    identity_cache.clear()
+    yield
+    identity_cache.clear()
+
+
+def test_warm_requests_load_no_user(app, statements):
+    client = login(app)
+    assert client.get('/api/maintenance_requests?limit=5').status_code == 200
+    statements.clear()
+    response = client.get('/api/maintenance_requests?limit=5')
+    assert response.status_code == 200
+    assert statements, "the listing should still query requests"
+    assert user_statements(statements) == []
+
+
+def test_committed_user_edit_evicts_the_principal(app, statements):
+    client = login(app)
+    client.get('/api/maintenance_requests?limit=5')
+    with app.app_context():
+        user = db.session.get(User, 1)
+        user.name = 'Samarth R.'
+        db.session.commit()
+
+    statements.clear()
+    assert client.get('/api/maintenance_requests?limit=5').status_code == 200
+    assert len(user_statements(statements)) == 1
+    with app.app_context():
+        assert identity_cache.get(1).name == 'Samarth R.'
+
+    statements.clear()
+    client.get('/api/maintenance_requests?limit=5')
+    assert user_statements(statements) == []
@@ -0,0 +1,98 @@
+"""
+Index use of the hot request queries (migrations 0001-0003) and of the
+equipment list's location sort and search (0017), checked with SQLite's
+EXPLAIN QUERY PLAN on the statements the app actually runs.
+"""
+
+import re
+
+import pytest
+
+from models import db, MaintenanceRequest
+from pagination import decode_cursor
+import assignment
+import equipment_listing
+import kanban
+import request_listing
+
+# A full read of maintenance_request; counting rows per status may read a whole covering index instead
+TABLE_SCAN = re.compile(r'^SCAN maintenance_request(?! USING COVERING INDEX)')
+
+
+def _middle():
+    return db.session.query(MaintenanceRequest).order_by(MaintenanceRequest.id)\
+                     .offset(MaintenanceRequest.query.count() // 2).first()
+
+
+# name -> (call(middle request), index it must use)
+HOT_QUERIES = {
+    'kanban_board': (lambda req: kanban.first_pages(), 'ix_maintenance_request_status_created_at'),
+    'kanban_column': (lambda req: kanban.column_page('in_progress', (req.created_at, req.id)),
+                      'ix_maintenance_request_status_created_at'),
+    'keyset_list': (lambda req: request_listing.request_page({}, (req.created_at, req.id)),
+                    'ix_maintenance_request_created_at'),
+    'per_equipment': (lambda req: request_listing.request_page({'equipment_id': req.equipment_id}),
+                      'ix_maintenance_request_equipment_status'),
+    'per_team': (lambda req: request_listing.request_page({'team_id': req.team_id}),
+                 'ix_maintenance_request_team_status'),
+    'per_technician': (lambda req: assignment.rebuild_workload(), 'ix_maintenance_request_technician_status'),
+    'status_group_by': (lambda req: kanban.column_counts(), 'ix_maintenance_request_status_created_at'),
+}
+
+
+def query_plans(statements, table='maintenance_request'):
+    """EXPLAIN QUERY PLAN details of every recorded statement reading `table`."""
+    conn = db.session.connection()
+    plans = []
+    for statement in statements:
+        if re.search(rf'\b{table}\b', statement.sql) and 'EXPLAIN' not in statement.sql:
+            rows = conn.exec_driver_sql('EXPLAIN QUERY PLAN ' + statement.sql, statement.parameters).all()
+            plans.append([row[3] for row in rows])
+    return plans
+
+
+@pytest.mark.parametrize('name', HOT_QUERIES)
+def test_hot_query_uses_an_index(make_app, statements, name):
+    call, index = HOT_QUERIES[name]
+    app = make_app(requests=3000, equipment=300)
+    with app.app_context():
+        req = _middle()
+        statements.clear()
+        call(req)
+        plans = query_plans(list(statements))
+        db.session.rollback()
+
+    assert plans, f"{name} ran no maintenance_request statement"
+    details = [detail for plan in plans for detail in plan]
+    assert any(re.search(rf'USING (COVERING )?INDEX {index}\b', detail) for detail in details), details
+    assert not any(TABLE_SCAN.search(detail) for detail in details), details
+
+
+# name -> (listing options, indexes the equipment may be read through on the first and the next page)
+EQUIPMENT_QUERIES = {
+    'location_sort': ({'sort': 'location'}, 'ix_equipment_location_name'),
+    'location_sort_desc': ({'sort': 'location', 'dir': 'desc'}, 'ix_equipment_location_name'),
+    # Matches through the lower() indexes, or the location index walked from the cursor
+    'prefix_search': ({'sort': 'location', 'q': 'floor 2'},
+                      'ix_equipment_(lower_name|lower_serial_number|lower_location|location_name)'),
+}
+
+
+@pytest.mark.parametrize('name', EQUIPMENT_QUERIES)
+def test_equipment_list_uses_an_index(make_app, statements, name):
+    options, indexes = EQUIPMENT_QUERIES[name]
+    app = make_app(requests=500, equipment=3000)
+    with app.app_context():
+        statements.clear()
+        rows, cursor = equipment_listing.equipment_page(options, limit=20)
+        assert len(rows) == 20 and cursor
+        equipment_listing.equipment_page(options, decode_cursor(cursor), limit=20)
+        plans = query_plans(list(statements), 'equipment')
+
+    assert len(plans) == 2
+    for details in plans:
+        reads = [detail for detail in details if re.match(r'(SCAN|SEARCH) equipment\b(?!_)', detail)]
+        assert reads and all(re.search(rf'USING INDEX {indexes}\b', detail) for detail in reads), details
+        if 'q' not in options:
+            # The sort is read off the index: no sort step
+            assert not any('TEMP B-TREE' in detail for detail in details), details
@@ -0,0 +1,62 @@
+"""Background jobs: only whitelisted tasks are open to HTTP, and payloads are checked against their arguments."""
+
+import json
+from datetime import datetime
+
+import pytest
+
+from models import db, Job
+from jobs import job_queue
+from tests.conftest import login
+
+
+def test_submit_rejects_unknown_arguments(client):
+    response = client.post('/api/jobs', json={'name': 'rebalance_assignments', 'payload': {'bogus': 1}})
+    assert response.status_code == 400
+    assert 'bogus' in response.get_json()['error']
+
+
+def test_submit_accepts_the_task_arguments(app, client):
+    response = client.post('/api/jobs', json={'name': 'rebalance_assignments', 'payload': {'reassign': False}})
+    assert response.status_code == 202
+    with app.app_context():
+        assert db.session.get(Job, response.get_json()['id']).status == 'queued'
+
+
+def test_unbindable_queued_job_fails_without_retry(app):
+    with app.app_context():
+        now = datetime.utcnow()
+        job = Job(name='rebalance_assignments', payload=json.dumps({'bogus': 1}), status='queued', attempts=0,
+                  max_attempts=3, progress=0.0, run_at=now, created_at=now)
+        db.session.add(job)
+        db.session.commit()
+        job_id = job.id
+
+        assert job_queue.claim('test-worker') == job_id
+        job_queue.run(job_id, 'test-worker')
+        db.session.expire_all()
+        job = db.session.get(Job, job_id)
+        assert (job.status, job.attempts) == ('failed', 1)
+        assert 'bogus' in job.error
+
+
+@pytest.mark.parametrize('name', ['archive_requests', 'import_data', 'no_such_task'])
+def test_tasks_outside_the_whitelist_are_forbidden(app, client, name):
+    response = client.post('/api/jobs', json={'name': name, 'payload': {}})
+    assert response.status_code == 403
+    with app.app_context():
+        assert Job.query.count() == 0
+
+
+def test_user_argument_is_the_submitter(make_app):
+    app = make_app(JOBS_HTTP_TASKS=('import_data',))
+    client = login(app)
+    payload = {'dataset': 'equipment', 'format': 'csv', 'content': ''}
+    forged = client.post('/api/jobs', json={'name': 'import_data', 'payload': dict(payload, default_user_id=2)})
+    assert forged.status_code == 403
+
+    response = client.post('/api/jobs', json={'name': 'import_data', 'payload': payload})
+    assert response.status_code == 202
+    with app.app_context():
+        job = db.session.get(Job, response.get_json()['id'])
+        assert json.loads(job.payload)['default_user_id'] == job.created_by == 1
@@ -0,0 +1,64 @@
+"""Kanban board: column cursors and single and batch moves validate their input."""
+
+from datetime import datetime
+
+import pytest
+
+from models import db, MaintenanceRequest
+from pagination import encode_cursor
+
+
+@pytest.mark.parametrize('values', [(1,), (datetime(2026, 1, 1), 5, 7), (5, datetime(2026, 1, 1)),
+                                    (datetime(2026, 1, 1), [5])])
+def test_column_rejects_a_cursor_of_the_wrong_shape(client, values):
+    response = client.get(f'/api/dashboard/new?cursor={encode_cursor(*values)}')
+    assert response.status_code == 400
+
+
+def test_column_rejects_a_cursor_that_is_not_a_list(client):
+    # base64 of '{"a":1}'
+    assert client.get('/api/dashboard/new?cursor=eyJhIjoxfQ').status_code == 400
+
+
+def test_column_follows_its_own_cursor(client):
+    first = client.get('/api/dashboard/repaired?limit=2').get_json()
+    response = client.get(f"/api/dashboard/repaired?limit=2&cursor={first['next_cursor']}")
+    assert response.status_code == 200
+    assert response.get_json()['count'] == 2
+
+
+def test_update_stage_rejects_a_malformed_version(client):
+    response = client.post('/api/update_stage', json={'task_id': 1, 'new_stage': 'Repaired',
+                                                      'expected_version': 'x'})
+    assert response.status_code == 400
+    assert response.get_json() == {'success': False}
+
+
+def test_update_stage_rejects_a_malformed_task_id(client):
+    response = client.post('/api/update_stage', json={'task_id': 'x', 'new_stage': 'Repaired'})
+    assert response.status_code == 400
+
+
+@pytest.mark.parametrize('body', [None, 'null', '[]', '{"task_id": 1}', '{"new_stage": "Repaired"}'])
+def test_update_stage_rejects_an_incomplete_body(client, body):
+    response = client.post('/api/update_stage', data=body, content_type='application/json')
+    assert response.status_code == 400
+    assert response.get_json() == {'success': False}
+
+
+@pytest.mark.filterwarnings('error::sqlalchemy.exc.LegacyAPIWarning')
+def test_update_stage_checks_the_expected_version(app, client):
+    with app.app_context():
+        version = db.session.get(MaintenanceRequest, 1).version
+    stale = client.post('/api/update_stage', json={'task_id': 1, 'new_stage': 'Scrap',
+                                                   'expected_version': str(version + 1)})
+    assert stale.status_code == 409
+    moved = client.post('/api/update_stage', json={'task_id': 1, 'new_stage': 'Scrap',
+                                                   'expected_version': str(version)})
+    assert moved.get_json() == {'success': True, 'version': version + 1}
+
+
+def test_batch_marks_the_same_input_invalid(client):
+    response = client.post('/api/update_stages', json={'moves': [
+        {'task_id': 1, 'new_stage': 'Repaired', 'expected_version': 'x'}]})
+    assert response.get_json()['results'] == [{'task_id': 1, 'status': 'invalid'}]
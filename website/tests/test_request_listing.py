@@ -0,0 +1,50 @@
+"""Request listing: a constant number of statements per page, whatever the table size or depth."""
+
+import re
+
+import pytest
+
+from models import db, MaintenanceRequest
+from pagination import encode_cursor
+from tests.conftest import login
+
+# A lazy (or select-in) load of a listed request's equipment or team: a lookup by id
+LAZY_LOAD = re.compile(r'\bFROM\s+(equipment|maintenance_team)\s+WHERE\s+\1\.id\s*(=|IN)', re.IGNORECASE)
+
+
+def deep_cursor(app, depth=0.9):
+    """Cursor of the request `depth` of the way down the newest-first listing."""
+    with app.app_context():
+        total = MaintenanceRequest.query.count()
+        row = db.session.query(MaintenanceRequest.created_at, MaintenanceRequest.id)\
+                        .order_by(MaintenanceRequest.created_at.desc(), MaintenanceRequest.id.desc())\
+                        .offset(int(total * depth))\
+                        .first()
+    return encode_cursor(*row)
+
+
+def page_statements(client, statements, path):
+    statements.clear()
+    response = client.get(path)
+    assert response.status_code == 200
+    return [statement.sql for statement in statements]
+
+
+@pytest.mark.parametrize('path', ['/api/maintenance_requests?limit=50', '/maintenance_requests?limit=50'])
+def test_statement_count_is_constant(make_app, statements, path):
+    counts = []
+    for requests in (300, 3000):
+        app = make_app(requests=requests, equipment=requests // 10, name=f'requests-{requests}')
+        client = login(app)
+        for cursor in (None, deep_cursor(app)):
+            sql = page_statements(client, statements, path + (f'&cursor={cursor}' if cursor else ''))
+            assert [s for s in sql if LAZY_LOAD.search(s)] == [], "equipment/team must be joined, not lazy-loaded"
+            counts.append(len(sql))
+    assert len(set(counts)) == 1, counts
+
+
+def test_deep_page_returns_a_full_page(app, client):
+    body = client.get(f'/api/maintenance_requests?limit=10&cursor={deep_cursor(app, 0.5)}').get_json()
+    assert len(body['items']) == 10
+    assert body['next_cursor']
+    assert all(item['equipment']['team'] is not None for item in body['items'])
@@ -0,0 +1,75 @@
+"""Replica routing, with two SQLite files standing in for the primary and its replica."""
+
+import shutil
+
+import pytest
+
+from website import create_app
+from models import db, MaintenanceRequest
+from routing import read_replica, replicas
+from tests.conftest import login
+
+
+def with_replica(make_app, tmp_path, replica):
+    """App on a seeded primary (primary.sqlite3) reading from the `replica` path."""
+    make_app(name='primary')
+    return create_app('testing', SQLALCHEMY_DATABASE_URI=f"sqlite:///{tmp_path / 'primary.sqlite3'}",
+                      DATABASE_REPLICA_URLS=[f'sqlite:///{replica}'])
+
+
+@pytest.fixture
+def app(make_app, tmp_path):
+    """Seeded primary plus a replica that starts as a copy of it."""
+    app = with_replica(make_app, tmp_path, tmp_path / 'replica.sqlite3')
+    shutil.copyfile(tmp_path / 'primary.sqlite3', tmp_path / 'replica.sqlite3')
+    return app
+
+
+def engine_urls(statements, table='maintenance_request'):
+    """Databases (file names) that ran statements reading or writing `table`."""
+    return {statement.url.rsplit('/', 1)[-1] for statement in statements if table in statement.sql}
+
+
+def test_replica_reads_view_uses_the_replica(client, statements):
+    statements.clear()
+    assert client.get('/api/maintenance_requests').status_code == 200
+    assert engine_urls(statements) == {'replica.sqlite3'}
+    assert replicas.stats()['replicas'] == {'replica_0': True}
+
+
+def test_reads_after_a_write_stay_on_the_primary(app, client, statements):
+    with app.app_context():
+        req = MaintenanceRequest.query.filter(MaintenanceRequest.status == 'new').first()
+        move = {'task_id': req.id, 'new_stage': 'In Progress', 'expected_version': req.version}
+    statements.clear()
+    assert client.post('/api/update_stage', json=move).get_json()['success']
+    assert engine_urls(statements) == {'primary.sqlite3'}
+
+    statements.clear()
+    body = client.get('/api/maintenance_requests?status=in_progress&limit=200').get_json()
+    assert engine_urls(statements) == {'primary.sqlite3'}
+    assert req.id in [item['id'] for item in body['items']]
+
+
+def test_locking_reads_go_to_the_primary(app, statements):
+    with app.app_context(), read_replica():
+        statements.clear()
+        MaintenanceRequest.query.limit(1).all()
+        assert engine_urls(statements) == {'replica.sqlite3'}
+
+        statements.clear()
+        MaintenanceRequest.query.filter(MaintenanceRequest.id == 1).with_for_update().all()
+        # ... and the rest of the transaction reads its own locks
+        MaintenanceRequest.query.limit(1).all()
+        assert engine_urls(statements) == {'primary.sqlite3'}
+        db.session.rollback()
+
+
+def test_unreachable_replica_falls_back_to_the_primary(make_app, tmp_path, statements):
+    client = login(with_replica(make_app, tmp_path, tmp_path / 'missing' / 'replica.sqlite3'))
+    statements.clear()
+    response = client.get('/api/maintenance_requests')
+    assert response.status_code == 200
+    assert response.get_json()['items']
+    assert engine_urls(statements) == {'primary.sqlite3'}
+    assert replicas.stats()['replicas'] == {'replica_0': False}
@@ -0,0 +1,27 @@
+"""Preventive plans: the API rejects plans that could not be stored or would never occur."""
+
+import pytest
+
+from models import MaintenancePlan
+
+PLAN = {'title': 'Lubricate spindle', 'equipment_id': 1, 'interval_days': 30, 'start_date': '2026-01-01'}
+
+
+@pytest.mark.parametrize('changes, field', [
+    ({'equipment_id': 9999}, 'equipment_id'),
+    ({'equipment_id': None, 'work_center_id': 9999}, 'work_center_id'),
+    ({'end_date': '2025-12-31'}, 'end_date'),
+])
+def test_invalid_plan_is_rejected(app, client, changes, field):
+    response = client.post('/api/maintenance_plans', json=dict(PLAN, **changes))
+    assert response.status_code == 400
+    assert field in response.get_json()['error']
+    with app.app_context():
+        assert MaintenancePlan.query.count() == 0
+
+
+def test_valid_plan_is_created(app, client):
+    response = client.post('/api/maintenance_plans', json=dict(PLAN, end_date='2026-01-01'))
+    assert response.status_code == 201
+    with app.app_context():
+        assert MaintenancePlan.query.count() == 1
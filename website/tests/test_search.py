@@ -0,0 +1,65 @@
+"""Search over operational and archived requests."""
+
+import pytest
+
+from models import db, ArchivedRequest
+import archive
+import search
+
+
+def all_ids(client, path):
+    """Ids of every result of `path`, following next_cursor to the end."""
+    ids, cursor = [], None
+    while True:
+        body = client.get(path + '&limit=200' + (f'&cursor={cursor}' if cursor else '')).get_json()
+        ids.extend(item['id'] for item in body['items'])
+        cursor = body['next_cursor']
+        if not cursor:
+            return ids
+
+
+@pytest.fixture
+def app(make_app):
+    # Enough requests for open ones to match too (most of the history is closed)
+    return make_app(requests=2000, equipment=100)
+
+
+@pytest.fixture
+def searched(app, client):
+    """(query path, ids found before archiving); then every closed request is archived."""
+    path = '/api/search?q=leak&date_from=2000-01-01'
+    before = all_ids(client, path)
+    with app.app_context():
+        moved = archive.archive_requests(older_than_days=0)
+    assert moved
+    return path, before
+
+
+def test_date_ranged_search_includes_archived_requests(app, client, searched):
+    path, before = searched
+    after = all_ids(client, path)
+    assert sorted(after) == sorted(before)
+    with app.app_context():
+        archived = {row.id for row in db.session.query(ArchivedRequest.id)}
+    assert archived & set(after) and set(after) - archived
+    body = client.get(path + '&limit=200&fields=id,archived').get_json()
+    assert all(item['archived'] == (item['id'] in archived) for item in body['items'])
+
+
+def test_search_without_a_date_range_stays_operational(app, client, searched):
+    path, before = searched
+    with app.app_context():
+        archived = {row.id for row in db.session.query(ArchivedRequest.id)}
+    operational = all_ids(client, '/api/search?q=leak')
+    assert operational and not archived & set(operational)
+    assert sorted(operational) == sorted(set(before) - archived)
+
+
+def test_archived_requests_are_reindexed_with_their_equipment(app):
+    with app.app_context():
+        archive.archive_requests(older_than_days=0)
+        req = ArchivedRequest.query.first()
+        req.equipment.name = 'Zeppelin Winch'
+        db.session.commit()
+        results, _ = search.search_page('zeppelin', {'date_from': req.created_at.date()})
+        assert req.id in [row[0].id for row in results]
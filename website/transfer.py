@@ -0,0 +1,421 @@
+"""
+Bulk export and import of equipment, maintenance requests and work centers.
+
+Exports stream CSV or JSON Lines straight from a server-side cursor: rows are
+fetched CHUNK_SIZE at a time and written out chunk by chunk, so memory stays
+flat however many rows there are; request exports include archived requests
+(archive.py). Foreign keys are written as natural keys (department/team names,
+work center codes, equipment serial numbers, user emails), so a file exported
+from one database can be imported into another.
+
+Imports read the same formats row by row:
+- each row is validated and its natural keys are resolved through lookup maps
+  loaded once per import (no query per row);
+- valid rows are inserted CHUNK_SIZE at a time inside one transaction, which
+  is committed only if every row was valid (dry runs validate without writing);
+- the report lists the errors of each rejected row by line number.
+Imported requests are published through request_changes and indexed for
+search like any other write, so rollups, equipment health and live boards follow.
+"""
+
+import contextlib
+import csv
+import io
+import json
+import sys
+from datetime import datetime
+
+import click
+from flask.cli import with_appcontext
+from sqlalchemy import func, insert, select
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.orm import aliased
+
+from models import db, Department, MaintenanceTeam, Technician, User, Equipment, MaintenanceRequest, WorkCenter
+from changes import TRACKED_FIELDS, RequestChange, state_from_row, publish
+from equipment_health import create_health_rows
+from cache import cache
+from jobs import job_queue
+import search
+import archive
+
+# Rows fetched per round trip on export and inserted per statement on import
+CHUNK_SIZE = 1000
+FORMATS = {'csv': 'text/csv', 'jsonl': 'application/x-ndjson'}
+DATASETS = ('equipment', 'requests', 'work_centers')
+REQUEST_STATUSES = ('new', 'in_progress', 'repaired', 'scrap')
+# Rejected rows listed in a report; the rest are only counted
+MAX_REPORTED_ERRORS = 100
+
+
+# ------------------------
+# Export
+# ------------------------
+def _export_statement(conn, dataset):
+    if dataset == 'equipment':
+        return select(Equipment.id, Equipment.name, Equipment.serial_number, Equipment.location,
+                      Equipment.category, Department.name.label('department'), MaintenanceTeam.name.label('team'),
+                      WorkCenter.code.label('work_center'))\
+            .outerjoin(Department, Department.id == Equipment.department_id)\
+            .outerjoin(MaintenanceTeam, MaintenanceTeam.id == Equipment.team_id)\
+            .outerjoin(WorkCenter, WorkCenter.id == Equipment.work_center_id)\
+            .order_by(Equipment.id)
+    if dataset == 'requests':
+        # Full history: archived requests are exported with the operational ones
+        creator = aliased(User)
+        req = archive.history_source(conn).c
+        return select(req.id, req.description, req.status,
+                      Equipment.serial_number.label('equipment_serial'), MaintenanceTeam.name.label('team'),
+                      Technician.email.label('technician_email'), creator.email.label('created_by_email'),
+                      req.created_at, req.duration_hours, req.estimated_hours)\
+            .join(Equipment, Equipment.id == req.equipment_id)\
+            .outerjoin(MaintenanceTeam, MaintenanceTeam.id == req.team_id)\
+            .outerjoin(Technician, Technician.id == req.technician_id)\
+            .outerjoin(creator, creator.id == req.created_by)\
+            .order_by(req.id)
+    return select(WorkCenter.id, WorkCenter.name, WorkCenter.code, WorkCenter.cost_per_hour,
+                  WorkCenter.capacity_efficiency, WorkCenter.oee_target)\
+        .order_by(WorkCenter.id)
+
+
+def _json_value(value):
+    return value.isoformat() if isinstance(value, datetime) else value
+
+
+def export_stream(engine, dataset, fmt):
+    """
+    Yield the dataset as CSV or JSON Lines text, one chunk of rows at a time.
+    Uses its own connection, so it can outlive the request that started it.
+    """
+    with engine.connect() as conn:
+        result = conn.execution_options(stream_results=True, yield_per=CHUNK_SIZE)\
+                     .execute(_export_statement(conn, dataset))
+        fields = list(result.keys())
+        buffer = io.StringIO()
+        writer = csv.writer(buffer) if fmt == 'csv' else None
+        if writer:
+            writer.writerow(fields)
+        for rows in result.partitions():
+            if writer:
+                writer.writerows(rows)
+            else:
+                for row in rows:
+                    buffer.write(json.dumps({f: _json_value(v) for f, v in zip(fields, row)}) + '\n')
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+        if buffer.tell():
+            yield buffer.getvalue()
+
+
+# ------------------------
+# Import: reading and validation
+# ------------------------
+def read_rows(stream, fmt):
+    """Yield (line number, row dict or None if unparsable) from a text stream."""
+    if fmt == 'csv':
+        reader = csv.DictReader(stream)
+        for row in reader:
+            yield reader.line_num, row
+        return
+    for number, line in enumerate(stream, 1):
+        if not line.strip():
+            continue
+        try:
+            row = json.loads(line)
+        except ValueError:
+            row = None
+        yield number, row if isinstance(row, dict) else None
+
+
+def _field(row, name):
+    """Stripped text value of a column ('' when missing or null)."""
+    value = row.get(name)
+    return '' if value is None else str(value).strip()
+
+
+def _text(row, name, errors, max_length, required=False):
+    value = _field(row, name)
+    if required and not value:
+        errors.append(f"'{name}' is required.")
+    elif len(value) > max_length:
+        errors.append(f"'{name}' is longer than {max_length} characters.")
+    return value or None
+
+
+def _number(row, name, errors, cast, default, minimum=None):
+    value = _field(row, name)
+    if not value:
+        return default
+    try:
+        number = cast(value)
+    except ValueError:
+        errors.append(f"'{name}' must be a number.")
+        return default
+    if minimum is not None and number < minimum:
+        errors.append(f"'{name}' must be at least {minimum}.")
+    return number
+
+
+def _lookup(row, name, mapping, errors, label):
+    """Resolve a natural key (case-insensitive) to an id; None when blank."""
+    value = _field(row, name)
+    if not value:
+        return None
+    if value.lower() not in mapping:
+        errors.append(f"Unknown {label} '{value}'.")
+        return None
+    return mapping[value.lower()]
+
+
+class Lookups:
+    """Natural key -> id maps for one import, each loaded with a single query."""
+
+    def __init__(self, conn, dataset):
+        self.departments = {name.lower(): id for id, name in conn.execute(select(Department.id, Department.name))}
+        self.teams = {name.lower(): id for id, name in conn.execute(select(MaintenanceTeam.id, MaintenanceTeam.name))}
+        if dataset == 'equipment':
+            self.serials = set(conn.scalars(select(Equipment.serial_number)))
+            self.work_centers = {code.lower(): id for id, code in conn.execute(select(WorkCenter.id, WorkCenter.code))}
+        elif dataset == 'requests':
+            # serial -> (equipment id, its team id), the team requests default to
+            self.equipment = {serial.lower(): (id, team_id) for id, serial, team_id
+                              in conn.execute(select(Equipment.id, Equipment.serial_number, Equipment.team_id))}
+            self.users = {email.lower(): id for id, email in conn.execute(select(User.id, User.email))}
+            self.technicians = {email.lower(): id for id, email in conn.execute(select(Technician.id, Technician.email))}
+        else:
+            self.codes = set(conn.scalars(select(WorkCenter.code)))
+
+
+def _equipment_values(row, lookups, errors):
+    serial = _text(row, 'serial_number', errors, 100, required=True)
+    if serial and serial in lookups.serials:
+        errors.append(f"Serial number '{serial}' already exists.")
+    values = {
+        'name': _text(row, 'name', errors, 100, required=True),
+        'serial_number': serial,
+        'location': _text(row, 'location', errors, 100),
+        'category': _text(row, 'category', errors, 50),
+        'department_id': _lookup(row, 'department', lookups.departments, errors, 'department'),
+        'team_id': _lookup(row, 'team', lookups.teams, errors, 'team'),
+        'work_center_id': _lookup(row, 'work_center', lookups.work_centers, errors, 'work center code'),
+    }
+    if not errors:
+        # Later rows of the same file must not reuse it either
+        lookups.serials.add(serial)
+    return values
+
+
+def _request_values(row, lookups, errors, default_user_id):
+    equipment = _lookup(row, 'equipment_serial', lookups.equipment, errors, 'equipment serial number')
+    if not _field(row, 'equipment_serial'):
+        errors.append("'equipment_serial' is required.")
+    status = _field(row, 'status') or 'new'
+    if status not in REQUEST_STATUSES:
+        errors.append(f"'status' must be one of: {', '.join(REQUEST_STATUSES)}.")
+    created_by = _lookup(row, 'created_by_email', lookups.users, errors, 'user') or default_user_id
+    if created_by is None and not _field(row, 'created_by_email'):
+        errors.append("'created_by_email' is required.")
+    created_at = None
+    if _field(row, 'created_at'):
+        try:
+            created_at = datetime.fromisoformat(_field(row, 'created_at'))
+        except ValueError:
+            errors.append("'created_at' must be an ISO date/time.")
+    team_id = _lookup(row, 'team', lookups.teams, errors, 'team')
+    values = {
+        'description': _text(row, 'description', errors, 500, required=True),
+        'status': status,
+        'equipment_id': equipment[0] if equipment else None,
+        'team_id': team_id if team_id is not None else (equipment[1] if equipment else None),
+        'technician_id': _lookup(row, 'technician_email', lookups.technicians, errors, 'technician'),
+        'created_by': created_by,
+        'created_at': created_at or datetime.utcnow(),
+        'duration_hours': _number(row, 'duration_hours', errors, float, 0.0, minimum=0),
+        'estimated_hours': _number(row, 'estimated_hours', errors, float, None, minimum=0),
+    }
+    return values
+
+
+def _work_center_values(row, lookups, errors):
+    code = _text(row, 'code', errors, 50, required=True)
+    if code and code in lookups.codes:
+        errors.append(f"Work center code '{code}' already exists.")
+    values = {
+        'name': _text(row, 'name', errors, 100, required=True),
+        'code': code,
+        'cost_per_hour': _number(row, 'cost_per_hour', errors, float, 0.0, minimum=0),
+        'capacity_efficiency': _number(row, 'capacity_efficiency', errors, int, 100, minimum=0),
+        'oee_target': _number(row, 'oee_target', errors, int, 85, minimum=0),
+    }
+    if not errors:
+        lookups.codes.add(code)
+    return values
+
+
+# ------------------------
+# Import: writing
+# ------------------------
+def _insert_chunk(session, dataset, chunk):
+    """Insert validated rows with one executemany and keep derived data in step."""
+    conn = session.connection()
+    if dataset == 'equipment':
+        table = Equipment.__table__
+        ids = conn.scalars(insert(table).returning(table.c.id), chunk).all()
+        create_health_rows(conn, ids)
+    elif dataset == 'requests':
+        table = MaintenanceRequest.__table__
+        rows = conn.execute(insert(table).returning(table.c.id, *(table.c[f] for f in TRACKED_FIELDS)),
+                            chunk).all()
+        publish(session, [RequestChange(row.id, None, state_from_row(row)) for row in rows])
+        search.index_requests(conn, [row.id for row in rows])
+    else:
+        conn.execute(insert(WorkCenter.__table__), chunk)
+
+
+def import_rows(dataset, rows, dry_run=False, default_user_id=None, progress=None):
+    """
+    Validate and insert (line number, row) pairs from read_rows in one
+    transaction. Nothing is committed unless every row is valid; a dry run only
+    validates. `progress(rows_read)` is called every CHUNK_SIZE rows. Returns a
+    report dict (counts plus the first rejected rows).
+    """
+    session = db.session
+    lookups = Lookups(session.connection(), dataset)
+    report = {'dataset': dataset, 'dry_run': dry_run, 'rows': 0, 'inserted': 0,
+              'error_count': 0, 'errors': [], 'committed': False}
+    chunk = []
+
+    def reject(line, errors):
+        report['error_count'] += 1
+        if len(report['errors']) < MAX_REPORTED_ERRORS:
+            report['errors'].append({'line': line, 'errors': errors})
+
+    try:
+        for line, row in rows:
+            report['rows'] += 1
+            if progress is not None and report['rows'] % CHUNK_SIZE == 0:
+                progress(report['rows'])
+            if row is None:
+                reject(line, ['Row is not a JSON object.'])
+                continue
+            errors = []
+            if dataset == 'equipment':
+                values = _equipment_values(row, lookups, errors)
+            elif dataset == 'requests':
+                values = _request_values(row, lookups, errors, default_user_id)
+            else:
+                values = _work_center_values(row, lookups, errors)
+            if errors:
+                reject(line, errors)
+                continue
+            # Once a row is rejected nothing will be committed, so stop writing
+            if dry_run or report['error_count']:
+                continue
+            chunk.append(values)
+            if len(chunk) >= CHUNK_SIZE:
+                _insert_chunk(session, dataset, chunk)
+                report['inserted'] += len(chunk)
+                chunk = []
+        if chunk and not report['error_count']:
+            _insert_chunk(session, dataset, chunk)
+            report['inserted'] += len(chunk)
+    except (SQLAlchemyError, csv.Error, UnicodeDecodeError) as e:
+        session.rollback()
+        reject(None, [f'Import aborted: {e}'])
+        report['inserted'] = 0
+        return report
+
+    if dry_run or report['error_count']:
+        session.rollback()
+        report['inserted'] = 0
+        return report
+    session.commit()
+    report['committed'] = True
+    # Core inserts bypass the unit of work, so tag the written models explicitly
+    cache.invalidate({'Equipment'} if dataset == 'equipment' else
+                     {'WorkCenter'} if dataset == 'work_centers' else {'MaintenanceRequest'})
+    return report
+
+
+def import_format(fmt, filename):
+    """Explicit format, else the file extension; ValueError when neither is usable."""
+    fmt = fmt or (filename.rsplit('.', 1)[-1].lower() if filename and '.' in filename else None)
+    if fmt not in FORMATS:
+        raise ValueError(f"'format' must be one of: {', '.join(FORMATS)}.")
+    return fmt
+
+
+@job_queue.task('import_data', max_attempts=1, user_argument='default_user_id')
+def import_job(job, dataset, format, content, dry_run=False, default_user_id=None):
+    """Background import of an uploaded file (see POST /api/import/<dataset>?background=1)."""
+    total = content.count('\n') + 1
+    report = import_rows(dataset, read_rows(io.StringIO(content, newline=''), format), dry_run, default_user_id,
+                         progress=lambda rows: job.progress(rows, total, f"{rows} rows read"))
+    job.progress(1.0, message=f"{report['rows']} rows read")
+    return report
+
+
+# ------------------------
+# CLI
+# ------------------------
+def _open_text(path, mode, encoding):
+    """Open a CSV-safe (newline='') text file; '-' is stdin/stdout."""
+    if path == '-':
+        return contextlib.nullcontext(sys.stdin if mode == 'r' else sys.stdout)
+    return open(path, mode, encoding=encoding, newline='')
+
+
+@click.command('export-data')
+@click.argument('dataset', type=click.Choice(DATASETS))
+@click.option('--format', 'fmt', type=click.Choice(list(FORMATS)), default='csv')
+@click.option('--output', '-o', default='-', help="File to write ('-' for stdout).")
+@with_appcontext
+def export_command(dataset, fmt, output):
+    """Stream a dataset to CSV or JSON Lines."""
+    with _open_text(output, 'w', 'utf-8') as out:
+        for text in export_stream(db.engine, dataset, fmt):
+            out.write(text)
+
+
+@click.command('import-data')
+@click.argument('dataset', type=click.Choice(DATASETS))
+@click.argument('path', type=click.Path(exists=True, dir_okay=False, allow_dash=True))
+@click.option('--format', 'fmt', type=click.Choice(list(FORMATS)), default=None,
+              help='Defaults to the file extension.')
+@click.option('--dry-run', is_flag=True, help='Validate only; write nothing.')
+@click.option('--user', 'user_email', default=None,
+              help='Creator of imported requests without a created_by_email.')
+@with_appcontext
+def import_command(dataset, path, fmt, dry_run, user_email):
+    """Validate and import a CSV or JSON Lines file in one transaction."""
+    try:
+        fmt = import_format(fmt, path)
+    except ValueError as e:
+        raise click.BadParameter(str(e), param_hint='--format')
+    default_user_id = None
+    if user_email:
+        default_user_id = db.session.scalar(select(User.id).where(func.lower(User.email) == user_email.lower()))
+        if default_user_id is None:
+            raise click.BadParameter(f"No user with email {user_email}.", param_hint='--user')
+
+    with _open_text(path, 'r', 'utf-8-sig') as stream:
+        report = import_rows(dataset, read_rows(stream, fmt), dry_run, default_user_id)
+
+    for rejected in report['errors']:
+        click.echo(f"line {rejected['line']}: {' '.join(rejected['errors'])}", err=True)
+    if report['error_count'] > len(report['errors']):
+        click.echo(f"... and {report['error_count'] - len(report['errors'])} more rejected rows", err=True)
+    if report['committed']:
+        click.echo(f"[SUCCESS] Imported {report['inserted']} of {report['rows']} rows.")
+    elif dry_run and not report['error_count']:
+        click.echo(f"[DRY RUN] {report['rows']} rows are valid; nothing was written.")
+    else:
+        click.echo(f"[ERROR] {report['error_count']} of {report['rows']} rows rejected; nothing was written.")
+        raise SystemExit(1)
+
+
+def init_app(app):
+    """Register the import/export CLI commands on the app."""
+    app.cli.add_command(export_command)
+    app.cli.add_command(import_command)
@@ -0,0 +1,694 @@
+"""
+GearGuard pages and JSON API (the `views` blueprint).
+
+This module:
+- Defines protected routes for dashboard, equipment, teams, reporting, schedule,
+  maintenance requests, import/export and background jobs.
+- Holds the cached loaders for read-heavy page data.
+Notes:
+- Routes use Flask-Login decorators to require authentication.
+- Keep business logic in models/services; routes should handle request/response.
+- Imported by create_app() (see BLUEPRINTS in config.py), never at module import
+  of app.py, so tools that only need the factory don't pay for it.
+"""
+
+# ------------------------
+# Imports
+# ------------------------
+import io
+from datetime import date
+from functools import partial
+from flask import Blueprint, Response, current_app, render_template, request, jsonify, redirect, url_for, flash
+from flask_login import login_required, current_user
+from sqlalchemy.orm.exc import StaleDataError
+
+from models import db, Department, MaintenanceTeam, Equipment, MaintenanceRequest, WorkCenter, Job
+from kanban import (STATUS_LABELS, STAGE_TO_STATUS, PAGE_SIZE, MAX_BATCH_MOVES, CURSOR_TYPES,
+                    column_counts, first_pages, column_page, next_cursor, apply_moves)
+from pagination import decode_cursor, page_size, next_page_cursor
+from cache import cache
+from identity import identity_cache
+from change_feed import change_feed
+from http_cache import http_cache
+from routing import replicas, replica_reads
+from scheduler import calendar_events, parse_window, plan_from_json
+from request_listing import parse_filters, request_page, request_stream
+from equipment_listing import parse_listing, equipment_page, equipment_dict
+from equipment_health import STATES as EQUIPMENT_STATES
+import search
+import transfer
+import assignment
+import analytics
+import rollups
+import status_history
+import archive
+import serializers
+from jobs import job_queue, job_dict, recent_jobs, STATUSES as JOB_STATUSES
+
+views_bp = Blueprint('views', __name__)
+
+# ================= CACHED PAGE DATA =================
+# Loaders return plain dicts/lists so results can be cached (and pickled) safely.
+
+@cache.cached('work_centers', tags=('WorkCenter',))
+def load_work_centers():
+    """All work centers as dicts for the work center table."""
+    return [{'id': c.id, 'name': c.name, 'code': c.code, 'cost_per_hour': c.cost_per_hour,
+             'capacity_efficiency': c.capacity_efficiency, 'oee_target': c.oee_target}
+            for c in WorkCenter.query.order_by(WorkCenter.name).all()]
+
+@cache.cached('equipment_filters', tags=('Department', 'MaintenanceTeam'))
+def load_equipment_filters():
+    """Departments and teams (id, name) for the equipment list filters."""
+    return {
+        'departments': [{'id': d.id, 'name': d.name}
+                        for d in Department.query.with_entities(Department.id, Department.name)
+                                                 .order_by(Department.name).all()],
+        'teams': [{'id': t.id, 'name': t.name}
+                  for t in MaintenanceTeam.query.with_entities(MaintenanceTeam.id, MaintenanceTeam.name)
+                                               .order_by(MaintenanceTeam.name).all()],
+    }
+
+@cache.cached('equipment_options', tags=('Equipment',))
+def load_equipment_options():
+    """(id, name, serial_number) of every machine for the request form dropdown."""
+    return [{'id': e.id, 'name': e.name, 'serial_number': e.serial_number}
+            for e in Equipment.query.with_entities(Equipment.id, Equipment.name, Equipment.serial_number)
+                                    .order_by(Equipment.name).all()]
+
+@cache.cached('teams', tags=('MaintenanceTeam', 'Technician', 'MaintenanceRequest'))
+def load_teams():
+    """Teams with their technicians and current workload, from the workload index in one query."""
+    return assignment.team_workloads()
+
+@cache.cached('reporting', tags=('MaintenanceRequest', 'Equipment'))
+def load_reporting(month):
+    """
+    Reporting KPIs and chart series from the rollup tables.
+    `month` (YYYY-MM) is part of the key so the six-month window rolls over.
+    """
+    totals = rollups.status_totals()
+    total = sum(count for count, _ in totals.values())
+    completed, repaired_hours = totals.get('repaired', (0, 0.0))
+    chart_labels, chart_reqs, chart_comps = rollups.monthly_series(months=6)
+    return {
+        'total': total,
+        'completed': completed,
+        'avg_time': round(repaired_hours / completed, 1) if completed else 0,
+        'critical': sum(totals.get(status, (0, 0.0))[0] for status in rollups.OPEN_STATUSES),
+        'top_eq': [tuple(row) for row in rollups.top_equipment(limit=3)],
+        'chart_labels': chart_labels,
+        'chart_reqs': chart_reqs,
+        'chart_comps': chart_comps,
+    }
+
+@cache.cached('reliability_summary', tags=('MaintenanceRequest', 'Equipment', 'WorkCenter'),
+              timeout=analytics.CACHE_TIMEOUT)
+def load_reliability(end):
+    """Fleet reliability KPIs, costliest machines and work centers for the reporting page."""
+    report = analytics.reliability(days=analytics.DEFAULT_DAYS, end=end)
+    return {
+        'days': report['window']['days'],
+        'fleet': report['fleet'],
+        'top_assets': analytics.ranking(report, 'equipment', limit=5),
+        'work_centers': analytics.ranking(report, 'work_center', limit=10),
+    }
+
+# ================= ROUTES =================
+
+@views_bp.route('/')
+@login_required
+def home():
+    """Redirect authenticated users to the dashboard."""
+    return redirect(url_for('views.dashboard'))
+
+@views_bp.route('/dashboard')
+@login_required
+@http_cache.conditional('MaintenanceRequest', 'Equipment', 'Technician')
+def dashboard():
+    """
+    Dashboard view.
+    Renders the Kanban board: column counts come from a single GROUP BY and the
+    newest cards of every column from one eager-loaded query. Older cards are
+    fetched on demand through /api/dashboard/<status>.
+    """
+    counts = column_counts()
+    columns = first_pages()
+    cursors = {status: next_cursor(cards, counts[status] > len(cards))
+               for status, cards in columns.items()}
+
+    return render_template("index.html",
+                           user=current_user,
+                           counts=counts,
+                           columns=columns,
+                           cursors=cursors,
+                           page='dashboard')
+
+@views_bp.route('/api/dashboard/<status>')
+@login_required
+@http_cache.conditional('MaintenanceRequest', 'Equipment', 'Technician')
+def dashboard_column(status):
+    """
+    "Load more" API for one Kanban column.
+    Query params: cursor (from the previous page), limit (default 50).
+    Returns rendered card markup plus the cursor of the next page (null when done).
+    """
+    if status not in STATUS_LABELS:
+        return jsonify({'error': 'Unknown status.'}), 404
+    try:
+        cursor_key = decode_cursor(request.args.get('cursor'), CURSOR_TYPES)
+    except ValueError:
+        return jsonify({'error': 'Invalid cursor.'}), 400
+
+    cards, cursor = column_page(status, cursor_key, page_size(request.args.get('limit'), PAGE_SIZE))
+    html = render_template('kanban_cards.html', reqs=cards, status=status)
+    return jsonify({'html': html, 'count': len(cards), 'next_cursor': cursor})
+
+@views_bp.route('/api/dashboard/stream')
+@login_required
+def dashboard_stream():
+    """
+    Server-Sent Events stream of Kanban card events (created/moved/deleted/resync).
+    Reconnecting clients send Last-Event-ID and get the events they missed.
+    """
+    if not change_feed.enabled:
+        return jsonify({'error': 'Live updates are disabled.'}), 404
+    subscription = change_feed.subscribe(request.headers.get('Last-Event-ID'))
+    if subscription is None:
+        return jsonify({'error': 'Too many live connections; try again later.'}), 503
+    # The stream may stay open for minutes; don't hold a pooled connection meanwhile
+    db.session.remove()
+    return Response(change_feed.stream(subscription), mimetype='text/event-stream',
+                    headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+
+@views_bp.route('/api/update_stage', methods=['POST'])
+@login_required
+def update_stage():
+    """
+    API endpoint to update the status/stage of a maintenance request.
+    Expects JSON payload: { "task_id": <id>, "new_stage": "<label>", "expected_version": <int, optional> }.
+    Maps UI labels to DB status values and commits the change.
+    Returns 409 with the current version when expected_version is stale.
+    """
+    data = request.get_json(silent=True)
+    if not isinstance(data, dict):
+        return jsonify({'success': False}), 400
+    db_status = STAGE_TO_STATUS.get(data.get('new_stage'))
+    try:
+        # Same rules as a batch move (kanban._parse_move); the version stays optional here
+        task_id = int(data.get('task_id'))
+        expected_version = data.get('expected_version')
+        expected_version = None if expected_version is None else int(expected_version)
+    except (TypeError, ValueError):
+        return jsonify({'success': False}), 400
+    if task_id and db_status:
+        req = db.session.get(MaintenanceRequest, task_id)
+        if req:
+            if expected_version is not None and expected_version != req.version:
+                return jsonify({'success': False, 'conflict': True, 'version': req.version}), 409
+            req.status = db_status
+            try:
+                db.session.commit()
+            except StaleDataError:
+                # Another writer committed between our read and our UPDATE
+                db.session.rollback()
+                return jsonify({'success': False, 'conflict': True}), 409
+            return jsonify({'success': True, 'version': req.version})
+    return jsonify({'success': False}), 400
+
+@views_bp.route('/api/update_stages', methods=['POST'])
+@login_required
+def update_stages():
+    """
+    Batch version of /api/update_stage.
+    Expects JSON payload: { "moves": [ { "task_id", "new_stage", "expected_version" }, ... ] }.
+    All moves are applied in one transaction with one UPDATE per target status;
+    each result reports 'ok' (with the new version), 'conflict', 'not_found' or 'invalid'.
+    """
+    data = request.get_json(silent=True) or {}
+    moves = data.get('moves')
+    if not isinstance(moves, list) or not moves:
+        return jsonify({'success': False, 'error': 'Expected a non-empty "moves" list.'}), 400
+    if len(moves) > MAX_BATCH_MOVES:
+        return jsonify({'success': False, 'error': f'At most {MAX_BATCH_MOVES} moves per batch.'}), 400
+
+    results = apply_moves(moves)
+    db.session.commit()
+    applied = sum(1 for r in results if r['status'] == 'ok')
+    return jsonify({'success': applied == len(results), 'applied': applied, 'results': results})
+
+@views_bp.route('/work_centers')
+@login_required
+@replica_reads
+@http_cache.conditional('WorkCenter')
+def work_centers():
+    """List work centers used for scheduling, costing and capacity planning."""
+    return render_template("work_centers.html", centers=load_work_centers(), page='work_centers')
+
+@views_bp.route('/equipment')
+@login_required
+@replica_reads
+@http_cache.conditional('Equipment', 'MaintenanceRequest', 'Department',
+                        'MaintenanceTeam', 'FailurePredictionRun')
+def equipment():
+    """
+    List equipment assets with their health (Active / Maintenance / Scrapped).
+    Query params: q (start of the name, serial number or location), department_id, team_id,
+    state, sort, dir, cursor (from the previous page) and limit.
+    """
+    try:
+        options = parse_listing(request.args)
+        rows, cursor = equipment_page(options, decode_cursor(request.args.get('cursor')),
+                                      page_size(request.args.get('limit')))
+    except ValueError as e:
+        flash(str(e), 'error')
+        return redirect(url_for('views.equipment'))
+
+    return render_template("equipment.html",
+                           equipment=[equipment_dict(row) for row in rows],
+                           options=options,
+                           states=EQUIPMENT_STATES,
+                           next_cursor=cursor,
+                           page='equipment',
+                           **load_equipment_filters())
+
+@views_bp.route('/api/equipment')
+@login_required
+@replica_reads
+@http_cache.conditional('Equipment', 'MaintenanceRequest', 'Department',
+                        'MaintenanceTeam', 'FailurePredictionRun')
+def api_equipment():
+    """
+    JSON listing of equipment with health, same parameters as /equipment:
+    q, department_id, team_id, state, sort (name, serial_number, location,
+    department, team, open_requests, last_failure), dir, cursor and limit.
+    """
+    try:
+        options = parse_listing(request.args)
+        rows, cursor = equipment_page(options, decode_cursor(request.args.get('cursor')),
+                                      page_size(request.args.get('limit')))
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    return jsonify({'items': [equipment_dict(row) for row in rows], 'next_cursor': cursor})
+
+@views_bp.route('/equipment/<int:id>', methods=['GET', 'POST'])
+@login_required
+@http_cache.conditional('Equipment', 'MaintenanceRequest', 'Department', 'MaintenanceTeam', 'WorkCenter')
+def equipment_detail(id):
+    """
+    View and update a single equipment record.
+    - GET: render form populated with equipment and supporting lists.
+    - POST: persist edited fields and redirect back to equipment list.
+    """
+    equipment = Equipment.query.get_or_404(id)
+
+    if request.method == 'POST':
+        # Update allowed equipment fields from the submitted form
+        equipment.name = request.form.get('name')
+        equipment.serial_number = request.form.get('serial_number')
+        equipment.location = request.form.get('location')
+        equipment.category = request.form.get('category') or None
+        equipment.department_id = request.form.get('department')
+        equipment.team_id = request.form.get('team')
+        equipment.work_center_id = request.form.get('work_center') or None
+        
+        db.session.commit()
+        flash('Equipment details updated successfully!', 'success')
+        return redirect(url_for('views.equipment'))
+
+    # Supporting data for form select controls
+    departments = Department.query.all()
+    teams = MaintenanceTeam.query.all()
+    work_centers = WorkCenter.query.all()
+    # Active 'in_progress' maintenance requests, precomputed in equipment health
+    active_maint = equipment.health.in_progress_requests if equipment.health else 0
+
+    return render_template('equipment_detail.html', 
+                           equipment=equipment,
+                           departments=departments,
+                           teams=teams,
+                           work_centers=work_centers,
+                           active_maint=active_maint)
+
+@views_bp.route('/teams')
+@login_required
+@replica_reads
+@http_cache.conditional('MaintenanceTeam', 'Technician', 'MaintenanceRequest')
+def teams():
+    """List maintenance teams and brief metadata for team management pages."""
+    return render_template("teams.html", teams=load_teams(), page='teams')
+
+@views_bp.route('/reporting')
+@login_required
+@replica_reads
+@http_cache.conditional('MaintenanceRequest', 'Equipment', 'WorkCenter', clock=analytics.window_end)
+def reporting():
+    """
+    Reporting view, served from the incrementally maintained rollup tables (cached):
+    - KPI totals
+    - Average repair duration for completed tasks
+    - Top equipment by request count
+    - Monthly requests/completions for the last six months
+    - Reliability (MTBF, MTTR, availability, downtime cost) from the analytics engine
+    - Weekly queue/repair time and downtime from the status history
+    """
+    data = load_reporting(month=date.today().strftime('%Y-%m'))
+    end = analytics.window_end()
+    return render_template("reporting.html", page='reporting', reliability=load_reliability(end=end),
+                           durations=analytics.status_durations(days=84, bucket='week', end=end), **data)
+
+@views_bp.route('/api/analytics/reliability')
+@login_required
+@replica_reads
+@http_cache.conditional('MaintenanceRequest', 'Equipment', 'WorkCenter', 'Department', 'MaintenanceTeam',
+                        clock=analytics.window_end)
+def api_reliability():
+    """
+    Reliability metrics over the last `days` days (default 365): failures,
+    failure_rate (per 1,000 h), mtbf_hours, mttr_hours, downtime_hours,
+    availability and downtime_cost, per group=equipment|department|team|work_center,
+    ranked by sort (default downtime_cost) and dir; limit as elsewhere.
+    Always includes the fleet-wide summary.
+    """
+    try:
+        group, days, sort, descending = analytics.parse_query(request.args)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    report = analytics.reliability(days=days)
+    return jsonify({'window': report['window'], 'fleet': report['fleet'], 'group': group,
+                    'items': analytics.ranking(report, group, sort, page_size(request.args.get('limit')),
+                                               descending)})
+
+@views_bp.route('/api/analytics/status-durations')
+@login_required
+@replica_reads
+@http_cache.conditional('MaintenanceRequest', 'Equipment', clock=analytics.window_end)
+def api_status_durations():
+    """
+    Queue, repair, resolution and downtime hours from the status history over
+    the last `days` days (default 90), with a time series per bucket=day|week|month;
+    equipment_id limits it to one machine.
+    """
+    try:
+        days, bucket, equipment_id = analytics.parse_durations_query(request.args)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    return jsonify(analytics.status_durations(days=days, bucket=bucket, equipment_id=equipment_id))
+
+@views_bp.route('/api/maintenance_requests/<int:request_id>/history')
+@login_required
+@replica_reads
+@http_cache.conditional('MaintenanceRequest')
+def request_history(request_id):
+    """Status transitions of one request, oldest first."""
+    if archive.get_request(request_id) is None:
+        return jsonify({'error': 'Request not found.'}), 404
+    return jsonify({'items': [{'version': t.version, 'ts': t.ts.isoformat(), 'from_status': t.from_status,
+                               'to_status': t.to_status, 'technician_id': t.technician_id}
+                              for t in status_history.history(request_id)]})
+
+@views_bp.route('/api/cache/stats')
+@login_required
+def cache_stats():
+    """Page/identity cache, change feed, HTTP validation and replica routing statistics for this worker."""
+    return jsonify(dict(cache.stats(), identity=identity_cache.stats(), change_feed=change_feed.stats(),
+                        http=http_cache.stats(), database=replicas.stats()))
+
+@views_bp.route('/schedule')
+@login_required
+@http_cache.conditional()
+def schedule():
+    """Render the schedule/calendar page used for visualizing planned maintenance."""
+    return render_template("schedule.html", page='schedule')
+
+@views_bp.route('/api/calendar-events')
+@login_required
+@replica_reads
+@http_cache.conditional('MaintenanceRequest', 'Equipment', 'MaintenancePlan', 'FailurePredictionRun')
+def calendar_events_api():
+    """
+    Calendar events for the schedule page.
+    Query params: start, end (YYYY-MM-DD, end exclusive; defaults to the current month).
+    Preventive occurrences are expanded from plans only for this window and merged
+    with corrective requests created in it and the precomputed predicted failures.
+    """
+    try:
+        start, end = parse_window(request.args)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    return jsonify(calendar_events(start, end))
+
+@views_bp.route('/api/maintenance_plans', methods=['POST'])
+@login_required
+def create_maintenance_plan():
+    """
+    Create a recurring preventive-maintenance plan.
+    Expects JSON: { "title", "equipment_id" or "work_center_id", "interval_days" or
+    "interval_run_hours" + "run_hours_per_day", "start_date", optional "end_date" }.
+    """
+    try:
+        plan = plan_from_json(request.get_json(silent=True) or {})
+    except ValueError as e:
+        return jsonify({'success': False, 'error': str(e)}), 400
+    db.session.add(plan)
+    db.session.commit()
+    return jsonify({'success': True, 'id': plan.id}), 201
+
+@views_bp.route('/maintenance_requests', methods=['GET', 'POST'])
+@login_required
+@replica_reads
+@http_cache.conditional('MaintenanceRequest', 'Equipment', 'Technician', 'MaintenanceTeam')
+def maintenance_requests():
+    """
+    Create (POST) and list (GET) maintenance requests.
+    - POST: create new request from form fields; team, repair estimate and the
+      least-loaded technician of that team are assigned automatically.
+    - GET: list one page of requests, optionally filtered by equipment_id, status,
+      team_id or date range; older pages are reached through the `cursor` parameter.
+    """
+    # POST: create a new maintenance request
+    if request.method == 'POST':
+        description = request.form.get('description')
+        equipment_id = request.form.get('equipment_id')
+        priority = request.form.get('priority')  # Optional field for future use
+
+        if description and equipment_id:
+            eq = Equipment.query.get(equipment_id)
+            new_req = MaintenanceRequest(
+                description=description,
+                equipment_id=equipment_id,
+                created_by=current_user.id,
+                status='new'
+            )
+            if eq:
+                assignment.assign(new_req, eq)
+            db.session.add(new_req)
+            db.session.commit()
+            flash('Maintenance Request created successfully!', 'success')
+        else:
+            flash('Error: Description and Equipment are required.', 'error')
+            
+        return redirect(url_for('views.maintenance_requests'))
+
+    # GET: one keyset-paginated page, optionally filtered (e.g. by equipment_id)
+    # or, with `q`, ranked full-text search results
+    q = (request.args.get('q') or '').strip()
+    try:
+        filters = parse_filters(request.args)
+        cursor_key = decode_cursor(request.args.get('cursor'))
+        limit = page_size(request.args.get('limit'))
+        if q:
+            results, cursor = search.search_page(q, filters, cursor_key, limit)
+            reqs = [req for req, _ in results]
+        else:
+            reqs, cursor = request_page(filters, cursor_key, limit)
+    except ValueError as e:
+        flash(str(e), 'error')
+        return redirect(url_for('views.maintenance_requests'))
+
+    return render_template("maintenance_requests.html", 
+                           requests=reqs, 
+                           equipment_list=load_equipment_options(),
+                           filters=dict(filters, q=q) if q else filters,
+                           next_cursor=cursor,
+                           page='maintenance_requests')
+
+@views_bp.route('/api/maintenance_requests')
+@login_required
+@replica_reads
+@http_cache.conditional('MaintenanceRequest', 'Equipment', 'Technician', 'MaintenanceTeam')
+def api_maintenance_requests():
+    """
+    JSON listing of maintenance requests, newest first.
+    Query params: equipment_id, status, team_id, date_from, date_to (YYYY-MM-DD),
+    cursor (from the previous page) and limit (default 50, max 200); fields
+    (e.g. id,status,equipment.name, see serializers.py) and format=ndjson to
+    stream every matching request after the cursor, one per line.
+    """
+    try:
+        filters = parse_filters(request.args)
+        fields = serializers.parse_fields('request', request.args.get('fields'))
+        fmt = serializers.parse_format(request.args)
+        cursor_key = decode_cursor(request.args.get('cursor'))
+        options = partial(serializers.loader_options, 'request', fields)
+        if fmt == 'ndjson':
+            reqs = request_stream(filters, cursor_key, options, serializers.STREAM_CHUNK_SIZE)
+            return http_cache.stream_response(serializers.ndjson_lines(reqs, 'request', fields),
+                                              serializers.NDJSON_MIMETYPE)
+        reqs, cursor = request_page(filters, cursor_key, page_size(request.args.get('limit')), options)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    return serializers.json_response({'items': [serializers.serialize(r, 'request', fields) for r in reqs],
+                                      'next_cursor': cursor})
+
+@views_bp.route('/api/search')
+@login_required
+@replica_reads
+@http_cache.conditional('MaintenanceRequest', 'Equipment', 'Technician', 'MaintenanceTeam')
+def api_search():
+    """
+    Ranked full-text search over request descriptions and equipment name,
+    serial number and location (e.g. q=hydraulic leak floor 2).
+    Combines with the listing filters: status, team_id, equipment_id, date_from,
+    date_to (a range reaching back into the archive includes archived requests,
+    as in the listing); paginated with cursor/limit; fields as for
+    /api/maintenance_requests. Best matches first.
+    """
+    q = (request.args.get('q') or '').strip()
+    if not search.search_terms(q):
+        return jsonify({'error': "'q' must contain at least one word."}), 400
+    try:
+        filters = parse_filters(request.args)
+        fields = serializers.parse_fields('request', request.args.get('fields'))
+        results, cursor = search.search_page(q, filters, decode_cursor(request.args.get('cursor')),
+                                             page_size(request.args.get('limit')),
+                                             partial(serializers.loader_options, 'request', fields))
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    return serializers.json_response({
+        'items': [dict(serializers.serialize(req, 'request', fields), score=round(score, 6))
+                  for req, score in results],
+        'next_cursor': cursor})
+
+@views_bp.route('/api/sync/<collection>')
+@login_required
+@replica_reads
+@http_cache.conditional('MaintenanceRequest', 'Equipment', 'Department', 'MaintenanceTeam', 'Technician',
+                        'WorkCenter', 'FailurePredictionRun')
+def api_sync(collection):
+    """
+    Download of requests, equipment, teams, technicians or work_centers for
+    offline clients (the handheld app), by id. Query params: fields (see
+    serializers.py), updated_since (ISO timestamp; requests, equipment and
+    work_centers), cursor/limit (default 50, max 200), or format=ndjson to
+    stream every row after the cursor.
+    """
+    if collection not in serializers.COLLECTIONS:
+        return jsonify({'error': 'Unknown collection.'}), 404
+    schema = serializers.COLLECTIONS[collection]
+    try:
+        fields = serializers.parse_fields(schema, request.args.get('fields'))
+        fmt = serializers.parse_format(request.args)
+        query = serializers.collection_query(collection, fields, serializers.parse_since(collection, request.args),
+                                             decode_cursor(request.args.get('cursor')))
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    if fmt == 'ndjson':
+        rows = query.yield_per(serializers.STREAM_CHUNK_SIZE)
+        return http_cache.stream_response(serializers.ndjson_lines(rows, schema, fields), serializers.NDJSON_MIMETYPE)
+    limit = page_size(request.args.get('limit'))
+    rows, cursor = next_page_cursor(query.limit(limit + 1).all(), limit, lambda row: (row.id,))
+    return serializers.json_response({'items': [serializers.serialize(row, schema, fields) for row in rows],
+                                      'next_cursor': cursor})
+
+@views_bp.route('/api/export/<dataset>')
+@login_required
+@replica_reads
+def export_data(dataset):
+    """
+    Stream equipment, requests or work_centers as CSV or JSON Lines (format=csv|jsonl).
+    Rows are read from a server-side cursor in chunks, so any table size works.
+    """
+    fmt = request.args.get('format', 'csv')
+    if dataset not in transfer.DATASETS:
+        return jsonify({'error': 'Unknown dataset.'}), 404
+    if fmt not in transfer.FORMATS:
+        return jsonify({'error': f"'format' must be one of: {', '.join(transfer.FORMATS)}."}), 400
+    # get_bind() is the replica this request reads from (or the primary)
+    return Response(transfer.export_stream(db.session.get_bind(), dataset, fmt), mimetype=transfer.FORMATS[fmt],
+                    headers={'Content-Disposition': f'attachment; filename={dataset}.{fmt}'})
+
+@views_bp.route('/api/import/<dataset>', methods=['POST'])
+@login_required
+def import_data(dataset):
+    """
+    Import equipment, requests or work_centers from an uploaded CSV/JSON Lines
+    file (`file` field, or the raw body with format=csv|jsonl).
+    Query params: dry_run=1 to validate without writing.
+    All rows are inserted in one transaction, committed only if every row is valid;
+    422 with per-line errors otherwise.
+    """
+    if dataset not in transfer.DATASETS:
+        return jsonify({'error': 'Unknown dataset.'}), 404
+    upload = request.files.get('file')
+    try:
+        fmt = transfer.import_format(request.args.get('format'), upload.filename if upload else None)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    dry_run = request.args.get('dry_run') in ('1', 'true')
+    if request.args.get('background') in ('1', 'true'):
+        limit = current_app.config['JOBS_MAX_PAYLOAD_BYTES']
+        content = (upload.stream if upload else request.stream).read(limit + 1)
+        if len(content) > limit:
+            return jsonify({'error': f'Background imports are limited to {limit} bytes.'}), 413
+        try:
+            content = content.decode('utf-8-sig')
+        except UnicodeDecodeError:
+            return jsonify({'error': 'File is not valid UTF-8.'}), 400
+        job = job_queue.submit('import_data', {'dataset': dataset, 'format': fmt, 'content': content,
+                                               'dry_run': dry_run, 'default_user_id': current_user.id},
+                               user_id=current_user.id)
+        db.session.commit()
+        return jsonify(job_dict(job)), 202, {'Location': url_for('views.job_status', job_id=job.id)}
+    stream = io.TextIOWrapper(upload.stream if upload else request.stream, encoding='utf-8-sig', newline='')
+    report = transfer.import_rows(dataset, transfer.read_rows(stream, fmt),
+                                  dry_run=dry_run, default_user_id=current_user.id)
+    return jsonify(report), 200 if report['error_count'] == 0 else 422
+
+# ------------------------
+# Background jobs
+# ------------------------
+@views_bp.route('/api/jobs', methods=['GET', 'POST'])
+@login_required
+def jobs_api():
+    """
+    GET: recent jobs, newest first, with counts per status (query params: status, name, limit).
+    POST: queue a job from {"name": task, "payload": {...}}; 202 with the job and
+    its status URL in Location, 403 for tasks outside JOBS_HTTP_TASKS.
+    """
+    if request.method == 'POST':
+        data = request.get_json(silent=True) or {}
+        try:
+            job = job_queue.submit_for(current_user.id, data.get('name'), data.get('payload'))
+        except PermissionError as e:
+            return jsonify({'error': str(e)}), 403
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+        db.session.commit()
+        return jsonify(job_dict(job)), 202, {'Location': url_for('views.job_status', job_id=job.id)}
+
+    status = request.args.get('status')
+    if status and status not in JOB_STATUSES:
+        return jsonify({'error': f"'status' must be one of: {', '.join(JOB_STATUSES)}."}), 400
+    limit = page_size(request.args.get('limit'))
+    return jsonify({'jobs': [job_dict(job) for job in recent_jobs(status, request.args.get('name'), limit)],
+                    'counts': job_queue.stats()})
+
+@views_bp.route('/api/jobs/<int:job_id>')
+@login_required
+def job_status(job_id):
+    """Status, progress, result or error of one job (poll until status is succeeded/failed)."""
+    job = db.session.get(Job, job_id)
+    if job is None:
+        return jsonify({'error': 'Job not found.'}), 404
+    return jsonify(job_dict(job))
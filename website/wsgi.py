@@ -0,0 +1,17 @@
+"""
+WSGI entry point for multi-worker servers.
+
+    gunicorn --preload -w 8 wsgi:app
+
+With --preload the master imports this module once: the app is created and,
+when WARM_UP is set (production profile), warmed before the workers fork, so
+each worker starts with compiled templates and reference data in memory
+shared copy-on-write with its siblings, instead of paying for them on its
+first requests. Without --preload every worker runs this module itself.
+"""
+
+from app import create_app, warm_up
+
+app = create_app()
+if app.config['WARM_UP']:
+    warm_up(app)